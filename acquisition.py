@@ -0,0 +1,277 @@
+import time
+import struct
+import threading
+import telemetry_format
+from multiprocessing import shared_memory
+from backends import ReplayFinished
+from scheduler import FixedRateScheduler
+from samples import STATUS_OK, ImuSample, SensorSample
+
+# Shared ring layout: a 64-byte header, then capacity slots of an 8-byte stamp and one
+# telemetry_format record. Sample number n lives in slot n % capacity; the write count
+# at COUNT_OFFSET is the number of samples published so far.
+MAGIC = b"PRXQ"
+FORMAT_VERSION = 1
+HEADER_STRUCT = struct.Struct("<4sHHIB")  # magic, version, record size, capacity, record type
+COUNT_STRUCT = struct.Struct("<Q")
+STAMP_STRUCT = struct.Struct("<Q")
+COUNT_OFFSET = 16
+HEADER_SIZE = 64
+SLOT_SIZE = STAMP_STRUCT.size + telemetry_format.RECORD_SIZE
+SAMPLE_TYPES = {telemetry_format.RECORD_IMU: ImuSample, telemetry_format.RECORD_SENSOR: SensorSample}
+
+class RingBuffer:
+    def __init__(self, capacity):
+        """
+        Initializes a bounded, preallocated ring buffer for one writer thread.
+
+        Readers never take a lock: the writer fills a slot before publishing it by
+        bumping the write count, and readers discard any entries the writer may
+        have overwritten while they were copying.
+
+        :param capacity: The number of entries kept before the oldest is overwritten.
+        """
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+
+        self.capacity = capacity
+        self.slots = [None] * capacity  # Preallocated storage
+        self.count = 0  # Total number of entries ever written
+
+    def append(self, item):
+        """
+        Publishes an entry, overwriting the oldest one when the buffer is full.
+
+        :param item: The entry to store.
+        """
+        self.slots[self.count % self.capacity] = item
+        self.count += 1
+
+    def latest(self):
+        """
+        Returns the most recently published entry, or None if nothing was written yet.
+        """
+        count = self.count
+        if count == 0:
+            return None
+        return self.slots[(count - 1) % self.capacity]
+
+    def read_since(self, sequence):
+        """
+        Returns the entries published since a given sequence number, oldest first.
+
+        :param sequence: The write count returned by the previous call (0 to start).
+        :return: A tuple (entries, sequence) where sequence is passed to the next call.
+                 Entries overwritten before they could be read are skipped.
+        """
+        count = self.count
+        start = max(sequence, count - self.capacity)
+        entries = [self.slots[i % self.capacity] for i in range(start, count)]
+
+        # Drop anything the writer may have overwritten while we were copying
+        oldest_safe = self.count + 1 - self.capacity
+        if oldest_safe > start:
+            entries = entries[oldest_safe - start:]
+
+        return entries, count
+
+class SharedRingBuffer:
+    def __init__(self, record_type, capacity=256, name=None):
+        """
+        Initializes a ring buffer of samples in shared memory, for one writer process and
+        readers in other processes; it has the same interface as RingBuffer.
+
+        Samples are packed as telemetry_format records. Nobody takes a lock: the writer
+        clears a slot's stamp, fills the slot, stamps it with its sequence number and then
+        bumps the write count. A reader keeps a copied slot only if its stamp is the
+        expected one before and after the copy, so overwritten samples are skipped.
+
+        :param record_type: telemetry_format.RECORD_IMU or RECORD_SENSOR.
+        :param capacity: The number of samples kept before the oldest is overwritten.
+        :param name: The name of an existing buffer to attach to, or None to create one.
+        """
+        if record_type not in SAMPLE_TYPES:
+            raise ValueError(f"Unsupported record type: {record_type}")
+        if capacity <= 0:
+            raise ValueError("capacity must be positive")
+
+        if name is None:
+            self.memory = shared_memory.SharedMemory(create=True, size=HEADER_SIZE + capacity * SLOT_SIZE)
+            HEADER_STRUCT.pack_into(self.memory.buf, 0, MAGIC, FORMAT_VERSION, telemetry_format.RECORD_SIZE,
+                                    capacity, record_type)
+        else:
+            self.memory = shared_memory.SharedMemory(name=name)
+            magic, version, record_size, capacity, stored_type = HEADER_STRUCT.unpack_from(self.memory.buf)
+            if magic != MAGIC or version > FORMAT_VERSION or record_size != telemetry_format.RECORD_SIZE \
+                    or stored_type != record_type:
+                self.memory.close()
+                raise ValueError(f"Not a shared ring buffer of record type {record_type}: {name}")
+
+        self.name = self.memory.name
+        self.record_type = record_type
+        self.capacity = capacity
+        self.record = telemetry_format.RECORD_STRUCTS[record_type]
+        self.sample_type = SAMPLE_TYPES[record_type]
+        self.written = 0  # Samples published by this process, when it is the writer
+        self.skipped = 0  # Samples this process found overwritten while reading them
+
+    @property
+    def count(self):
+        """
+        The total number of samples ever published.
+        """
+        return COUNT_STRUCT.unpack_from(self.memory.buf, COUNT_OFFSET)[0]
+
+    def append(self, sample):
+        """
+        Publishes a sample, overwriting the oldest one when the buffer is full.
+
+        :param sample: An ImuSample or SensorSample matching the record type.
+        """
+        buffer = self.memory.buf
+        offset = HEADER_SIZE + (self.written % self.capacity) * SLOT_SIZE
+        STAMP_STRUCT.pack_into(buffer, offset, 0)
+        # Samples start with their timestamp like the records do, so they pack as they are
+        self.record.pack_into(buffer, offset + STAMP_STRUCT.size, self.record_type, *sample)
+        self.written += 1
+        STAMP_STRUCT.pack_into(buffer, offset, self.written)
+        COUNT_STRUCT.pack_into(buffer, COUNT_OFFSET, self.written)
+
+    def _read(self, number):
+        # Returns sample number `number`, or None if it is being or has been overwritten
+        buffer = self.memory.buf
+        offset = HEADER_SIZE + (number % self.capacity) * SLOT_SIZE
+        stamp = STAMP_STRUCT.unpack_from(buffer, offset)[0]
+        fields = self.record.unpack_from(buffer, offset + STAMP_STRUCT.size)
+        if stamp != number + 1 or STAMP_STRUCT.unpack_from(buffer, offset)[0] != stamp:
+            self.skipped += 1
+            return None
+        return self.sample_type(*fields[1:])
+
+    def latest(self):
+        """
+        Returns the most recently published sample, or None if nothing was written yet.
+        """
+        count = self.count
+        if count == 0:
+            return None
+        return self._read(count - 1)
+
+    def read_since(self, sequence):
+        """
+        Returns the samples published since a given sequence number, oldest first.
+
+        :param sequence: The write count returned by the previous call (0 to start).
+        :return: A tuple (samples, sequence) where sequence is passed to the next call.
+                 Samples overwritten before they could be read are skipped.
+        """
+        count = self.count
+        samples = []
+        for number in range(max(sequence, count - self.capacity), count):
+            sample = self._read(number)
+            if sample is not None:
+                samples.append(sample)
+        return samples, count
+
+    def close(self):
+        """
+        Releases this process's mapping of the buffer.
+        """
+        self.memory.close()
+
+    def unlink(self):
+        """
+        Removes the buffer once every process has closed it; called by the process that created it.
+        """
+        self.memory.unlink()
+
+    def to_string(self):
+        """
+        Returns a string representation of the buffer's state.
+        """
+        return f"Name: {self.name}, Published: {self.count}, Capacity: {self.capacity}, Skipped: {self.skipped}"
+
+class SensorSampler(threading.Thread):
+    def __init__(self, name, read, rate_hz, capacity=256, buffer=None):
+        """
+        Initializes a thread that samples one sensor at its own fixed rate.
+
+        :param name: The thread name, e.g. "imu" or "sensor".
+        :param read: A callable returning one timestamped sample record (see samples.py),
+                     or None if the read failed. Samples marked stale or substituted
+                     are counted as errors and not published.
+        :param rate_hz: The sampling rate in Hz.
+        :param capacity: The number of samples kept in the ring buffer.
+        :param buffer: The buffer to publish to, e.g. a SharedRingBuffer read by another
+                       process (defaults to a new RingBuffer of capacity samples).
+        """
+        super().__init__(name=name, daemon=True)
+        self.read = read
+        self.buffer = RingBuffer(capacity) if buffer is None else buffer
+        self.scheduler = FixedRateScheduler(rate_hz=rate_hz, overrun_policy="skip")
+        self.errors = 0
+        self.finished = None  # Why the thread ended by itself, e.g. the end of a replay
+        self._stop_event = threading.Event()
+
+    def run(self):
+        """
+        Samples the sensor until stop() is called or a replayed sensor runs out of data,
+        publishing every sample to the ring buffer.
+        """
+        self.scheduler.start()
+        while not self._stop_event.is_set():
+            try:
+                sample = self.read()
+            except ReplayFinished as e:
+                self.finished = str(e)
+                break
+            except (RuntimeError, OSError):
+                sample = None
+
+            if sample is None or getattr(sample, "status", STATUS_OK) != STATUS_OK:
+                self.errors += 1
+            else:
+                self.buffer.append(sample)
+
+            self.scheduler.wait()
+
+    def stop(self, timeout=1.0):
+        """
+        Signals the thread to finish and waits for it.
+
+        :param timeout: The maximum time in seconds to wait for the thread.
+        """
+        self._stop_event.set()
+        if self.is_alive():
+            self.join(timeout)
+
+    def to_string(self):
+        """
+        Returns a string representation of the sampler's statistics.
+
+        :return: A formatted string with sampler statistics.
+        """
+        finished = f", Finished: {self.finished}" if self.finished else ""
+        return (f"{self.name}: Samples: {self.buffer.count}, "
+                f"Errors: {self.errors}, "
+                f"{self.scheduler.to_string()}{finished}")
+
+# Example usage
+if __name__ == "__main__":
+    # Sample a fake fast and a fake slow sensor side by side
+    fast = SensorSampler("fast", lambda: (time.monotonic(),), rate_hz=100)
+    slow = SensorSampler("slow", lambda: time.sleep(0.3) or (time.monotonic(),), rate_hz=10)
+
+    try:
+        fast.start()
+        slow.start()
+        time.sleep(2)
+
+    except KeyboardInterrupt:
+        print("Program interrupted by user.")
+
+    finally:
+        fast.stop()
+        slow.stop()
+        print(fast.to_string())
+        print(slow.to_string())
@@ -0,0 +1,187 @@
+import clock
+import queue
+import threading
+
+class ActuationSequence:
+    def __init__(self, name, steps, safe_steps=()):
+        """
+        Initializes a timed actuation sequence.
+
+        :param name: The sequence name, e.g. "Sampling".
+        :param steps: A list of (offset, label, action) tuples: action() is called offset
+                      seconds after the sequence starts. Steps must be in offset order.
+        :param safe_steps: A list of (label, action) tuples run if the sequence is aborted,
+                           to leave the actuators in a safe state.
+        """
+        self.name = name
+        self.steps = list(steps)
+        self.safe_steps = list(safe_steps)
+
+        # Completion reporting
+        self.done = threading.Event()
+        self.started_at = None
+        self.finished_at = None
+        self.completed_steps = []  # (label, monotonic time) for every step that ran
+        self.aborted = False
+        self.error = None
+
+    def wait(self, timeout=None):
+        """
+        Blocks until the sequence finished or was aborted.
+
+        :return: True if the sequence is done.
+        """
+        return self.done.wait(timeout)
+
+    def to_string(self):
+        """
+        Returns a string representation of the sequence's progress.
+        """
+        if not self.done.is_set():
+            state = "Running" if self.started_at is not None else "Pending"
+        elif self.error is not None:
+            state = f"Failed ({self.error})"
+        else:
+            state = "Aborted" if self.aborted else "Completed"
+        duration = f", Duration: {self.finished_at - self.started_at:.3f} s" if self.finished_at else ""
+        return f"{self.name}: {state}, Steps: {len(self.completed_steps)}/{len(self.steps)}{duration}"
+
+def sampling_sequence(servo, solenoid, duration, speed=1):
+    """
+    Creates the sampling sequence: solenoid on, servo run for duration seconds, servo stop, solenoid off.
+
+    :param servo: The Servo driving the sampler.
+    :param solenoid: The SolenoidController opening the sampler.
+    :param duration: The collection period in seconds.
+    :param speed: The servo speed while collecting.
+    """
+    return ActuationSequence("Sampling", steps=[
+        (0.0, "Solenoid On", solenoid.activate),
+        (0.0, "Servo Run", lambda: servo.set_speed(speed)),
+        (duration, "Servo Stop", lambda: servo.set_speed(0)),
+        (duration, "Solenoid Off", solenoid.deactivate),
+    ], safe_steps=[
+        ("Servo Stop", lambda: servo.set_speed(0)),
+        ("Solenoid Off", solenoid.deactivate),
+    ])
+
+class ActuationScheduler:
+    def __init__(self, on_complete=None):
+        """
+        Initializes a scheduler that runs actuation sequences on a dedicated thread,
+        so the acquisition loop keeps running while the actuators move.
+
+        :param on_complete: An optional callable receiving each sequence once it is done.
+        """
+        self.on_complete = on_complete
+        self.queue = queue.Queue()
+        self.current = None
+        self._abort_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._wakeup = threading.Event()  # Set when a sequence is queued or the thread should stop
+        self._thread = threading.Thread(target=self._run, name="actuation", daemon=True)
+        self._thread.start()
+
+    def submit(self, sequence):
+        """
+        Queues a sequence to run after any sequence already running; returns immediately.
+
+        :param sequence: The ActuationSequence to run.
+        :return: The same sequence, whose done event signals completion.
+        """
+        self.queue.put(sequence)
+        self._wakeup.set()
+        return sequence
+
+    def busy(self):
+        """
+        Returns True while a sequence is running or queued.
+        """
+        return self.current is not None or not self.queue.empty()
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            try:
+                sequence = self.queue.get_nowait()
+            except queue.Empty:
+                # Idle through the clock, so a simulated clock knows this thread is waiting
+                clock.wait(self._wakeup, 0.1)
+                self._wakeup.clear()
+                continue
+            self.current = sequence
+            self._execute(sequence)
+            self.current = None
+
+    def _execute(self, sequence):
+        sequence.started_at = clock.monotonic()
+        try:
+            for offset, label, action in sequence.steps:
+                # Wait for the step's deadline; abort() cuts the wait short
+                delay = sequence.started_at + offset - clock.monotonic()
+                if delay > 0 and clock.wait(self._abort_event, delay):
+                    break
+                if self._abort_event.is_set():
+                    break
+                action()
+                sequence.completed_steps.append((label, clock.monotonic()))
+
+            if self._abort_event.is_set():
+                sequence.aborted = True
+                for label, action in sequence.safe_steps:
+                    action()
+
+        except Exception as e:  # An actuator fault must not kill the actuation thread
+            sequence.error = e
+            for label, action in sequence.safe_steps:
+                try:
+                    action()
+                except Exception:
+                    pass
+
+        finally:
+            sequence.finished_at = clock.monotonic()
+            sequence.done.set()
+            if self.on_complete is not None:
+                self.on_complete(sequence)
+
+    def abort(self):
+        """
+        Aborts the running sequence (running its safe steps) and drops the queued ones.
+        """
+        while True:
+            try:
+                self.queue.get_nowait().done.set()
+            except queue.Empty:
+                break
+        self._abort_event.set()
+        current = self.current
+        if current is not None:
+            current.done.wait(1.0)
+        self._abort_event.clear()
+
+    def stop(self):
+        """
+        Aborts any sequence and stops the actuation thread.
+        """
+        self.abort()
+        self._stop_event.set()
+        self._wakeup.set()
+        self._thread.join(1.0)
+
+# Example usage
+if __name__ == "__main__":
+    scheduler = ActuationScheduler(on_complete=lambda sequence: print(sequence.to_string()))
+
+    try:
+        sequence = scheduler.submit(ActuationSequence("Demo", steps=[
+            (0.0, "Start", lambda: print("Start")),
+            (0.5, "End", lambda: print("End")),
+        ]))
+        print("Submitted; the caller keeps running")
+        sequence.wait()
+
+    except KeyboardInterrupt:
+        print("Program interrupted by user.")
+
+    finally:
+        scheduler.stop()
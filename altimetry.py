@@ -0,0 +1,173 @@
+try:
+    import numpy as np
+except ImportError:  # Only the batch API needs NumPy
+    np = None
+
+MODEL_ISA = "isa"  # International Standard Atmosphere: altitude from pressure alone
+MODEL_HYPSOMETRIC = "hypsometric"  # Scales the pressure ratio by the measured air temperature
+
+# International Standard Atmosphere constants
+T0 = 288.15  # Standard temperature at sea level (15°C or 288.15K)
+L = 0.00649  # Temperature lapse rate in K/m
+R = 8.314  # Universal gas constant in J/(mol·K)
+G = 9.80665  # Acceleration due to gravity in m/s²
+M = 0.0289644  # Molar mass of Earth's air in kg/mol
+ISA_EXPONENT = (R * L) / (G * M)
+
+# Hypsometric formula as used by the original altitude.py: ((p0 / p) ** (1 / 5.257) - 1) * T / 0.0065
+HYPSOMETRIC_EXPONENT = 1 / 5.257
+HYPSOMETRIC_LAPSE = 0.0065
+
+def isa_altitude(pressure, sea_level_pressure=1013.25):
+    """
+    Returns the ISA altitude in meters; works on floats and NumPy arrays alike.
+
+    :param pressure: The atmospheric pressure in hPa.
+    :param sea_level_pressure: The sea level pressure in hPa.
+    """
+    return (T0 / L) * (1 - (pressure / sea_level_pressure) ** ISA_EXPONENT)
+
+def isa_pressure(altitude, sea_level_pressure=1013.25):
+    """
+    Returns the ISA pressure in hPa at an altitude in meters; the inverse of isa_altitude.
+
+    :param altitude: The altitude in meters.
+    :param sea_level_pressure: The sea level pressure in hPa.
+    """
+    return sea_level_pressure * (1 - altitude * L / T0) ** (1 / ISA_EXPONENT)
+
+def hypsometric_altitude(pressure, temperature, reference_pressure=1013.25):
+    """
+    Returns the height in meters above the level where the pressure is reference_pressure,
+    using the measured temperature; works on floats and NumPy arrays alike.
+
+    :param pressure: The atmospheric pressure in hPa.
+    :param temperature: The air temperature in Celsius.
+    :param reference_pressure: The pressure in hPa at the reference level.
+    """
+    return ((reference_pressure / pressure) ** HYPSOMETRIC_EXPONENT - 1) * (temperature + 273.15) / HYPSOMETRIC_LAPSE
+
+class AltitudeEngine:
+    def __init__(self, model=MODEL_ISA, sea_level_pressure=1013.25):
+        """
+        Initializes the altitude calculation shared by the sensor, the logs and the analysis tools.
+
+        The ground baseline is cached by set_ground(), so each sample costs a single power
+        function for both altitude and displacement.
+
+        :param model: MODEL_ISA or MODEL_HYPSOMETRIC.
+        :param sea_level_pressure: The sea level pressure in hPa.
+        """
+        if model not in (MODEL_ISA, MODEL_HYPSOMETRIC):
+            raise ValueError(f"Unknown altitude model: {model}")
+        self.model = model
+        self.sea_level_pressure = sea_level_pressure
+        self.ground_pressure = None
+        self.ground_temperature = None
+        self.ground_altitude = 0.0
+        self._ground_ratio = 1.0  # (sea level / ground pressure) ** exponent, for the hypsometric model
+
+    def set_ground(self, pressure, temperature):
+        """
+        Sets the launch site reference that displacements are measured from.
+
+        :param pressure: The ground pressure in hPa.
+        :param temperature: The ground temperature in Celsius.
+        """
+        self.ground_pressure = pressure
+        self.ground_temperature = temperature
+        self.ground_altitude = self.altitude(pressure, temperature)
+        self._ground_ratio = (self.sea_level_pressure / pressure) ** HYPSOMETRIC_EXPONENT
+
+    def altitude(self, pressure, temperature):
+        """
+        Returns the altitude above sea level in meters.
+        """
+        if self.model == MODEL_ISA:
+            return isa_altitude(pressure, self.sea_level_pressure)
+        return hypsometric_altitude(pressure, temperature, self.sea_level_pressure)
+
+    def compute(self, pressure, temperature):
+        """
+        Returns (altitude, displacement) in meters for one reading; the scalar fast path.
+
+        :param pressure: The current pressure in hPa.
+        :param temperature: The current temperature in Celsius.
+        """
+        if self.model == MODEL_ISA:
+            altitude = (T0 / L) * (1 - (pressure / self.sea_level_pressure) ** ISA_EXPONENT)
+            return altitude, altitude - self.ground_altitude
+
+        # Hypsometric: the ratio to the ground pressure gives the displacement directly,
+        # and scaling it by the cached ground ratio gives the altitude above sea level
+        scale = (temperature + 273.15) / HYPSOMETRIC_LAPSE
+        if self.ground_pressure is None:
+            ratio = (self.sea_level_pressure / pressure) ** HYPSOMETRIC_EXPONENT
+            return (ratio - 1) * scale, 0.0
+        ratio = (self.ground_pressure / pressure) ** HYPSOMETRIC_EXPONENT
+        return (self._ground_ratio * ratio - 1) * scale, (ratio - 1) * scale
+
+    def displacement(self, pressure, temperature):
+        """
+        Returns the altitude gained since the ground reference in meters.
+        """
+        return self.compute(pressure, temperature)[1]
+
+    def batch(self, pressure, temperature):
+        """
+        Converts whole pressure and temperature series, e.g. log columns, in one vectorized call.
+
+        :param pressure: An array of pressures in hPa.
+        :param temperature: An array of temperatures in Celsius.
+        :return: A tuple (altitude, displacement) of float arrays.
+        """
+        if np is None:
+            raise RuntimeError("NumPy is required for batch altitude calculation")
+        pressure = np.asarray(pressure, dtype=float)
+        temperature = np.asarray(temperature, dtype=float)
+
+        if self.model == MODEL_ISA:
+            altitude = isa_altitude(pressure, self.sea_level_pressure)
+            return altitude, altitude - self.ground_altitude
+
+        scale = (temperature + 273.15) / HYPSOMETRIC_LAPSE
+        if self.ground_pressure is None:
+            return ((self.sea_level_pressure / pressure) ** HYPSOMETRIC_EXPONENT - 1) * scale, np.zeros_like(pressure)
+        ratio = (self.ground_pressure / pressure) ** HYPSOMETRIC_EXPONENT
+        return (self._ground_ratio * ratio - 1) * scale, (ratio - 1) * scale
+
+    def to_string(self):
+        """
+        Returns a string representation of the engine's configuration.
+        """
+        ground = f"{self.ground_pressure:.2f} hPa" if self.ground_pressure is not None else "unset"
+        return (f"Model: {self.model}, Sea Level Pressure: {self.sea_level_pressure:.2f} hPa, "
+                f"Ground: {ground}, Ground Altitude: {self.ground_altitude:.2f} m")
+
+def from_columns(sensor, model=MODEL_ISA, sea_level_pressure=1013.25, ground_samples=1):
+    """
+    Recomputes altitude and displacement for a sensor column dict from log_loader.
+
+    :param sensor: A dict with "pressure" and "temperature" arrays.
+    :param model: MODEL_ISA or MODEL_HYPSOMETRIC.
+    :param sea_level_pressure: The sea level pressure in hPa.
+    :param ground_samples: The number of leading samples averaged into the ground reference.
+    :return: A tuple (altitude, displacement) of float arrays.
+    """
+    if np is None:
+        raise RuntimeError("NumPy is required for batch altitude calculation")
+    engine = AltitudeEngine(model, sea_level_pressure)
+    if len(sensor["pressure"]):
+        engine.set_ground(float(np.nanmean(sensor["pressure"][:ground_samples])),
+                          float(np.nanmean(sensor["temperature"][:ground_samples])))
+    return engine.batch(sensor["pressure"], sensor["temperature"])
+
+# Example usage
+if __name__ == "__main__":
+    engine = AltitudeEngine(MODEL_HYPSOMETRIC)
+    engine.set_ground(1001.86, 23.2)
+    print(engine.to_string())
+
+    for pressure in (1001.86, 995.0, 990.0, 980.0):
+        altitude, displacement = engine.compute(pressure, 23.2)
+        print(f"Pressure: {pressure:.2f} hPa, Altitude: {altitude:.2f} m, Displacement: {displacement:.2f} m")
@@ -1,71 +1,77 @@
-import time
-import board
-import busio
+import clock
 import adafruit_bme680  # BME688 can be used with BME680 library
 import adafruit_bno08x
 from adafruit_bno08x.i2c import BNO08X_I2C  # Corrected to use BNO08X for IMU
-import math
+from altimetry import hypsometric_altitude
+from fusion import AltitudeEstimator
+from i2c_bus import I2CBus
+from calibration import CalibrationCache
 
-# Initialize I2C bus
-i2c = busio.I2C(board.SCL, board.SDA)
+# Initialize the I2C bus shared by both sensors
+bus = I2CBus()
+i2c = bus.i2c
 
 # Initialize BME688 (same library as BME680)
-bme = adafruit_bme680.Adafruit_BME680_I2C(i2c)
+bme = adafruit_bme680.Adafruit_BME680_I2C(bus.client("bme688"))
 
 # Initialize BNO08X
-imu = BNO08X_I2C(i2c)
-imu.enable_feature(adafruit_bno08x.BNO_REPORT_LINEAR_ACCELERATION)  # Enable linear acceleration reporting
+imu = BNO08X_I2C(bus.client("bno08x"))
+imu.enable_feature(adafruit_bno08x.BNO_REPORT_ACCELEROMETER)  # Raw acceleration, gravity included
 
-# Constants
-g = 9.80665  # Gravity (m/s^2)
+# Loop rates
+imu_period = 0.01  # Predict at 100 Hz
+baro_every = 10  # Barometer update every 10th IMU step (10 Hz)
 
-# Minimal threshold for accelerometer (e.g., if total acceleration is below 0.2g)
-min_threshold = 0.2  # The threshold value you want to set
+# Calibrations from an earlier start on the pad are reused while readings confirm them
+cache = CalibrationCache()
 
 # Reference pressure at ground level
 p0 = bme.pressure
+cached_ground = cache.ground(p0)
+if cached_ground is not None:
+    p0 = cached_ground[0]
+else:
+    cache.save("ground", pressure=p0, temperature=bme.temperature)
 
 # Function to calculate altitude from pressure
 def pressure_altitude(pressure, temperature):
-    return ( ( (p0 / pressure) ** (1/5.257) - 1 ) * (temperature + 273.15) ) / 0.0065
-
-# IMU Bias Calibration
-print("Calibrating IMU... Hold still.")
-num_samples = 100
-accel_bias = [0, 0, 0]
-for _ in range(num_samples):
-    ax, ay, az = imu.linear_acceleration
-    accel_bias[0] += ax
-    accel_bias[1] += ay
-    accel_bias[2] += az
-    time.sleep(0.01)
-accel_bias = [x / num_samples for x in accel_bias]
-accel_bias[2] -= g  # Compensate for gravity
-print("Calibration complete.")
-
-# Time tracking
-prev_time = time.monotonic()
+    return hypsometric_altitude(pressure, temperature, reference_pressure=p0)
+
+# Find the vertical axis from the acceleration at rest
+estimator = AltitudeEstimator()
+cached_imu = cache.imu(*imu.acceleration)
+if cached_imu is not None:
+    estimator.up, estimator.gravity = cached_imu
+    print("Using cached IMU calibration.")
+else:
+    print("Calibrating IMU... Hold still.")
+    num_samples = 100
+    accel_sum = [0, 0, 0]
+    for _ in range(num_samples):
+        ax, ay, az = imu.acceleration
+        accel_sum[0] += ax
+        accel_sum[1] += ay
+        accel_sum[2] += az
+        clock.sleep(0.01)
+    estimator.calibrate(*(x / num_samples for x in accel_sum))
+    cache.save("imu", up=list(estimator.up), gravity=estimator.gravity)
+    print("Calibration complete.")
+
+step = 0
+next_time = clock.monotonic()
 
 while True:
-    # Read sensor data
-    pressure = bme.pressure
-    temperature = bme.temperature
-    altitude_pressure = pressure_altitude(pressure, temperature)
-
-    accel_x, accel_y, accel_z = imu.linear_acceleration
-
-    # Calculate total acceleration (magnitude)
-    total_acceleration = math.sqrt(accel_x**2 + accel_y**2 + accel_z**2)
-
-    # Time delta
-    current_time = time.monotonic()
-    dt = current_time - prev_time
-    prev_time = current_time
-
-    # Only trust the pressure reading if total acceleration is below the threshold
-    if total_acceleration < min_threshold:
-        altitude = altitude_pressure  # Trust the pressure-based altitude
-
-    print(f"Altitude: {altitude:.2f} m (Pressure-based)")
-
-    time.sleep(0.1)
+    # Predict with every IMU sample
+    accel_x, accel_y, accel_z = imu.acceleration
+    estimator.predict(clock.monotonic(), estimator.vertical_acceleration(accel_x, accel_y, accel_z))
+
+    # Correct with the barometer at its own, lower rate
+    if step % baro_every == 0:
+        altitude_pressure = pressure_altitude(bme.pressure, bme.temperature)
+        estimator.update(clock.monotonic(), altitude_pressure)
+        print(f"Altitude: {estimator.altitude:.2f} m, Vertical Velocity: {estimator.velocity:.2f} m/s "
+              f"(Pressure-based: {altitude_pressure:.2f} m)")
+    step += 1
+
+    next_time += imu_period
+    clock.sleep(max(0.0, next_time - clock.monotonic()))
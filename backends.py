@@ -0,0 +1,315 @@
+import json
+import time
+import clock
+import bisect
+from concurrent.futures import ThreadPoolExecutor
+
+# Backend modes for create_devices
+BACKEND_HARDWARE = "hardware"  # Real sensors and actuators
+BACKEND_RECORD = "record"  # Real hardware, every raw sensor read teed to a recording file
+BACKEND_REPLAY = "replay"  # Sensors driven by a recording or text log, actuators stubbed out
+
+# Driver attributes read by BME688Sensor and BNO08XSensor
+BME688_ATTRIBUTES = ("temperature", "humidity", "pressure", "gas")
+BNO08X_ATTRIBUTES = ("acceleration", "gyro", "magnetic", "linear_acceleration", "quaternion")
+
+class ReplayFinished(Exception):
+    """
+    Raised by a replay device once its recording has no more data.
+    """
+
+class Recorder:
+    def __init__(self, filename, buffer_size=65536):
+        """
+        Initializes a recorder that writes every raw read as one JSON line.
+
+        :param filename: The path of the recording file.
+        :param buffer_size: The file buffer size in bytes.
+        """
+        self.file = open(filename, "w", encoding="utf-8", buffering=buffer_size)
+        self.start_time = clock.monotonic()
+        self.count = 0
+        self.file.write(json.dumps({"recording": 1, "wall_time": clock.time()}) + "\n")
+
+    def record(self, device, attribute, value):
+        """
+        Appends one raw read to the recording.
+
+        :param device: The device name, e.g. "bme688".
+        :param attribute: The driver attribute that was read, e.g. "pressure".
+        :param value: The value that was returned.
+        """
+        timestamp = clock.monotonic() - self.start_time
+        self.file.write(json.dumps({"t": round(timestamp, 6), "d": device, "a": attribute, "v": value}) + "\n")
+        self.count += 1
+
+    def close(self):
+        self.file.close()
+
+class RecordingDevice:
+    def __init__(self, device, name, attributes, recorder):
+        """
+        Initializes a proxy that passes everything through to a driver and records selected reads.
+
+        :param device: The real driver object, e.g. an Adafruit_BME680_I2C.
+        :param name: The device name used in the recording.
+        :param attributes: The attribute names whose reads are recorded.
+        :param recorder: The Recorder to write to.
+        """
+        object.__setattr__(self, "_device", device)
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_attributes", frozenset(attributes))
+        object.__setattr__(self, "_recorder", recorder)
+
+    def __getattr__(self, attribute):
+        value = getattr(self._device, attribute)
+        if attribute in self._attributes:
+            self._recorder.record(self._name, attribute, value)
+        return value
+
+    def __setattr__(self, attribute, value):
+        setattr(self._device, attribute, value)
+
+class ReplaySource:
+    def __init__(self, streams, realtime=True, speed=1.0):
+        """
+        Initializes a replay source holding one time series per (device, attribute).
+
+        :param streams: A dict mapping (device, attribute) to a tuple (times, values), times in
+                        seconds from the start of the recording in ascending order.
+        :param realtime: If True, reads return the value current at the elapsed replay time;
+                         if False, every read returns the next value as fast as possible.
+        :param speed: The replay speed multiplier in realtime mode.
+        """
+        self.streams = {key: (list(times), list(values)) for key, (times, values) in streams.items()}
+        self.realtime = realtime
+        self.speed = speed
+        self.cursors = dict.fromkeys(self.streams, 0)
+        self.start_time = None
+        self.duration = max((times[-1] for times, values in self.streams.values() if times), default=0.0)
+
+    @classmethod
+    def from_recording(cls, filename, **kwargs):
+        """
+        Creates a replay source from a file written by Recorder.
+        """
+        streams = {}
+        with open(filename, encoding="utf-8") as f:
+            for line in f:
+                entry = json.loads(line)
+                if "d" not in entry:
+                    continue
+                value = tuple(entry["v"]) if isinstance(entry["v"], list) else entry["v"]
+                times, values = streams.setdefault((entry["d"], entry["a"]), ([], []))
+                times.append(entry["t"])
+                values.append(value)
+        return cls(streams, **kwargs)
+
+    @classmethod
+    def from_text_log(cls, filename, **kwargs):
+        """
+        Creates a replay source from a telemetry_log_* file written by flight_program.
+        """
+        from log_loader import read_log
+        imu, sensor, events = read_log(filename)
+        start = min([columns["time"][0] for columns in (imu, sensor) if len(columns["time"])], default=0.0)
+
+        imu_times = (imu["time"] - start).tolist()
+        sensor_times = (sensor["time"] - start).tolist()
+        streams = {
+            ("bme688", "temperature"): (sensor_times, sensor["temperature"].tolist()),
+            ("bme688", "humidity"): (sensor_times, sensor["humidity"].tolist()),
+            ("bme688", "pressure"): (sensor_times, sensor["pressure"].tolist()),
+            ("bme688", "gas"): (sensor_times, sensor["gas_resistance"].tolist()),
+        }
+        for attribute, prefix in (("acceleration", "accel"), ("gyro", "gyro"), ("magnetic", "mag")):
+            values = list(zip(imu[f"{prefix}_x"].tolist(), imu[f"{prefix}_y"].tolist(), imu[f"{prefix}_z"].tolist()))
+            streams[("bno08x", attribute)] = (imu_times, values)
+        return cls(streams, **kwargs)
+
+    def read(self, device, attribute):
+        """
+        Returns the next (or currently valid) value of one stream.
+
+        :raises ReplayFinished: When the stream, or the replay time, runs past the end of the data.
+        :raises AttributeError: When the recording has no such stream.
+        """
+        key = (device, attribute)
+        if key not in self.streams:
+            raise AttributeError(f"Recording has no {device}.{attribute} data")
+        times, values = self.streams[key]
+
+        if self.realtime:
+            now = clock.monotonic()
+            if self.start_time is None:
+                self.start_time = now
+            elapsed = (now - self.start_time) * self.speed
+            if elapsed > self.duration:
+                raise ReplayFinished(f"Replay finished after {self.duration:.1f} s")
+            index = max(0, bisect.bisect_right(times, elapsed) - 1)
+        else:
+            index = self.cursors[key]
+            if index >= len(values):
+                raise ReplayFinished(f"Replay of {device}.{attribute} finished after {len(values)} reads")
+            self.cursors[key] = index + 1
+
+        return values[index]
+
+class ReplayDevice:
+    def __init__(self, source, name, settings=None):
+        """
+        Initializes a stand-in driver whose attribute reads come from a ReplaySource.
+
+        :param source: The ReplaySource to read from.
+        :param name: The device name in the source, e.g. "bme688" or "bno08x".
+        :param settings: Initial values of writable driver settings (e.g. sea_level_pressure).
+        """
+        object.__setattr__(self, "_source", source)
+        object.__setattr__(self, "_name", name)
+        object.__setattr__(self, "_settings", dict(settings or {}))
+
+    def __getattr__(self, attribute):
+        if attribute in self._settings:
+            return self._settings[attribute]
+        return self._source.read(self._name, attribute)
+
+    def __setattr__(self, attribute, value):
+        self._settings[attribute] = value
+
+    def enable_feature(self, feature_id, *args, **kwargs):
+        """
+        Accepts BNO08X feature requests; replayed reports are always available.
+        """
+
+class FakePWM:
+    def __init__(self, gpio, pin, frequency):
+        self.gpio = gpio
+        self.pin = pin
+        self.frequency = frequency
+        self.duty_cycle = None
+
+    def start(self, duty_cycle):
+        self.duty_cycle = duty_cycle
+        self.gpio.record("PWM.start", self.pin, duty_cycle)
+
+    def ChangeDutyCycle(self, duty_cycle):
+        self.duty_cycle = duty_cycle
+        self.gpio.record("PWM.ChangeDutyCycle", self.pin, duty_cycle)
+
+    def stop(self):
+        self.gpio.record("PWM.stop", self.pin)
+
+class FakeGPIO:
+    """
+    A no-op stand-in for the RPi.GPIO module that records every call.
+    """
+    BCM = 11
+    BOARD = 10
+    OUT = 0
+    IN = 1
+    HIGH = 1
+    LOW = 0
+
+    def __init__(self, recorder=None):
+        """
+        :param recorder: An optional Recorder that also receives every call.
+        """
+        self.calls = []  # (monotonic time, call, arguments)
+        self.outputs = {}
+        self.recorder = recorder
+
+    def record(self, call, *args):
+        self.calls.append((clock.monotonic(), call, args))
+        if self.recorder is not None:
+            self.recorder.record("gpio", call, list(args))
+
+    def setmode(self, mode):
+        self.record("setmode", mode)
+
+    def setup(self, pin, mode):
+        self.record("setup", pin, mode)
+
+    def output(self, pin, state):
+        self.outputs[pin] = state
+        self.record("output", pin, state)
+
+    def PWM(self, pin, frequency):
+        self.record("PWM", pin, frequency)
+        return FakePWM(self, pin, frequency)
+
+    def cleanup(self):
+        self.record("cleanup")
+
+def create_devices(backend=BACKEND_HARDWARE, recording=None, replay=None, realtime=True, speed=1.0, i2c_frequency=100000,
+                   sensor_profile="full", imu_extra_features=(), imu_report_intervals=None):
+    """
+    Creates the IMU, barometer, servo and solenoid for a backend mode.
+
+    :param backend: BACKEND_HARDWARE, BACKEND_RECORD or BACKEND_REPLAY.
+    :param recording: The recording file to write (record mode).
+    :param replay: The recording or telemetry_log_*.log file to replay (replay mode).
+    :param realtime: Replay at recorded speed (True) or as fast as possible (False).
+    :param speed: The replay speed multiplier in realtime mode.
+    :param i2c_frequency: The clock of the I2C bus both sensors share, in Hz.
+    :param sensor_profile: The BME688 measurement profile, "flight" or "full" (see sensor.PROFILES).
+    :param imu_extra_features: Optional BNO08X reports, e.g. ("quaternion", "linear_acceleration").
+    :param imu_report_intervals: BNO08X report intervals in microseconds per feature (see imu.py).
+    :return: A tuple (imu, sensor, servo, solenoid, recorder); recorder is None unless recording.
+    """
+    from imu import BNO08XSensor
+    from sensor import BME688Sensor
+    from servo import Servo
+    from solenoid import SolenoidController
+    from i2c_bus import I2CBus
+
+    def create_sensors(bus):
+        # The drivers spend most of their start-up waiting on resets; overlap the two
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            imu = pool.submit(BNO08XSensor, bus=bus, extra_features=imu_extra_features,
+                              report_intervals=imu_report_intervals)
+            sensor = pool.submit(BME688Sensor, bus=bus, profile=sensor_profile)
+            return imu.result(), sensor.result()
+
+    if backend == BACKEND_HARDWARE:
+        imu, sensor = create_sensors(I2CBus(frequency=i2c_frequency))
+        return imu, sensor, Servo(pin=18), SolenoidController(pin=4), None
+
+    if backend == BACKEND_RECORD:
+        recorder = Recorder(recording or time.strftime("recording_%Y-%m-%d_%H-%M-%S.jsonl"))
+        imu, sensor = create_sensors(I2CBus(frequency=i2c_frequency))
+        imu.bno = RecordingDevice(imu.bno, "bno08x", BNO08X_ATTRIBUTES, recorder)
+        imu.drain = False  # Recorded reads must go through the driver properties
+        sensor.bme = RecordingDevice(sensor.bme, "bme688", BME688_ATTRIBUTES, recorder)
+
+        # Keep recording through a device reopened after read failures
+        def reopen_imu():
+            imu.open_device()
+            imu.bno = RecordingDevice(imu.bno, "bno08x", BNO08X_ATTRIBUTES, recorder)
+            imu.drain = False
+
+        def reopen_sensor():
+            sensor.open_device()
+            sensor.bme = RecordingDevice(sensor.bme, "bme688", BME688_ATTRIBUTES, recorder)
+
+        imu.guard.reinitialize = reopen_imu
+        sensor.guard.reinitialize = reopen_sensor
+
+        # The ground reference was read before the proxy was in place; replay reads it first
+        recorder.record("bme688", "pressure", sensor.init_pressure)
+        recorder.record("bme688", "temperature", sensor.init_temperature)
+        return imu, sensor, Servo(pin=18), SolenoidController(pin=4), recorder
+
+    if backend == BACKEND_REPLAY:
+        if replay is None:
+            raise ValueError("Replay mode needs a recording or telemetry log to replay")
+        if replay.endswith(".jsonl"):
+            source = ReplaySource.from_recording(replay, realtime=realtime, speed=speed)
+        else:
+            source = ReplaySource.from_text_log(replay, realtime=realtime, speed=speed)
+        gpio = FakeGPIO()
+        bus = I2CBus(open=False)  # Replayed reads make no bus transfers; the sensors' read timers still count them
+        imu = BNO08XSensor(device=ReplayDevice(source, "bno08x"), bus=bus, extra_features=imu_extra_features)
+        sensor = BME688Sensor(device=ReplayDevice(source, "bme688"), bus=bus, profile=sensor_profile)
+        return imu, sensor, Servo(pin=18, gpio=gpio), SolenoidController(pin=4, gpio=gpio), None
+
+    raise ValueError(f"Unknown backend: {backend}")
@@ -0,0 +1,313 @@
+import os
+import sys
+import json
+import math
+import time
+import random
+import logging
+import argparse
+import platform
+import tempfile
+import contextlib
+import clock
+import backends
+import flight_program
+import telemetry_format
+from scheduler import FixedRateScheduler
+from imu import BNO08XSensor
+from sensor import BME688Sensor
+from servo import Servo
+from solenoid import SolenoidController
+from i2c_bus import I2CBus
+from telemetry_writer import TelemetryLogHandler
+
+# Histogram bucket upper edges in milliseconds, roughly logarithmic
+HISTOGRAM_EDGES_MS = (0.05, 0.1, 0.2, 0.5, 1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+class SyncTextSink:
+    def __init__(self, filename):
+        """
+        Initializes a telemetry sink that formats and writes on the calling thread,
+        the way log_telemetry wrote through logging's FileHandler before the background writer.
+
+        :param filename: The path of the text log file.
+        """
+        self.file = open(filename, "a", encoding="utf-8")
+        self.formatters = {"IMU Telemetry": telemetry_format.format_imu,
+                           "Sensor Telemetry": telemetry_format.format_sensor}
+
+        # The same time base as TelemetryWriter, so TelemetryLogHandler can feed this sink too
+        self.wall_time = clock.time()
+        self.monotonic_time = clock.monotonic()
+
+    def log(self, label, sample):
+        self.log_message(f"{label}: {self.formatters[label](*sample[1:])}")
+
+    def log_message(self, message, timestamp=None):
+        wall_time = clock.time() if timestamp is None else self.wall_time + (timestamp - self.monotonic_time)
+        self.file.write(f"{telemetry_format.format_asctime(wall_time)} - {message}\n")
+        self.file.flush()
+
+    def handler(self):
+        return TelemetryLogHandler(self)
+
+    def close(self):
+        self.file.close()
+
+    def to_string(self):
+        return "Synchronous text sink"
+
+def synthetic_source(ticks, seed=0):
+    """
+    Creates a replay source of a sensor stack sitting still on the pad, with sensor noise.
+
+    :param ticks: The number of reads available per attribute.
+    :param seed: The random seed, so runs are repeatable.
+    """
+    rng = random.Random(seed)
+    count = ticks + 4  # BME688Sensor reads a ground reference on construction
+    times = [i * 0.01 for i in range(count)]
+
+    def triples(x, y, z, noise):
+        return [(x + rng.gauss(0, noise), y + rng.gauss(0, noise), z + rng.gauss(0, noise)) for _ in range(count)]
+
+    streams = {
+        ("bme688", "temperature"): (times, [23.2 + rng.gauss(0, 0.02) for _ in range(count)]),
+        ("bme688", "humidity"): (times, [44.6 + rng.gauss(0, 0.05) for _ in range(count)]),
+        ("bme688", "pressure"): (times, [1001.86 + rng.gauss(0, 0.01) for _ in range(count)]),
+        ("bme688", "gas"): (times, [20000.0 + rng.gauss(0, 500) for _ in range(count)]),
+        ("bno08x", "acceleration"): (times, triples(0.05, -9.7, -1.93, 0.02)),
+        ("bno08x", "gyro"): (times, triples(0.0, 0.0, 0.0, 0.002)),
+        ("bno08x", "magnetic"): (times, triples(6.3, 19.1, -1.5, 0.5)),
+    }
+    return backends.ReplaySource(streams, realtime=False)
+
+def create_devices(source):
+    """
+    Creates the flight stack devices on top of a replay source, with stand-in actuators.
+    """
+    gpio = backends.FakeGPIO()
+    bus = I2CBus(open=False)
+    return (BNO08XSensor(device=backends.ReplayDevice(source, "bno08x"), bus=bus),
+            BME688Sensor(device=backends.ReplayDevice(source, "bme688"), bus=bus),
+            Servo(pin=18, gpio=gpio), SolenoidController(pin=4, gpio=gpio), None)
+
+def percentile(sorted_values, fraction):
+    """
+    Returns a percentile of an already sorted list using linear interpolation.
+    """
+    if not sorted_values:
+        return 0.0
+    position = (len(sorted_values) - 1) * fraction
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+def histogram(values_ms):
+    """
+    Counts values per HISTOGRAM_EDGES_MS bucket; the last count is for values above the last edge.
+    """
+    counts = [0] * (len(HISTOGRAM_EDGES_MS) + 1)
+    for value in values_ms:
+        index = 0
+        while index < len(HISTOGRAM_EDGES_MS) and value > HISTOGRAM_EDGES_MS[index]:
+            index += 1
+        counts[index] += 1
+    return counts
+
+def summarize(values_ms):
+    """
+    Returns percentile statistics and a histogram for a list of durations in milliseconds.
+    """
+    ordered = sorted(values_ms)
+    mean = sum(ordered) / len(ordered) if ordered else 0.0
+    variance = sum((v - mean) ** 2 for v in ordered) / len(ordered) if ordered else 0.0
+    return {
+        "count": len(ordered),
+        "mean_ms": mean,
+        "stdev_ms": math.sqrt(variance),
+        "p50_ms": percentile(ordered, 0.50),
+        "p95_ms": percentile(ordered, 0.95),
+        "p99_ms": percentile(ordered, 0.99),
+        "max_ms": ordered[-1] if ordered else 0.0,
+        "histogram": histogram(ordered),
+    }
+
+def run_case(source, ticks, sink="text", prints=False, rate_hz=None, directory=None):
+    """
+    Runs log_telemetry() and poll() for a number of ticks and measures them.
+
+    :param source: The ReplaySource driving the sensors.
+    :param ticks: The number of loop iterations.
+    :param sink: "text" or "binary" for the background writer, "recorder" for the
+                 memory-mapped flight recorder, "sync" for formatting and writing on the loop thread.
+    :param prints: Run with the status display on and console output going to the
+                   terminal (True), or with the display off and stray output sent to os.devnull.
+    :param rate_hz: Pace the loop with FixedRateScheduler at this rate; None runs flat out.
+    :param directory: Where the log file is written.
+    :return: A dict of results.
+    """
+    flight_program.log_format = sink if sink in ("binary", "recorder") else "text"
+    flight_program.status_display = prints
+    flight_program.plateau_detector.reset()
+    flight_program.triggered = False
+    extension = {"binary": ".bin", "recorder": ".rec"}.get(sink, ".log")
+    filename = os.path.join(directory, f"benchmark_{sink}{extension}")
+    flight_program.setup(create_devices(source), filename=filename)
+    flight_program.stats.dump()  # Start a fresh stage timing window for this case
+    if sink == "sync":
+        writer = flight_program.telemetry_writer
+        writer.close()
+        flight_program.telemetry_writer = SyncTextSink(filename)
+
+        # Log messages go to the new sink too, not to the closed writer setup() hooked up
+        root = logging.getLogger()
+        for handler in list(root.handlers):
+            if getattr(handler, "writer", None) is writer:
+                root.removeHandler(handler)
+                root.addHandler(flight_program.telemetry_writer.handler())
+
+    latencies = []
+    starts = []
+    scheduler = FixedRateScheduler(rate_hz) if rate_hz else None
+    output = sys.stdout if prints else open(os.devnull, "w")
+
+    with contextlib.redirect_stdout(output):
+        begin = time.perf_counter()
+        if scheduler:
+            scheduler.start()
+        try:
+            for _ in range(ticks):
+                start = time.perf_counter()
+                imu_sample, sensor_sample = flight_program.log_telemetry()
+                flight_program.poll(sensor_sample.displacement, sensor_sample.timestamp)
+                latencies.append((time.perf_counter() - start) * 1000)
+                starts.append(start)
+                if scheduler:
+                    scheduler.wait()
+        except backends.ReplayFinished:
+            pass
+        elapsed = time.perf_counter() - begin
+
+        # Include the time the writer needs to get everything onto disk
+        drain_start = time.perf_counter()
+        flight_program.telemetry_writer.close()
+        drain = time.perf_counter() - drain_start
+        flight_program.status.stop()
+        flight_program.actuator.stop()
+
+    if output is not sys.stdout:
+        output.close()
+
+    periods = [(b - a) * 1000 for a, b in zip(starts, starts[1:])]
+    target_ms = 1000.0 / rate_hz if rate_hz else None
+    jitter = [abs(p - target_ms) for p in periods] if target_ms else []
+
+    return {
+        "sink": sink,
+        "prints": prints,
+        "rate_hz": rate_hz,
+        "ticks": len(latencies),
+        "elapsed_s": elapsed,
+        "throughput_hz": len(latencies) / elapsed if elapsed > 0 else 0.0,
+        "drain_ms": drain * 1000,
+        "latency": summarize(latencies),
+        "period": summarize(periods),
+        "jitter": summarize(jitter) if jitter else None,
+        "missed_deadlines": scheduler.missed_deadlines if scheduler else None,
+        "log_bytes": os.path.getsize(filename) if os.path.exists(filename) else 0,
+        "stages": flight_program.stats.dump(),
+    }
+
+def run_suite(ticks=2000, rate_hz=None, replay=None, prints=True):
+    """
+    Runs every benchmark case and returns the results.
+
+    :param ticks: The number of loop iterations per case.
+    :param rate_hz: Pace the loop at this rate to measure period jitter; None runs flat out.
+    :param replay: A recording or text log to replay instead of synthetic data.
+    :param prints: Include the print-enabled case (it writes to the terminal).
+    """
+    def source():
+        if replay is None:
+            return synthetic_source(ticks)
+        if replay.endswith(".jsonl"):
+            return backends.ReplaySource.from_recording(replay, realtime=False)
+        return backends.ReplaySource.from_text_log(replay, realtime=False)
+
+    cases = [("text", False), ("binary", False), ("recorder", False), ("sync", False)]
+    if prints:
+        cases.append(("text", True))
+
+    results = {}
+    with tempfile.TemporaryDirectory() as directory:
+        for sink, case_prints in cases:
+            name = f"{sink}-{'prints' if case_prints else 'quiet'}"
+            results[name] = run_case(source(), ticks, sink=sink, prints=case_prints, rate_hz=rate_hz, directory=directory)
+
+    # Leave logging in its default state for whoever imported us
+    logging.basicConfig(handlers=[logging.NullHandler()], force=True)
+
+    return {
+        "created": time.strftime("%Y-%m-%d %H:%M:%S"),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "node": platform.node(),
+        "ticks": ticks,
+        "rate_hz": rate_hz,
+        "source": replay or "synthetic",
+        "histogram_edges_ms": list(HISTOGRAM_EDGES_MS),
+        "cases": results,
+    }
+
+def format_results(results, baseline=None):
+    """
+    Returns a text table of the results, with the change against a baseline run if given.
+    """
+    lines = [f"{'case':<16}{'ticks':>7}{'rate Hz':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'max ms':>9}{'jitter p99':>12}"]
+    for name, case in results["cases"].items():
+        latency = case["latency"]
+        jitter = f"{case['jitter']['p99_ms']:.2f}" if case["jitter"] else "-"
+        lines.append(f"{name:<16}{case['ticks']:>7}{case['throughput_hz']:>10.1f}"
+                     f"{latency['p50_ms']:>9.3f}{latency['p95_ms']:>9.3f}{latency['p99_ms']:>9.3f}"
+                     f"{latency['max_ms']:>9.3f}{jitter:>12}")
+        if baseline and name in baseline["cases"]:
+            before = baseline["cases"][name]["latency"]["p99_ms"]
+            if before > 0:
+                lines.append(f"{'':<16}p99 vs baseline: {(latency['p99_ms'] - before) / before * 100:+.1f}%")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the flight_program acquisition/trigger loop.")
+    parser.add_argument("--ticks", type=int, default=2000, help="Loop iterations per case")
+    parser.add_argument("--rate", type=float, default=None, help="Pace the loop at this rate (Hz) to measure jitter")
+    parser.add_argument("--replay", default=None, help="Recording (.jsonl) or telemetry log to replay")
+    parser.add_argument("--no-prints", action="store_true", help="Skip the print-enabled case")
+    parser.add_argument("--output", default=None, help="Results file (defaults to bench_results/benchmark_<time>.json)")
+    parser.add_argument("--compare", default=None, help="Earlier results file to compare against")
+    parser.add_argument("--max-p99-ms", type=float, default=None, help="Exit with status 1 if a quiet case's p99 latency exceeds this")
+    args = parser.parse_args()
+
+    results = run_suite(ticks=args.ticks, rate_hz=args.rate, replay=args.replay, prints=not args.no_prints)
+
+    output = args.output or os.path.join("bench_results", time.strftime("benchmark_%Y-%m-%d_%H-%M-%S.json"))
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2)
+
+    baseline = None
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    print(format_results(results, baseline))
+    print(f"Results saved to {output}")
+
+    if args.max_p99_ms is not None:
+        worst = max(case["latency"]["p99_ms"] for case in results["cases"].values() if not case["prints"])
+        if worst > args.max_p99_ms:
+            print(f"FAIL: p99 latency {worst:.3f} ms exceeds {args.max_p99_ms:.3f} ms")
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
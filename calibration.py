@@ -0,0 +1,108 @@
+import os
+import json
+import math
+import time
+
+class CalibrationCache:
+    def __init__(self, filename="sli/calibration.json", max_age=3600, pressure_tolerance=0.5,
+                 gravity_tolerance=0.2, angle_tolerance=3.0):
+        """
+        Initializes a file cache of the ground pressure and IMU calibrations, so a restart on
+        the pad can reuse them after one confirming reading instead of recalibrating.
+
+        An entry is reused only while it is younger than max_age and a fresh reading still
+        agrees with it: the pressure within pressure_tolerance, and the acceleration at
+        rest within gravity_tolerance in size and angle_tolerance in direction.
+
+        :param filename: The path of the JSON cache file.
+        :param max_age: The longest time in seconds an entry stays valid.
+        :param pressure_tolerance: The largest ground pressure change in hPa (0.5 hPa is about 4 m).
+        :param gravity_tolerance: The largest change of the measured gravity in m/s².
+        :param angle_tolerance: The largest tilt in degrees since the IMU was calibrated.
+        """
+        self.filename = filename
+        self.max_age = max_age
+        self.pressure_tolerance = pressure_tolerance
+        self.gravity_tolerance = gravity_tolerance
+        self.angle_tolerance = angle_tolerance
+        self.entries = self.load()
+
+    def load(self):
+        """
+        Returns the cached entries, or an empty dict if the file is missing or unreadable.
+        """
+        try:
+            with open(self.filename, encoding="utf-8") as f:
+                entries = json.load(f)
+            return entries if isinstance(entries, dict) else {}
+        except (OSError, ValueError):
+            return {}
+
+    def save(self, name, **values):
+        """
+        Stores one entry with the current time and writes the file atomically.
+
+        :param name: The entry name, "ground" or "imu".
+        :param values: The calibration values.
+        """
+        self.entries[name] = dict(values, created=time.time())
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = self.filename + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump(self.entries, f)
+        os.replace(temporary, self.filename)
+
+    def _fresh(self, name):
+        entry = self.entries.get(name)
+        if entry is None or not 0 <= time.time() - entry.get("created", 0) <= self.max_age:
+            return None
+        return entry
+
+    def ground(self, pressure):
+        """
+        Returns the cached (pressure, temperature) ground reference if a current pressure
+        reading confirms it, otherwise None.
+        """
+        entry = self._fresh("ground")
+        if entry is None or abs(entry["pressure"] - pressure) > self.pressure_tolerance:
+            return None
+        return entry["pressure"], entry["temperature"]
+
+    def imu(self, accel_x, accel_y, accel_z):
+        """
+        Returns the cached (up, gravity) IMU calibration if a current acceleration reading
+        at rest confirms it, otherwise None.
+        """
+        entry = self._fresh("imu")
+        if entry is None:
+            return None
+        magnitude = math.sqrt(accel_x * accel_x + accel_y * accel_y + accel_z * accel_z)
+        if magnitude == 0 or abs(magnitude - entry["gravity"]) > self.gravity_tolerance:
+            return None
+        up_x, up_y, up_z = entry["up"]
+        cosine = (accel_x * up_x + accel_y * up_y + accel_z * up_z) / magnitude
+        if math.degrees(math.acos(max(-1.0, min(1.0, cosine)))) > self.angle_tolerance:
+            return None
+        return tuple(entry["up"]), entry["gravity"]
+
+    def to_string(self):
+        """
+        Returns a string representation of the cached entries and their age.
+        """
+        now = time.time()
+        parts = [f"{name}: {now - entry.get('created', 0):.0f} s old" for name, entry in self.entries.items()]
+        return f"{self.filename}: {', '.join(parts) or 'empty'}"
+
+# Example usage
+if __name__ == "__main__":
+    cache = CalibrationCache("/tmp/calibration_example.json")
+    cache.save("ground", pressure=1001.86, temperature=23.2)
+    cache.save("imu", up=(0.0, -0.9817, -0.1905), gravity=9.87)
+
+    print(cache.to_string())
+    print(f"Ground at 1001.9 hPa: {cache.ground(1001.9)}")
+    print(f"Ground at 1000.0 hPa: {cache.ground(1000.0)}")
+    print(f"IMU at rest: {cache.imu(0.0, -9.69, -1.88)}")
+    print(f"IMU tilted: {cache.imu(3.0, -9.2, -1.88)}")
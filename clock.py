@@ -0,0 +1,170 @@
+import time as _time
+import logging
+import threading
+
+class SystemClock:
+    """
+    The real clocks; the default.
+    """
+    monotonic = staticmethod(_time.monotonic)
+    perf_counter = staticmethod(_time.perf_counter)
+    time = staticmethod(_time.time)
+    sleep = staticmethod(_time.sleep)
+
+    def wait(self, event, timeout):
+        """
+        Waits for event for at most timeout seconds, like event.wait(timeout).
+        """
+        return event.wait(timeout)
+
+class SimulatedClock:
+    def __init__(self, start=0.0, wall_time=None):
+        """
+        Initializes a simulated clock that advances only when told to, so a flight
+        runs as fast as the code allows and every run sees the same times.
+
+        The thread that creates the clock drives it: its sleeps advance the time at
+        once. Other threads' sleeps and waits block until the driving thread has
+        advanced the time past their deadline. Before each step the driving thread
+        waits until every other thread that uses the clock is blocked in a wait again,
+        and a step stops at each of their deadlines on the way, so they run at exactly
+        the simulated time they asked for, however the threads are scheduled.
+
+        :param start: The initial monotonic time in seconds.
+        :param wall_time: The wall-clock time at start, in seconds since the epoch (defaults to now).
+        """
+        self.now = start
+        self.epoch = (_time.time() if wall_time is None else wall_time) - start
+        self.driver = threading.get_ident()
+        self.handoff_timeout = 10.0  # Real seconds another thread may run between two waits
+        self._condition = threading.Condition()
+        self._threads = set()  # Other threads that have waited on the clock
+        self._waits = {}  # Thread -> (deadline, event) while it waits
+
+    def monotonic(self):
+        return self.now
+
+    def perf_counter(self):
+        return self.now
+
+    def time(self):
+        return self.epoch + self.now
+
+    def _blocked(self, deadline, event):
+        return self.now < deadline and not (event is not None and event.is_set())
+
+    def _settle(self):
+        # Waits, holding the condition, until every other thread is blocked in a wait or has ended
+        limit = _time.monotonic() + self.handoff_timeout
+        while True:
+            self._threads = {thread for thread in self._threads if thread.is_alive()}
+            running = [thread for thread in self._threads
+                       if thread not in self._waits or not self._blocked(*self._waits[thread])]
+            if not running:
+                return
+            if _time.monotonic() > limit:
+                names = ", ".join(thread.name for thread in running)
+                raise RuntimeError(f"Threads did not return to the simulated clock within "
+                                   f"{self.handoff_timeout} s: {names}")
+            self._condition.wait(0.001)
+
+    def advance(self, seconds):
+        """
+        Moves the time forward, stopping at every deadline of the waiting threads on the way.
+        """
+        with self._condition:
+            target = self.now + seconds
+            while True:
+                self._settle()
+                deadlines = [deadline for deadline, event in self._waits.values() if deadline < target]
+                self.now = min(deadlines, default=target)
+                self._condition.notify_all()
+                if self.now >= target:
+                    self._settle()
+                    return
+
+    def sleep(self, seconds):
+        if threading.get_ident() == self.driver:
+            self.advance(max(0.0, seconds))
+        else:
+            self.wait(None, seconds)
+
+    def wait(self, event, timeout):
+        """
+        Waits for event for at most timeout simulated seconds.
+
+        :param event: A threading.Event, or None to wait for the time only.
+        :return: True if the event is set.
+        """
+        if event is not None and event.is_set():
+            return True
+        if threading.get_ident() == self.driver:
+            self.advance(max(0.0, timeout))
+        else:
+            thread = threading.current_thread()
+            with self._condition:
+                self._threads.add(thread)
+                deadline = self.now + timeout
+                self._waits[thread] = (deadline, event)
+                self._condition.notify_all()  # The driving thread may be waiting for this one
+                try:
+                    # Setting an event does not notify the condition; a short real timeout notices it
+                    while self._blocked(deadline, event):
+                        self._condition.wait(None if event is None else 0.001)
+                finally:
+                    del self._waits[thread]
+        return event is not None and event.is_set()
+
+# The clock every module reads through the functions below
+_clock = SystemClock()
+_record_factory = logging.getLogRecordFactory()
+
+def _simulated_record(*args, **kwargs):
+    # Log records take their creation time from the clock, so log timestamps match the samples'
+    record = _record_factory(*args, **kwargs)
+    record.created = _clock.time()
+    record.msecs = (record.created - int(record.created)) * 1000
+    return record
+
+def use(clock):
+    """
+    Makes clock the time source of the flight stack and of log record timestamps.
+
+    :param clock: A SystemClock or SimulatedClock.
+    :return: The clock used before, to restore afterwards.
+    """
+    global _clock
+    previous = _clock
+    _clock = clock
+    logging.setLogRecordFactory(_record_factory if isinstance(clock, SystemClock) else _simulated_record)
+    return previous
+
+def current():
+    """
+    Returns the clock in use.
+    """
+    return _clock
+
+def monotonic():
+    return _clock.monotonic()
+
+def perf_counter():
+    return _clock.perf_counter()
+
+def time():
+    return _clock.time()
+
+def sleep(seconds):
+    _clock.sleep(seconds)
+
+def wait(event, timeout):
+    return _clock.wait(event, timeout)
+
+# Example usage
+if __name__ == "__main__":
+    start = _time.perf_counter()
+    previous = use(SimulatedClock())
+    for _ in range(1200):
+        sleep(1.0)  # Twenty simulated minutes
+    print(f"Simulated {monotonic():.0f} s in {(_time.perf_counter() - start) * 1000:.1f} ms")
+    use(previous)
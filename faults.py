@@ -0,0 +1,137 @@
+import clock
+import logging
+import threading
+
+class SensorGuard:
+    def __init__(self, name, reinitialize=None, retry_budget=0.002, backoff=0.00005,
+                 failure_threshold=5, reinit_interval=1.0, exceptions=(RuntimeError, OSError)):
+        """
+        Initializes the fault handling of one sensor.
+
+        call() retries a failed read with exponential backoff, starting at microseconds,
+        for at most retry_budget seconds, so a glitch costs a fraction of a loop tick.
+        After failure_threshold failed calls in a row, the device is reinitialized on a
+        background thread; calls return None straight away until that succeeds.
+
+        :param name: The sensor name, e.g. "bno08x".
+        :param reinitialize: A callable that reopens the device, or None if it cannot be reopened.
+        :param retry_budget: The longest time in seconds one call keeps retrying.
+        :param backoff: The first delay between retries in seconds; it doubles per retry.
+        :param failure_threshold: Failed calls in a row before reinitializing.
+        :param reinit_interval: The delay in seconds between reinitialization attempts.
+        :param exceptions: The exception types that count as a read failure.
+        """
+        self.name = name
+        self.reinitialize = reinitialize
+        self.retry_budget = retry_budget
+        self.backoff = backoff
+        self.failure_threshold = failure_threshold
+        self.reinit_interval = reinit_interval
+        self.exceptions = exceptions
+
+        # Error counters
+        self.calls = 0
+        self.errors = 0  # Every exception, including ones a retry recovered from
+        self.retries = 0
+        self.failures = 0  # Calls that gave up and returned None
+        self.consecutive_failures = 0
+        self.reinitializations = 0
+        self.last_error = None
+
+        self.reinitializing = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def call(self, read):
+        """
+        Calls read(), retrying within the time budget.
+
+        :param read: A callable performing one device read.
+        :return: What read() returned, or None if it kept failing or the device is being reinitialized.
+        """
+        self.calls += 1
+        if self.reinitializing.is_set():
+            self.failures += 1
+            return None
+
+        deadline = clock.perf_counter() + self.retry_budget
+        delay = self.backoff
+        while True:
+            try:
+                result = read()
+                self.consecutive_failures = 0
+                return result
+            except self.exceptions as e:
+                self.errors += 1
+                self.last_error = e
+            if clock.perf_counter() + delay > deadline:
+                break
+            clock.sleep(delay)
+            delay *= 2
+            self.retries += 1
+
+        self.failures += 1
+        self.consecutive_failures += 1
+        if self.consecutive_failures >= self.failure_threshold and self.reinitialize is not None:
+            self.start_reinitialize()
+        return None
+
+    def start_reinitialize(self):
+        """
+        Starts reopening the device on a background thread, unless that is already running.
+        """
+        if self.reinitializing.is_set() or self._stop_event.is_set():
+            return
+        self.reinitializing.set()
+        logging.warning(f"{self.name}: {self.consecutive_failures} failed reads ({self.last_error}), reinitializing")
+        self._thread = threading.Thread(target=self._reinitialize, name=f"{self.name}-reinit", daemon=True)
+        self._thread.start()
+
+    def _reinitialize(self):
+        while not self._stop_event.is_set():
+            try:
+                self.reinitialize()
+                self.reinitializations += 1
+                self.consecutive_failures = 0
+                logging.warning(f"{self.name}: reinitialized")
+                break
+            except Exception as e:  # Keep trying whatever the driver raises
+                self.last_error = e
+                self._stop_event.wait(self.reinit_interval)
+        self.reinitializing.clear()
+
+    def stop(self):
+        """
+        Stops any background reinitialization.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+
+    def to_string(self):
+        """
+        Returns a string representation of the error counters.
+        """
+        state = "Reinitializing" if self.reinitializing.is_set() else "OK"
+        return (f"{self.name}: {state}, Calls: {self.calls}, Errors: {self.errors}, "
+                f"Retries: {self.retries}, Failed Calls: {self.failures}, "
+                f"Reinitializations: {self.reinitializations}, Last Error: {self.last_error}")
+
+# Example usage
+if __name__ == "__main__":
+    attempts = [0]
+
+    def flaky_read():
+        # Fails twice out of three calls
+        attempts[0] += 1
+        if attempts[0] % 3:
+            raise OSError("I2C glitch")
+        return attempts[0]
+
+    guard = SensorGuard("demo", reinitialize=lambda: print("Reinitialized"), retry_budget=0.0005)
+    start = clock.perf_counter()
+    results = [guard.call(flaky_read) for _ in range(1000)]
+    elapsed = clock.perf_counter() - start
+    print(f"{sum(r is not None for r in results)} of {len(results)} calls succeeded in {elapsed * 1000:.1f} ms")
+    print(guard.to_string())
+    guard.stop()
@@ -0,0 +1,231 @@
+import os
+import sys
+import json
+import math
+import time
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from log_loader import find_logs, read_log
+from plateau import first_plateau, plateau_config
+
+# Bumped whenever a summary changes shape or meaning, which invalidates the cache
+ANALYTICS_VERSION = 3
+
+def _rate(times):
+    """
+    Returns the average rate in Hz of a series of sample times.
+    """
+    if len(times) < 2 or times[-1] == times[0]:
+        return 0.0
+    return (len(times) - 1) / (times[-1] - times[0])
+
+def _stdev(values):
+    """
+    Returns the standard deviation of the finite values, or NaN if there are fewer than two.
+    """
+    values = values[np.isfinite(values)]
+    return float(np.std(values)) if len(values) > 1 else math.nan
+
+def summarize_flight(path, plateau_config=None, gap_factor=3.0, noise_window=2.0):
+    """
+    Summarizes one telemetry log.
+
+    :param path: The path of a telemetry_log_* file, text or binary.
+    :param plateau_config: PlateauDetector settings to replay poll()'s plateau condition with.
+    :param gap_factor: A sensor interval longer than this many median intervals counts as a gap.
+    :param noise_window: Seconds from the start of the log, on the pad, used for the IMU noise.
+    :return: A dict of JSON-compatible summary values, None where a log has no data for
+             one; times are seconds since the first sample.
+    """
+    imu, sensor, events = read_log(path)
+    sensor_times = sensor["time"]
+    imu_times = imu["time"]
+    starts = [t[0] for t in (sensor_times, imu_times) if len(t)]
+    ends = [t[-1] for t in (sensor_times, imu_times) if len(t)]
+    start = min(starts) if starts else math.nan
+
+    summary = {
+        "file": path,
+        "start": start,
+        "duration": max(ends) - start if ends else 0.0,
+        "sensor_samples": len(sensor_times),
+        "imu_samples": len(imu_times),
+        "sensor_rate": _rate(sensor_times),
+        "imu_rate": _rate(imu_times),
+    }
+
+    # Gaps: intervals much longer than the usual one
+    intervals = np.diff(sensor_times)
+    if len(intervals):
+        median = float(np.median(intervals))
+        summary["median_interval"] = median
+        summary["gaps"] = int(np.count_nonzero(intervals > gap_factor * median)) if median > 0 else 0
+        summary["max_gap"] = float(intervals.max())
+    else:
+        summary.update(median_interval=math.nan, gaps=0, max_gap=math.nan)
+
+    displacement = sensor["displacement"]
+    finite = np.isfinite(displacement)
+    summary["max_displacement"] = float(displacement[finite].max()) if finite.any() else math.nan
+
+    # When poll() would have fired: the same detector over the logged sensor samples
+    plateau_time = first_plateau(sensor_times[finite].tolist(), displacement[finite].tolist(), **(plateau_config or {}))
+    summary["plateau_time"] = plateau_time - start if plateau_time is not None else None
+
+    # IMU noise on the pad, before anything moves
+    at_rest = imu_times <= (imu_times[0] + noise_window) if len(imu_times) else np.zeros(0, dtype=bool)
+    for field in ("accel_x", "accel_y", "accel_z", "gyro_x", "gyro_y", "gyro_z"):
+        summary[f"{field}_stdev"] = _stdev(imu[field][at_rest])
+    summary["accel_noise"] = math.sqrt(sum(summary[f"accel_{axis}_stdev"] ** 2 for axis in "xyz"))
+    summary["gyro_noise"] = math.sqrt(sum(summary[f"gyro_{axis}_stdev"] ** 2 for axis in "xyz"))
+
+    messages = events["message"]
+    summary["sampling_start"] = any("Sampling Start" in message for message in messages)
+    summary["sampling_end"] = any("Sampling End" in message for message in messages)
+
+    # Missing values as null, so the summary is strict JSON
+    return {name: None if isinstance(value, float) and math.isnan(value) else value for name, value in summary.items()}
+
+class AnalyticsCache:
+    def __init__(self, filename="sli/analytics_cache.json", config=None):
+        """
+        Initializes a file cache of flight summaries, keyed by each log's path, size and
+        modification time, so a rerun only analyzes new or changed logs.
+
+        :param filename: The path of the JSON cache file.
+        :param config: The analysis settings; entries made with other settings are not reused.
+        """
+        self.filename = filename
+        self.config = config or {}
+        self.entries = self.load()
+        self.changed = False
+
+    def load(self):
+        """
+        Returns the cached entries, or an empty dict if the file is missing, unreadable
+        or was written by another version or configuration.
+        """
+        try:
+            with open(self.filename, encoding="utf-8") as f:
+                cache = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(cache, dict) or cache.get("version") != ANALYTICS_VERSION or cache.get("config") != self.config:
+            return {}
+        return cache.get("entries", {})
+
+    @staticmethod
+    def key(path):
+        stat = os.stat(path)
+        return [stat.st_size, stat.st_mtime_ns]
+
+    def get(self, path):
+        """
+        Returns the cached summary of a log, or None if it is missing or the log changed.
+        """
+        entry = self.entries.get(os.path.abspath(path))
+        if entry is None or entry["key"] != self.key(path):
+            return None
+        return entry["summary"]
+
+    def put(self, path, summary):
+        self.entries[os.path.abspath(path)] = {"key": self.key(path), "summary": summary}
+        self.changed = True
+
+    def save(self):
+        """
+        Writes the cache file atomically if anything changed.
+        """
+        if not self.changed:
+            return
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = self.filename + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"version": ANALYTICS_VERSION, "config": self.config, "entries": self.entries}, f)
+        os.replace(temporary, self.filename)
+        self.changed = False
+
+def _summarize(arguments):
+    path, config = arguments
+    return summarize_flight(path, **config)
+
+def analyze(paths=("logs", "sli/logs"), config=None, cache=None, workers=None):
+    """
+    Summarizes every telemetry log in the given files and directories, in parallel.
+
+    :param paths: Files and/or directories to analyze.
+    :param config: Keyword arguments for summarize_flight.
+    :param cache: An AnalyticsCache, or None to analyze every log.
+    :param workers: The number of worker processes (defaults to the number of cores).
+    :return: A list of summaries in log order.
+    """
+    config = config or {}
+    files = find_logs(paths)
+    summaries = {path: cache.get(path) if cache else None for path in files}
+    pending = [path for path in files if summaries[path] is None]
+
+    if len(pending) == 1 or workers == 1:
+        results = [_summarize((path, config)) for path in pending]
+    elif pending:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(_summarize, [(path, config) for path in pending]))
+    else:
+        results = []
+
+    for path, summary in zip(pending, results):
+        summaries[path] = summary
+        if cache:
+            cache.put(path, summary)
+    if cache:
+        cache.save()
+    return [summaries[path] for path in files]
+
+def _cell(value, digits):
+    if value is None:
+        return "-"
+    return f"{value:.{digits}f}"
+
+def format_table(summaries):
+    """
+    Returns a text table with one row per flight.
+    """
+    lines = [f"{'log':<40}{'dur s':>8}{'baro Hz':>9}{'imu Hz':>8}{'gaps':>6}{'max gap':>9}"
+             f"{'max m':>9}{'plateau s':>11}{'acc noise':>11}{'gyro noise':>12}{'markers':>9}"]
+    for summary in summaries:
+        markers = ("S" if summary["sampling_start"] else "-") + ("E" if summary["sampling_end"] else "-")
+        lines.append(f"{os.path.basename(summary['file'])[:39]:<40}{_cell(summary['duration'], 1):>8}"
+                     f"{_cell(summary['sensor_rate'], 1):>9}{_cell(summary['imu_rate'], 1):>8}"
+                     f"{summary['gaps']:>6}{_cell(summary['max_gap'], 2):>9}"
+                     f"{_cell(summary['max_displacement'], 2):>9}{_cell(summary['plateau_time'], 1):>11}"
+                     f"{_cell(summary['accel_noise'], 4):>11}{_cell(summary['gyro_noise'], 4):>12}{markers:>9}")
+    return "\n".join(lines)
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize every flight log in parallel.")
+    parser.add_argument("paths", nargs="*", default=["logs", "sli/logs"], help="Log files and/or directories")
+    parser.add_argument("--json", action="store_true", help="Print JSON instead of a table")
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes (defaults to the number of cores)")
+    parser.add_argument("--cache", default="sli/analytics_cache.json", help="Summary cache file")
+    parser.add_argument("--no-cache", action="store_true", help="Analyze every log again and leave the cache alone")
+    parser.add_argument("--gap-factor", type=float, default=3.0, help="Median intervals that make a gap")
+    parser.add_argument("--noise-window", type=float, default=2.0, help="Seconds at the start used for IMU noise")
+    args = parser.parse_args()
+
+    config = {"plateau_config": plateau_config(), "gap_factor": args.gap_factor, "noise_window": args.noise_window}
+    cache = None if args.no_cache else AnalyticsCache(args.cache, config)
+
+    start = time.perf_counter()
+    summaries = analyze(args.paths, config, cache, args.workers)
+    elapsed = time.perf_counter() - start
+
+    if args.json:
+        print(json.dumps(summaries, indent=2))
+    else:
+        print(format_table(summaries))
+    print(f"{len(summaries)} logs in {elapsed * 1000:.1f} ms", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
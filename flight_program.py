@@ -1,71 +1,315 @@
-import time
+import gc
+import math
+import clock
 import os
+import queue
+import signal
 import threading
-from imu import BNO08XSensor  # Import the IMU sensor class
-from sensor import BME688Sensor  # Import the sensor class
-from servo import Servo
-from solenoid import SolenoidController
+import multiprocessing
+import logging.handlers
+import backends
+import telemetry_format
+from scheduler import FixedRateScheduler
+from acquisition import SensorSampler, SharedRingBuffer
+from telemetry_writer import TelemetryWriter
+from flight_recorder import FlightRecorder
+from telemetry_stream import TelemetryPublisher
+from instrumentation import stats
+from status_display import StatusDisplay
+from actuation import ActuationScheduler, sampling_sequence
+from plateau import PlateauDetector, FLIGHT_SETTINGS
+from fusion import AltitudeEstimator
+from samples import STATUS_OK
+from calibration import CalibrationCache
 import logging
 from datetime import datetime
 
 collection_period = 1
-collection_range_maximum = 300
-collection_range_minimum = 100
-plateau_count = 0
-plateau_threshold = 7
+# Plateau trigger settings; change them in plateau.FLIGHT_SETTINGS so the tools use them too
+collection_range_maximum = FLIGHT_SETTINGS["maximum"]
+collection_range_minimum = FLIGHT_SETTINGS["minimum"]
+plateau_window = FLIGHT_SETTINGS["window"]  # Seconds the displacement must hold steady in range before sampling
+plateau_max_stdev = FLIGHT_SETTINGS["max_stdev"]  # Largest displacement spread in meters over the window
+plateau_max_speed = FLIGHT_SETTINGS["max_speed"]  # Largest vertical speed in m/s over the window
+plateau_hold = FLIGHT_SETTINGS["hold"]  # Seconds the criteria must keep holding before sampling
 triggered = False
+trigger_time = None  # Monotonic time of the sample that started the sampling
+trigger_source = "barometer"  # "barometer" for the displacement alone, "fusion" for the IMU/barometer estimate
+fusion_accel_noise = 0.5  # Vertical acceleration noise in m/s² assumed by the fusion estimator
+fusion_baro_noise = 1.0  # Barometric altitude noise in meters assumed by the fusion estimator
+calibration_samples = 50  # IMU samples averaged at rest to find the vertical axis
+ground_samples = 5  # Barometer samples averaged into the ground reference
+calibration_file = "sli/calibration.json"  # Ground and IMU calibrations reused across restarts on the pad
+calibration_max_age = 3600  # Seconds a cached calibration stays valid
+loop_rate = 5  # Telemetry/poll loop rate in Hz
+overrun_policy = "skip"  # "skip" or "catch_up" when a tick overruns its deadline
+execution_mode = "sequential"  # "sequential", "parallel" or "isolated" (acquisition and trigger in their own process)
+imu_rate = 100  # IMU sampling rate in Hz (parallel execution)
+imu_extra_features = ()  # Optional BNO08X reports: "quaternion", "linear_acceleration"
+imu_report_intervals = None  # BNO08X report interval in microseconds per feature (default 10000, 100 Hz)
+sensor_rate = 10  # BME688 sampling rate in Hz, capped by its measurement time (parallel execution)
+isolated_capacity = 1024  # Samples per shared ring buffer from the acquisition process to the I/O process (isolated execution)
+sensor_profile = "flight"  # BME688 profile: "flight" (pressure/temperature, ~68 Hz capable) or "full" (adds humidity and gas)
+log_flush_interval = 0.5  # Maximum time in seconds between telemetry log flushes
+log_queue_size = 4096  # Pending telemetry records before new ones are dropped
+log_format = "text"  # "text" for the readable log, "binary" for fixed-width records (see telemetry_format.py),
+                    # "recorder" for a crash-safe ring buffer of the latest records (see flight_recorder.py)
+stream_address = None  # Live telemetry to a ground station: ("192.168.4.2", 5005) for UDP or a local socket path; None is off
+stream_rate = 20  # Datagrams per second at most from the live telemetry publisher (see telemetry_stream.py)
+recorder_capacity = 65536  # Records kept by the flight recorder, 3 MB; about 10 minutes at 100 Hz IMU + 10 Hz sensor
+stop_event = threading.Event()
+backend = backends.BACKEND_HARDWARE  # "hardware", "record" or "replay" (see backends.py)
+recording_file = None  # File written in record mode (defaults to a timestamped name)
+replay_file = None  # Recording (.jsonl) or telemetry_log_*.log replayed in replay mode
+replay_realtime = True  # Replay at recorded speed (True) or as fast as possible (False)
+i2c_frequency = 100000  # Shared I2C bus clock in Hz (on the Pi, set by dtparam=i2c_arm_baudrate)
+sensor_retry_budget = 0.002  # Seconds a failed sensor read keeps retrying; keep well under one tick
+sensor_failure_threshold = 5  # Failed reads in a row before a sensor is reinitialized in the background
+stats_interval = 10  # Seconds between stage timing dumps into the telemetry log
+status_display = True  # Show a console status display; turn off for flight
+status_rate = 2  # Maximum status display refreshes per second
+enqueue_timer = stats.stage("log.enqueue")
+poll_timer = stats.stage("poll")
+status_format_timer = stats.stage("status.format")  # The status thread's own; a StageTimer is one thread's
 
-# Global objects for IMU and Sensor
-imu = BNO08XSensor()  # Instantiate IMU sensor
-sensor = BME688Sensor()  # Instantiate the BME688 sensor
-servo = Servo(pin=18)
-solenoid = SolenoidController(pin=4)
+# Global objects for IMU, Sensor and actuators, created by setup()
+imu = None
+sensor = None
+servo = None
+solenoid = None
+recorder = None
+telemetry_writer = None
+publisher = None  # Live telemetry publisher when stream_address is set
+log_filename = None
+status = None
+actuator = None
+sampling = None  # The sampling ActuationSequence once triggered
+scheduler = FixedRateScheduler(rate_hz=loop_rate, overrun_policy=overrun_policy)
+plateau_detector = PlateauDetector(window=plateau_window, minimum=collection_range_minimum,
+                                   maximum=collection_range_maximum, max_stdev=plateau_max_stdev,
+                                   max_speed=plateau_max_speed, hold=plateau_hold)
+estimator = AltitudeEstimator(accel_noise=fusion_accel_noise, baro_noise=fusion_baro_noise)
 
-# Ensure the 'logs' directory exists
 log_directory = 'sli/logs'
-if not os.path.exists(log_directory):
-    os.makedirs(log_directory)
+log_separator = "-----------------------------------------------------------------------------------------------"
 
-# Set up logging configuration
-log_filename = os.path.join(log_directory, datetime.now().strftime("telemetry_log_%Y-%m-%d_%H-%M-%S.log"))
-logging.basicConfig(filename=log_filename, level=logging.INFO, format='%(asctime)s - %(message)s')
+def setup(devices=None, filename=None):
+    """
+    Creates the devices for the configured backend and starts the telemetry log writer.
+
+    :param devices: A tuple (imu, sensor, servo, solenoid, recorder) to use instead of
+                    creating them with backends.create_devices, e.g. for benchmarks.
+    :param filename: The telemetry log path (defaults to a timestamped file in log_directory).
+    """
+    global imu, sensor, servo, solenoid, recorder, telemetry_writer, publisher, log_filename, status, actuator
+
+    # Real or stand-in devices depending on the backend
+    if devices is None:
+        devices = backends.create_devices(backend, recording=recording_file,
+                                          replay=replay_file, realtime=replay_realtime,
+                                          i2c_frequency=i2c_frequency, sensor_profile=sensor_profile,
+                                          imu_extra_features=imu_extra_features,
+                                          imu_report_intervals=imu_report_intervals)
+    imu, sensor, servo, solenoid, recorder = devices
+    for device in (imu, sensor):
+        device.guard.retry_budget = sensor_retry_budget
+        device.guard.failure_threshold = sensor_failure_threshold
+
+    # Ensure the 'logs' directory exists
+    if filename is None:
+        if not os.path.exists(log_directory):
+            os.makedirs(log_directory)
+        log_extension = {"binary": ".bin", "recorder": ".rec"}.get(log_format, ".log")
+        filename = os.path.join(log_directory, datetime.now().strftime("telemetry_log_%Y-%m-%d_%H-%M-%S") + log_extension)
+    log_filename = filename
+
+    # Set up logging configuration; records are formatted and written on a background thread,
+    # or packed straight into the memory-mapped flight recorder
+    if log_format == "recorder":
+        telemetry_writer = FlightRecorder(log_filename, capacity=recorder_capacity, sync_interval=log_flush_interval)
+    else:
+        telemetry_writer = TelemetryWriter(log_filename,
+                                           formatters={"IMU Telemetry": imu.format_data, "Sensor Telemetry": sensor.format_data},
+                                           flush_interval=log_flush_interval, max_queue=log_queue_size,
+                                           binary=(log_format == "binary"))
+    handlers = [telemetry_writer.handler()]
+
+    # Optional live stream; it drops records rather than ever blocking the loop
+    publisher = None
+    if stream_address is not None:
+        publisher = TelemetryPublisher(stream_address, rate_hz=stream_rate)
+        handlers.append(publisher.handler())
+    logging.basicConfig(level=logging.INFO, handlers=handlers, force=True)
+
+    # Console output is rendered off the hot path from the latest values
+    status = StatusDisplay(render_status, rate_hz=status_rate, enabled=status_display)
+
+    # Actuation sequences run on their own thread so sampling never pauses the loop
+    actuator = ActuationScheduler(on_complete=log_actuation)
+
+def render_status(snapshot):
+    """
+    Returns the console status text for the latest snapshot of the flight loop.
+    """
+    lines = ["----------------------------------"]
+    if "imu" in snapshot:
+        lines.append(f"IMU: {imu.format_data(snapshot['imu'], status_format_timer)}")
+    if "sensor" in snapshot:
+        lines.append(f"Sensor: {sensor.format_data(snapshot['sensor'], status_format_timer)}")
+    for name, device in (("IMU", imu), ("Sensor", sensor)):
+        if device.guard.errors:
+            lines.append(f"{name} Faults: {device.guard.to_string()}")
+    if trigger_source == "fusion":
+        lines.append(f"Fusion: {estimator.to_string()}")
+    if "plateau" in snapshot:
+        lines.append(f"Plateau: {snapshot['plateau']}")
+    lines.append(f"Triggered: {snapshot.get('triggered', False)}, Missed Deadlines: {scheduler.missed_deadlines}")
+    if "actuation" in snapshot:
+        lines.append(f"Actuation: {snapshot['actuation']}")
+    return "\n".join(lines)
 
 def log_telemetry():
     """
-    Logs telemetry data from both the IMU and the sensor to the log file.
+    Reads both the IMU and the sensor and queues the samples for the log file.
+
+    :return: A tuple (imu_sample, sensor_sample). If a read failed, its sample is marked
+             stale or substituted (see samples.py) and is not logged.
     """
     # Get the telemetry data from both IMU and sensor
-    imu_data = imu.to_string()  # Get string representation of IMU data
-    sensor_data = sensor.to_string()  # Get string representation of Sensor data
+    imu_sample = imu.read_data()
+    sensor_sample = sensor.read_data()
 
-    # Log the telemetry data
-    logging.info(f"IMU Telemetry: {imu_data}")  # Log the IMU data
-    logging.info(f"Sensor Telemetry: {sensor_data}")  # Log the sensor data
-    logging.info("-----------------------------------------------------------------------------------------------")
+    # Queue the samples; formatting happens on the writer thread
+    with enqueue_timer:
+        if imu_sample.status == STATUS_OK:
+            telemetry_writer.log("IMU Telemetry", imu_sample)
+            if publisher is not None:
+                publisher.log("IMU Telemetry", imu_sample)
+        status.set("imu", imu_sample)
+        if sensor_sample.status == STATUS_OK:
+            telemetry_writer.log("Sensor Telemetry", sensor_sample)
+            if publisher is not None:
+                publisher.log("Sensor Telemetry", sensor_sample)
+        telemetry_writer.log_message(log_separator)
+        status.set("sensor", sensor_sample)
 
-def poll():
+    return imu_sample, sensor_sample
 
-    global plateau_count, plateau_threshold,  collection_period, collection_range_maximum, collection_range_minimum, triggered
+def log_stats():
+    """
+    Writes the stage timings of the last stats_interval seconds into the telemetry log when due.
+    """
+    if stats.due(stats_interval):
+        logging.info(f"Stage Timing: {stats.dump()}")
 
-    if plateau_count >= plateau_threshold and not triggered:
-        sample()
-        triggered = True
+def calibrate_ground(cache=None):
+    """
+    Sets the ground reference from averaged barometer samples, or from the calibration
+    cache if the start-up reading confirms it.
+
+    :param cache: A CalibrationCache, or None to always calibrate.
+    """
+    cached = cache.ground(sensor.init_pressure) if cache is not None else None
+    if cached is not None:
+        sensor.set_ground(*cached)
+        logging.info(f"Ground Calibration: Cached, Pressure: {cached[0]:.2f} hPa, Temperature: {cached[1]:.2f} C")
+        return
+
+    readings = [sensor.read_data() for _ in range(ground_samples)]
+    readings = [r for r in readings if r.status == STATUS_OK]
+    if not readings:
+        return  # Keep the start-up reading
+    pressure = sum(r.pressure for r in readings) / len(readings)
+    temperature = sum(r.temperature for r in readings) / len(readings)
+    sensor.set_ground(pressure, temperature)
+    if cache is not None:
+        cache.save("ground", pressure=pressure, temperature=temperature)
+    logging.info(f"Ground Calibration: {len(readings)} samples, Pressure: {pressure:.2f} hPa, Temperature: {temperature:.2f} C")
 
-    if sensor.calculate_displacement() <= collection_range_maximum and sensor.calculate_displacement() >= collection_range_minimum and (not triggered):
-        plateau_count = plateau_count + 1
-        logging.info(f"Plateau Count: {plateau_count}")
+def calibrate_estimator(cache=None):
+    """
+    Finds the vertical axis for the fusion estimator from IMU samples taken at rest on the pad,
+    or from the calibration cache if a first reading confirms it.
+
+    :param cache: A CalibrationCache, or None to always calibrate.
+    """
+    first = imu.read_data()
+    cached = None
+    if cache is not None and first.status == STATUS_OK:
+        cached = cache.imu(first.accel_x, first.accel_y, first.accel_z)
+
+    if cached is not None:
+        estimator.up, estimator.gravity = cached
+        source = "Cached"
     else:
-        plateau_count = 0
+        readings = [first] + [imu.read_data() for _ in range(calibration_samples - 1)]
+        readings = [r for r in readings if r.status == STATUS_OK]
+        if not readings:
+            raise RuntimeError("No IMU samples to calibrate the fusion estimator")
+        estimator.calibrate(sum(r.accel_x for r in readings) / len(readings),
+                            sum(r.accel_y for r in readings) / len(readings),
+                            sum(r.accel_z for r in readings) / len(readings))
+        if cache is not None:
+            cache.save("imu", up=list(estimator.up), gravity=estimator.gravity)
+        source = f"{len(readings)} samples"
+    estimator.reset()
+    logging.info(f"Fusion Calibration: {source}, Up: {estimator.up}, Gravity: {estimator.gravity:.3f} m/s²")
+
+def fuse(imu_samples, sensor_sample):
+    """
+    Feeds IMU samples (oldest first) and then one barometer sample to the fusion estimator.
+
+    :return: A tuple (altitude, timestamp) of the filtered displacement.
+    """
+    for imu_sample in imu_samples:
+        estimator.predict(imu_sample.timestamp,
+                          estimator.vertical_acceleration(imu_sample.accel_x, imu_sample.accel_y, imu_sample.accel_z))
+    estimator.update(sensor_sample.timestamp, sensor_sample.displacement)
+    return estimator.altitude, sensor_sample.timestamp
+
+def poll(displacement=None, timestamp=None):
+    """
+    Feeds one displacement sample to the plateau detector and starts sampling once it reports a plateau.
+
+    :param displacement: The displacement in meters (defaults to the sensor's latest sample).
+    :param timestamp: The monotonic time of the sample (defaults to the latest sample's, or now).
+    """
+    global triggered, trigger_time
+
+    if displacement is None:
+        displacement = sensor.latest.displacement
+        timestamp = sensor.latest.timestamp
+    if timestamp is None:
+        timestamp = clock.monotonic()
+
+    if plateau_detector.update(timestamp, displacement) and not triggered:
+        logging.info(f"Plateau: {plateau_detector.to_string()}")
+        sample()
+        triggered = True
+        trigger_time = timestamp
+    elif plateau_detector.in_range() and not triggered:
+        logging.info(f"Plateau: {plateau_detector.to_string()}")
 
-    print(f"Plateau Count: {plateau_count}")
+    status.set("plateau", plateau_detector.to_string())
+    status.set("triggered", triggered)
 
 
 def sample():
+    """
+    Starts the sampling sequence in the background and returns immediately.
+    """
+    global sampling
     logging.info("--------------Sampling Start--------------")
-    solenoid.activate()
-    servo.run_continuously(speed=1, duration=collection_period)
-    solenoid.deactivate()
-    logging.info("--------------Sampling End--------------")
+    sampling = actuator.submit(sampling_sequence(servo, solenoid, duration=collection_period, speed=1))
+
+def log_actuation(sequence):
+    """
+    Records the completion of an actuation sequence in the telemetry log.
+    """
+    if sequence.name == "Sampling":
+        logging.info("--------------Sampling End--------------")
+    logging.info(f"Actuation: {sequence.to_string()}")
+    status.set("actuation", sequence.to_string())
 
 
 def sequential_execution():
@@ -74,44 +318,304 @@ def sequential_execution():
     solenoid.deactivate()
     servo.set_speed(0)
 
-    # Run a continuous loop to log both IMU and sensor data
+    # Run a fixed-rate loop to log both IMU and sensor data
+    scheduler.start()
     while True:
-        # Log both IMU and sensor telemetry data
-        log_telemetry()
-        poll()
-            
-        time.sleep(0.2)  # Wait before reading again
+        # Log both IMU and sensor telemetry data; the same samples drive the trigger
+        imu_sample, sensor_sample = log_telemetry()
+        # Stale and substituted samples carry no new measurement; the trigger skips them
+        if sensor_sample.status == STATUS_OK:
+            with poll_timer:
+                if trigger_source == "fusion":
+                    poll(*fuse((imu_sample,) if imu_sample.status == STATUS_OK else (), sensor_sample))
+                else:
+                    poll(sensor_sample.displacement, sensor_sample.timestamp)
+        log_stats()
+
+        # Wait for the next deadline rather than a fixed delay
+        if scheduler.wait():
+            logging.info(f"Missed Deadlines: {scheduler.missed_deadlines}")
         #sample()
 
+def log_samples(imu_samples, sensor_samples):
+    """
+    Queues samples read from the sampler ring buffers for the log file and the live stream.
+    """
+    for sample in imu_samples:
+        telemetry_writer.log("IMU Telemetry", sample)
+    for sample in sensor_samples:
+        telemetry_writer.log("Sensor Telemetry", sample)
+    if publisher is not None:
+        for sample in imu_samples:
+            publisher.log("IMU Telemetry", sample)
+        for sample in sensor_samples:
+            publisher.log("Sensor Telemetry", sample)
+    if imu_samples or sensor_samples:
+        telemetry_writer.log_message(log_separator)
+    if imu_samples:
+        status.set("imu", imu_samples[-1])
+    if sensor_samples:
+        status.set("sensor", sensor_samples[-1])
+
+def trigger_loop(sensor_buffer, imu_buffer=None):
+    """
+    Runs the plateau detection on every new barometer sample until stop_event is set.
+
+    With trigger_source "fusion", the IMU samples from imu_buffer are fed to the
+    estimator in time order between the barometer samples.
+    """
+    sequence = 0
+    imu_sequence = 0
+    pending = []  # IMU samples newer than the last barometer sample
+    trigger_scheduler = FixedRateScheduler(rate_hz=sensor_rate)
+    trigger_scheduler.start()
+    while not stop_event.is_set():
+        samples, sequence = sensor_buffer.read_since(sequence)
+        if trigger_source == "fusion" and imu_buffer is not None:
+            imu_samples, imu_sequence = imu_buffer.read_since(imu_sequence)
+            pending.extend(imu_samples)
+        for sample in samples:
+            with poll_timer:
+                if trigger_source == "fusion":
+                    count = 0
+                    while count < len(pending) and pending[count].timestamp <= sample.timestamp:
+                        count += 1
+                    poll(*fuse(pending[:count], sample))
+                    del pending[:count]
+                else:
+                    poll(sample.displacement, sample.timestamp)
+        trigger_scheduler.wait()
+
 def parallel_execution():
     logging.info("*** Parallel Execution ***")
+    print("Starting concurrent telemetry logging...")
     solenoid.deactivate()
     servo.set_speed(0)
 
-    telemetry_thread = threading.Thread(target=log_telemetry)
-    sampling_thread = threading.Thread(target=poll)
+    # Each sensor is sampled on its own thread, so a slow BME688 read never holds back the IMU
+    imu_sampler = SensorSampler("imu", imu.read_data, rate_hz=imu_rate)
+    sensor_sampler = SensorSampler("sensor", sensor.read_data, rate_hz=sensor_rate)
+    trigger_thread = threading.Thread(target=trigger_loop, args=(sensor_sampler.buffer, imu_sampler.buffer), name="trigger", daemon=True)
+
+    stop_event.clear()
+    imu_sampler.start()
+    sensor_sampler.start()
+    trigger_thread.start()
+
+    try:
+        # Log every new sample from the ring buffers at the logging rate
+        imu_sequence = 0
+        sensor_sequence = 0
+        scheduler.start()
+        while True:
+            # Checked first, so the samples published before a sampler ended are still logged
+            running = imu_sampler.is_alive() and sensor_sampler.is_alive()
+            imu_samples, imu_sequence = imu_sampler.buffer.read_since(imu_sequence)
+            sensor_samples, sensor_sequence = sensor_sampler.buffer.read_since(sensor_sequence)
+            log_samples(imu_samples, sensor_samples)
+            log_stats()
+            if not running:
+                finished = imu_sampler.finished or sensor_sampler.finished
+                if finished:
+                    raise backends.ReplayFinished(finished)
+                print("Sampling stopped.")
+                break
+
+            scheduler.wait()
+
+    finally:
+        stop_event.set()
+        imu_sampler.stop()
+        sensor_sampler.stop()
+        trigger_thread.join(1.0)
+        logging.info(f"Sampler: {imu_sampler.to_string()}")
+        logging.info(f"Sampler: {sensor_sampler.to_string()}")
+
+def acquisition_process(imu_buffer, sensor_buffer, messages, halt, shared_trigger_time):
+    """
+    Runs in the acquisition process of isolated execution: samples both sensors into the
+    shared ring buffers and runs the trigger and the actuation until halt is set or a
+    sampler ends, e.g. at the end of a replay.
 
-    telemetry_thread.start()
-    sampling_thread.start()
+    :param imu_buffer: The SharedRingBuffer for IMU samples.
+    :param sensor_buffer: The SharedRingBuffer for barometer samples.
+    :param messages: A multiprocessing queue carrying log records to the I/O process.
+    :param halt: A multiprocessing event set by the I/O process to stop.
+    :param shared_trigger_time: A shared double set to trigger_time once triggered.
+    """
+    global status, actuator
 
-    telemetry_thread.join()
-    sampling_thread.join()
+    # Ctrl-C reaches the whole process group; the I/O process decides when to stop
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
 
+    # The writer, stream and display threads were not forked: log records go to the I/O
+    # process, the flight state stays here without a display, and actuation gets its own thread
+    logging.root.handlers = [logging.handlers.QueueHandler(messages)]
+    status = StatusDisplay(render_status, enabled=False)
+    actuator = ActuationScheduler(on_complete=log_actuation)
+
+    # Everything inherited from the I/O process lives until exit; keep it out of collections
+    gc.freeze()
+
+    imu_sampler = SensorSampler("imu", imu.read_data, rate_hz=imu_rate, buffer=imu_buffer)
+    sensor_sampler = SensorSampler("sensor", sensor.read_data, rate_hz=sensor_rate, buffer=sensor_buffer)
+    trigger_thread = threading.Thread(target=trigger_loop, args=(sensor_buffer, imu_buffer), name="trigger", daemon=True)
+
+    stop_event.clear()
+    imu_sampler.start()
+    sensor_sampler.start()
+    trigger_thread.start()
+
+    try:
+        while not halt.wait(0.1) and imu_sampler.is_alive() and sensor_sampler.is_alive():
+            if triggered and math.isnan(shared_trigger_time.value):
+                shared_trigger_time.value = trigger_time
+            log_stats()
+
+    finally:
+        stop_event.set()
+        imu_sampler.stop()
+        sensor_sampler.stop()
+        trigger_thread.join(1.0)
+        actuator.stop()
+        logging.info(f"Sampler: {imu_sampler.to_string()}")
+        logging.info(f"Sampler: {sensor_sampler.to_string()}")
+        logging.info(f"I2C Bus: {sensor.bus.to_string()}")
+        logging.info(f"BME688: {sensor.rate_to_string()}")
+        logging.info(f"Faults: {imu.guard.to_string()}")
+        logging.info(f"Faults: {sensor.guard.to_string()}")
+        if trigger_source == "fusion":
+            logging.info(f"Fusion: {estimator.to_string()}")
+        logging.info(f"Acquisition Stage Timing: {stats.dump()}")
+
+def forward_messages(messages):
+    """
+    Logs the records the acquisition process has sent so far, in this process.
+    """
+    while True:
+        try:
+            record = messages.get_nowait()
+        except queue.Empty:
+            return
+        logging.getLogger(record.name).handle(record)
+
+def isolated_execution():
+    global triggered, trigger_time
+    logging.info("*** Isolated Execution ***")
+    print("Starting isolated telemetry acquisition...")
+    solenoid.deactivate()
+    servo.set_speed(0)
+
+    # Sampling, the trigger and the actuators run in a forked process that inherits the open
+    # devices and the calibration; this process only logs, streams and displays, so its
+    # formatting, I/O and garbage collection cannot hold up a sensor read or the trigger
+    context = multiprocessing.get_context("fork")
+    imu_buffer = SharedRingBuffer(telemetry_format.RECORD_IMU, capacity=isolated_capacity)
+    sensor_buffer = SharedRingBuffer(telemetry_format.RECORD_SENSOR, capacity=isolated_capacity)
+    messages = context.Queue()
+    halt = context.Event()
+    shared_trigger_time = context.Value("d", math.nan, lock=False)
+    process = context.Process(target=acquisition_process, name="acquisition", daemon=True,
+                              args=(imu_buffer, sensor_buffer, messages, halt, shared_trigger_time))
+    process.start()
+
+    try:
+        imu_sequence = 0
+        sensor_sequence = 0
+        scheduler.start()
+        while True:
+            # Checked first, so the samples published before an exit are still logged
+            running = process.is_alive()
+            imu_samples, imu_sequence = imu_buffer.read_since(imu_sequence)
+            sensor_samples, sensor_sequence = sensor_buffer.read_since(sensor_sequence)
+            log_samples(imu_samples, sensor_samples)
+            forward_messages(messages)
+            if not triggered and not math.isnan(shared_trigger_time.value):
+                triggered = True
+                trigger_time = shared_trigger_time.value
+                status.set("triggered", triggered)
+            log_stats()
+            if not running:
+                print("Acquisition process stopped.")
+                break
+
+            scheduler.wait()
+
+    finally:
+        halt.set()
+        # Keep reading while the process shuts down, so its last messages cannot fill the pipe
+        for _ in range(30):
+            forward_messages(messages)
+            process.join(0.1)
+            if not process.is_alive():
+                break
+        if process.is_alive():
+            process.terminate()
+        forward_messages(messages)
+        logging.info(f"Acquisition Process: Exit Code: {process.exitcode}, "
+                     f"IMU Buffer: {imu_buffer.to_string()}, Sensor Buffer: {sensor_buffer.to_string()}")
+        for buffer in (imu_buffer, sensor_buffer):
+            buffer.close()
+            buffer.unlink()
 
 
 def main():
+    setup()
+
     try:
-        sequential_execution()
+        # Replayed data must not overwrite the calibration of the real hardware
+        cache = None
+        if backend != backends.BACKEND_REPLAY:
+            cache = CalibrationCache(calibration_file, max_age=calibration_max_age)
+        calibrate_ground(cache)
+        if trigger_source == "fusion":
+            calibrate_estimator(cache)
+
+        if execution_mode == "parallel":
+            parallel_execution()
+        elif execution_mode == "isolated":
+            isolated_execution()
+        else:
+            sequential_execution()
 
     except KeyboardInterrupt:
         print("Telemetry logging stopped by user.")
+
+    except backends.ReplayFinished as e:
+        print(f"Telemetry logging stopped: {e}")
     
     finally:
-        # Clean up and stop the PWM signal
+        logging.info(f"Scheduler: {scheduler.to_string()}")
+        logging.info(f"Telemetry Writer: {telemetry_writer.to_string()}")
+        if publisher is not None:
+            logging.info(f"Telemetry Stream: {publisher.to_string()}")
+        if execution_mode != "isolated":  # The acquisition process logs its own
+            logging.info(f"I2C Bus: {sensor.bus.to_string()}")
+            logging.info(f"BME688: {sensor.rate_to_string()}")
+            logging.info(f"Faults: {imu.guard.to_string()}")
+            logging.info(f"Faults: {sensor.guard.to_string()}")
+            if trigger_source == "fusion":
+                logging.info(f"Fusion: {estimator.to_string()}")
+        logging.info(f"Stage Timing: {stats.dump()}")
+        print("Stage timing summary:")
+        print(stats.summary())
+
+        status.stop()
+
+        # Leave the actuators in a safe state, then clean up and stop the PWM signal
+        actuator.stop()
         servo.stop()
         solenoid.stop()
         sensor.stop()
         imu.stop()
+        sensor.bus.close()
+        if recorder is not None:
+            recorder.close()
+
+        # Write out everything still queued for the log file
+        if publisher is not None:
+            publisher.close()
+        telemetry_writer.close()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,251 @@
+import os
+import sys
+import mmap
+import clock
+import struct
+import argparse
+import threading
+import telemetry_format
+from telemetry_writer import TelemetryLogHandler
+
+# File layout: a 64-byte header, then capacity records of telemetry_format.RECORD_SIZE
+# bytes used as a circular buffer. Record number n lives in slot n % capacity; the
+# commit index is the number of records completely written so far.
+MAGIC = b"PRXR"
+FORMAT_VERSION = 1
+HEADER_STRUCT = struct.Struct("<4sHHIdd")  # magic, version, record size, capacity, wall time, monotonic time
+COMMIT_STRUCT = struct.Struct("<Q")
+COMMIT_OFFSET = 32
+HEADER_SIZE = 64
+
+class FlightRecorder:
+    def __init__(self, filename, capacity=65536, sync_interval=1.0):
+        """
+        Initializes a crash-safe flight recorder on a preallocated, memory-mapped file.
+
+        Samples are packed straight into the mapping, so nothing is buffered in the process:
+        after a crash every committed record is in the page cache, and msync every
+        sync_interval bounds what a power loss can take. The file never grows; once full,
+        the oldest records are overwritten. It can replace TelemetryWriter in flight_program.
+
+        :param filename: The path of the recorder file (created or overwritten).
+        :param capacity: The number of records kept; 65536 records take 3 MB.
+        :param sync_interval: Seconds between flushes of the mapping to disk.
+        """
+        self.filename = filename
+        self.capacity = capacity
+        self.sync_interval = sync_interval
+        size = HEADER_SIZE + capacity * telemetry_format.RECORD_SIZE
+
+        # Allocate the whole file up front, so writes into the mapping cannot fail for lack of space
+        self.file = open(filename, "w+b")
+        self.file.truncate(size)
+        if hasattr(os, "posix_fallocate"):
+            os.posix_fallocate(self.file.fileno(), 0, size)
+        self.map = mmap.mmap(self.file.fileno(), size)
+
+        # Records carry clock.monotonic timestamps; this converts them to wall-clock time
+        self.wall_time = clock.time()
+        self.monotonic_time = clock.monotonic()
+        HEADER_STRUCT.pack_into(self.map, 0, MAGIC, FORMAT_VERSION, telemetry_format.RECORD_SIZE,
+                                capacity, self.wall_time, self.monotonic_time)
+        COMMIT_STRUCT.pack_into(self.map, COMMIT_OFFSET, 0)
+
+        # Writer statistics, named like TelemetryWriter's
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.format_errors = 0
+        self.syncs = 0
+
+        self._lock = threading.Lock()  # Events are logged from other threads than the loop
+        self._close_lock = threading.Lock()  # Keeps the mapping open during a flush, without holding up writes
+        self._closed = False
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._sync_loop, name="flight-recorder", daemon=True)
+        self._thread.start()
+
+    def append(self, record_type, timestamp, data):
+        """
+        Writes one record into the next slot and commits it.
+
+        :param record_type: telemetry_format.RECORD_IMU, RECORD_SENSOR or RECORD_EVENT.
+        :param timestamp: The clock.monotonic capture time.
+        :param data: The record's fields; the encoded text for an event.
+        :return: True if the record was written.
+        """
+        return self._write(record_type, (timestamp, *data))
+
+    def log(self, label, sample):
+        """
+        Records a sample; the same call as TelemetryWriter.log.
+
+        :param label: The record label, e.g. "IMU Telemetry".
+        :param sample: An ImuSample or SensorSample (see samples.py).
+        """
+        self.enqueued += 1
+        record_type = telemetry_format.LABEL_RECORDS.get(label)
+        if record_type is None:
+            self.format_errors += 1
+            return False
+        # Samples start with their timestamp like the records do, so they pack as they are
+        return self._write(record_type, sample)
+
+    def _write(self, record_type, fields):
+        record = telemetry_format.RECORD_STRUCTS[record_type]
+        with self._lock:
+            if self._closed:
+                self.dropped += 1
+                return False
+            offset = HEADER_SIZE + (self.written % self.capacity) * telemetry_format.RECORD_SIZE
+            try:
+                record.pack_into(self.map, offset, record_type, *fields)
+            except struct.error:
+                self.format_errors += 1
+                return False
+            # The commit index moves only once the record is complete
+            self.written += 1
+            COMMIT_STRUCT.pack_into(self.map, COMMIT_OFFSET, self.written)
+        return True
+
+    def log_message(self, message, timestamp=None):
+        """
+        Records an event; bare separator lines are skipped, as in binary telemetry files.
+
+        :param message: The event text, truncated to telemetry_format.EVENT_TEXT_SIZE bytes.
+        :param timestamp: The clock.monotonic time of the message (defaults to now).
+        """
+        self.enqueued += 1
+        text = message.strip("- ")
+        if not text:
+            return True
+        data = (text.encode("utf-8")[:telemetry_format.EVENT_TEXT_SIZE],)
+        return self.append(telemetry_format.RECORD_EVENT, timestamp if timestamp is not None else clock.monotonic(), data)
+
+    def handler(self):
+        """
+        Returns a logging.Handler that records log messages as events.
+        """
+        return TelemetryLogHandler(self)
+
+    def _sync_loop(self):
+        while not self._stop_event.wait(self.sync_interval):
+            self.sync()
+
+    def sync(self):
+        """
+        Flushes the mapping to disk; writes carry on meanwhile, so a slow card never stalls the loop.
+        """
+        with self._close_lock:
+            if not self._closed:
+                self.map.flush()
+                self.syncs += 1
+
+    def close(self):
+        """
+        Stops the sync thread, flushes everything and releases the file.
+        """
+        self._stop_event.set()
+        self._thread.join(1.0)
+        self.sync()
+        with self._close_lock, self._lock:
+            self._closed = True
+            self.map.close()
+            self.file.close()
+
+    def to_string(self):
+        """
+        Returns a string representation of the recorder's statistics.
+        """
+        return (f"Enqueued: {self.enqueued}, "
+                f"Written: {self.written}, "
+                f"Kept: {min(self.written, self.capacity)}/{self.capacity}, "
+                f"Dropped: {self.dropped}, "
+                f"Format Errors: {self.format_errors}, "
+                f"Syncs: {self.syncs}")
+
+class FlightRecorderReader:
+    def __init__(self, filename):
+        """
+        Initializes a reader of the records recovered from a flight recorder file,
+        e.g. after a crash.
+
+        Only committed records are read. When the buffer has wrapped, the oldest slot
+        is skipped too, as it may have been half overwritten by the record in progress.
+        Records are yielded in time order, so they can be passed to telemetry_format's
+        export_text and export_csv like a BinaryTelemetryReader.
+
+        :param filename: The path of the recorder file.
+        """
+        with open(filename, "rb") as f:
+            data = f.read()
+        if len(data) < HEADER_SIZE:
+            raise ValueError("File is too short to be a flight recorder file")
+        magic, version, record_size, self.capacity, self.wall_time, self.monotonic_time = HEADER_STRUCT.unpack_from(data)
+        if magic != MAGIC or record_size != telemetry_format.RECORD_SIZE or version > FORMAT_VERSION:
+            raise ValueError("Not a flight recorder file")
+        self.committed = COMMIT_STRUCT.unpack_from(data, COMMIT_OFFSET)[0]
+
+        first = max(0, self.committed - self.capacity + 1)
+        records = []
+        for number in range(first, self.committed):
+            offset = HEADER_SIZE + (number % self.capacity) * record_size
+            if offset + record_size > len(data) or data[offset] not in telemetry_format.RECORD_STRUCTS:
+                continue  # Never written, or lost with the page it was in
+            records.append(telemetry_format.unpack_record(data, offset))
+        records.sort(key=lambda record: record[1])
+        self.records = records
+
+    def to_wall_time(self, timestamp):
+        """
+        Converts a record's monotonic timestamp to wall-clock seconds since the epoch.
+        """
+        return self.wall_time + (timestamp - self.monotonic_time)
+
+    def __iter__(self):
+        return iter(self.records)
+
+    def to_string(self):
+        return f"Committed: {self.committed}, Capacity: {self.capacity}, Recovered: {len(self.records)}"
+
+def export_binary(reader, output):
+    """
+    Writes the recovered records as a binary telemetry file (see telemetry_format), which
+    log_loader and the other tools read.
+
+    :param reader: A FlightRecorderReader.
+    :param output: A binary file object.
+    """
+    output.write(telemetry_format.pack_header(reader.wall_time, reader.monotonic_time))
+    for record_type, timestamp, data in reader:
+        output.write(telemetry_format.pack_record(record_type, timestamp, data))
+
+def main():
+    parser = argparse.ArgumentParser(description="Extract the recovered samples of a flight recorder file in time order.")
+    parser.add_argument("input", help="Flight recorder file")
+    parser.add_argument("output", nargs="?", help="Output file (defaults to stdout; required for binary)")
+    parser.add_argument("--format", choices=("text", "csv", "binary"), default="text", help="Output format")
+    args = parser.parse_args()
+
+    reader = FlightRecorderReader(args.input)
+    print(f"{args.input}: {reader.to_string()}", file=sys.stderr)
+
+    if args.format == "binary":
+        if not args.output:
+            parser.error("binary output needs an output file")
+        with open(args.output, "wb") as output:
+            export_binary(reader, output)
+        return
+
+    output = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        if args.format == "csv":
+            telemetry_format.export_csv(reader, output)
+        else:
+            telemetry_format.export_text(reader, output)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+import sys
+import math
+import time
+
+class AltitudeEstimator:
+    def __init__(self, accel_noise=0.5, baro_noise=1.0, initial_altitude=0.0):
+        """
+        Initializes a Kalman filter estimating altitude and vertical velocity.
+
+        predict() integrates the IMU's vertical acceleration at IMU rate; update() corrects
+        the estimate with each barometric altitude at BME688 rate. All arithmetic is scalar
+        on a two-state model, so a step costs a few dozen float operations.
+
+        :param accel_noise: The standard deviation of the vertical acceleration in m/s².
+        :param baro_noise: The standard deviation of the barometric altitude in meters.
+        :param initial_altitude: The starting altitude (e.g. 0 for displacement).
+        """
+        self.accel_variance = accel_noise * accel_noise
+        self.baro_variance = baro_noise * baro_noise
+
+        # Gravity direction and magnitude, as measured at rest by calibrate()
+        self.up = (0.0, 0.0, 1.0)
+        self.gravity = 9.80665
+
+        self.predictions = 0
+        self.updates = 0
+        self.reset(initial_altitude)
+
+    def reset(self, altitude=0.0, velocity=0.0):
+        """
+        Restarts the estimate at a known altitude and velocity.
+        """
+        self.altitude = altitude
+        self.velocity = velocity
+        self.acceleration = 0.0  # Last vertical acceleration, held until the next IMU sample
+        self.time = None
+
+        # State covariance, symmetric: [[p00, p01], [p01, p11]]
+        self.p00 = self.baro_variance
+        self.p01 = 0.0
+        self.p11 = 1.0
+
+    def calibrate(self, accel_x, accel_y, accel_z):
+        """
+        Sets the vertical axis from the mean accelerometer reading at rest, which points
+        against gravity. The measured magnitude absorbs the accelerometer's scale error.
+
+        :param accel_x: The mean X acceleration at rest in m/s².
+        :param accel_y: The mean Y acceleration at rest in m/s².
+        :param accel_z: The mean Z acceleration at rest in m/s².
+        """
+        magnitude = math.sqrt(accel_x * accel_x + accel_y * accel_y + accel_z * accel_z)
+        if magnitude == 0:
+            raise ValueError("Calibration needs a non-zero acceleration")
+        self.up = (accel_x / magnitude, accel_y / magnitude, accel_z / magnitude)
+        self.gravity = magnitude
+
+    def vertical_acceleration(self, accel_x, accel_y, accel_z):
+        """
+        Returns the upward acceleration in m/s² with gravity removed, from a raw accelerometer reading.
+        """
+        up_x, up_y, up_z = self.up
+        return accel_x * up_x + accel_y * up_y + accel_z * up_z - self.gravity
+
+    def _propagate(self, timestamp):
+        dt = timestamp - self.time
+        if dt <= 0:
+            return
+        dt2 = dt * dt
+        q = self.accel_variance
+        a = self.acceleration
+
+        self.altitude += self.velocity * dt + 0.5 * a * dt2
+        self.velocity += a * dt
+
+        # P = F P Fᵀ + Q with F = [[1, dt], [0, 1]] and white acceleration noise
+        self.p00 += dt * (2 * self.p01 + dt * self.p11) + q * dt2 * dt2 * 0.25
+        self.p01 += dt * self.p11 + q * dt2 * dt * 0.5
+        self.p11 += q * dt2
+        self.time = timestamp
+
+    def predict(self, timestamp, acceleration):
+        """
+        Advances the estimate to an IMU sample and holds its acceleration until the next one.
+
+        :param timestamp: The IMU sample time in seconds.
+        :param acceleration: The upward acceleration in m/s², gravity removed.
+        """
+        if self.time is None:
+            self.time = timestamp
+        else:
+            self._propagate(timestamp)
+        self.acceleration = acceleration
+        self.predictions += 1
+
+    def update(self, timestamp, altitude):
+        """
+        Corrects the estimate with a barometric altitude.
+
+        :param timestamp: The barometer sample time in seconds.
+        :param altitude: The barometric altitude or displacement in meters.
+        :return: The filtered altitude.
+        """
+        if self.time is None:
+            self.time = timestamp
+            self.altitude = altitude
+        else:
+            self._propagate(timestamp)
+
+        residual = altitude - self.altitude
+        s = self.p00 + self.baro_variance
+        k0 = self.p00 / s
+        k1 = self.p01 / s
+        self.altitude += k0 * residual
+        self.velocity += k1 * residual
+
+        p00, p01 = self.p00, self.p01
+        self.p00 = (1 - k0) * p00
+        self.p01 = (1 - k0) * p01
+        self.p11 -= k1 * p01
+        self.updates += 1
+        return self.altitude
+
+    def estimate(self, timestamp=None):
+        """
+        Returns (altitude, vertical velocity), extrapolated to timestamp if given.
+        """
+        if timestamp is None or self.time is None:
+            return self.altitude, self.velocity
+        dt = timestamp - self.time
+        return (self.altitude + self.velocity * dt + 0.5 * self.acceleration * dt * dt,
+                self.velocity + self.acceleration * dt)
+
+    def to_string(self):
+        """
+        Returns a string representation of the estimate.
+        """
+        return (f"Altitude: {self.altitude:.2f} m, "
+                f"Vertical Velocity: {self.velocity:.2f} m/s, "
+                f"Altitude Std Dev: {math.sqrt(max(self.p00, 0.0)):.2f} m, "
+                f"Predictions: {self.predictions}, Updates: {self.updates}")
+
+def run_offline(imu, sensor, calibration_samples=100, **config):
+    """
+    Runs an estimator over recorded columns, e.g. from log_loader.read_log.
+
+    :param imu: IMU columns with "time" and accel_x/accel_y/accel_z arrays.
+    :param sensor: Sensor columns with "time" and "displacement" arrays.
+    :param calibration_samples: The number of leading IMU samples averaged into the vertical axis.
+    :param config: AltitudeEstimator settings.
+    :return: A tuple (estimator, times, altitudes, velocities) with one estimate per barometer sample.
+    """
+    estimator = AltitudeEstimator(**config)
+    imu_times = list(imu["time"])
+    accel = list(zip(imu["accel_x"], imu["accel_y"], imu["accel_z"]))
+    rest = [a for a in accel[:calibration_samples] if not any(math.isnan(v) for v in a)]
+    if rest:
+        estimator.calibrate(*(sum(axis) / len(rest) for axis in zip(*rest)))
+
+    times, altitudes, velocities = [], [], []
+    i = 0
+    for timestamp, displacement in zip(sensor["time"], sensor["displacement"]):
+        # Replay the IMU samples up to this barometer sample, in time order
+        while i < len(imu_times) and imu_times[i] <= timestamp:
+            if not math.isnan(accel[i][0]):
+                estimator.predict(imu_times[i], estimator.vertical_acceleration(*accel[i]))
+            i += 1
+        if not math.isnan(displacement):
+            estimator.update(timestamp, displacement)
+        times.append(timestamp)
+        altitudes.append(estimator.altitude)
+        velocities.append(estimator.velocity)
+    return estimator, times, altitudes, velocities
+
+# Example usage
+if __name__ == "__main__":
+    # Replay every logged flight through the estimator and time it
+    from log_loader import find_logs, read_log
+
+    steps = 0
+    elapsed = 0.0
+    for path in find_logs(sys.argv[1:] or ("logs", "sli/logs")):
+        imu, sensor, events = read_log(path)
+        if not len(sensor["time"]):
+            continue
+
+        start = time.perf_counter()
+        estimator, times, altitudes, velocities = run_offline(imu, sensor)
+        elapsed += time.perf_counter() - start
+        steps += estimator.predictions + estimator.updates
+
+        print(f"{path}: max altitude {max(altitudes):.1f} m, max velocity {max(velocities):.1f} m/s")
+
+    if steps:
+        print(f"{steps} steps in {elapsed * 1000:.1f} ms ({elapsed / steps * 1e6:.2f} us per step)")
@@ -0,0 +1,154 @@
+import time
+import threading
+from instrumentation import stats
+
+try:
+    import board
+    import busio
+except (ImportError, NotImplementedError):  # Not on the Pi; sensors are given replay devices instead
+    board = None
+
+class BusTransaction:
+    __slots__ = ("bus", "name", "timer", "errors")
+
+    def __init__(self, bus, name):
+        """
+        Initializes the access statistics of one device on a shared bus.
+
+        Use it as "with transaction:" around one bus transfer; the bus lock is held for
+        the transfer only, never while a driver waits for a conversion, so one sensor's
+        slow measurement cannot hold up the other sensor's reads. Drivers given a
+        DeviceI2C from I2CBus.client do this for every transfer.
+
+        :param bus: The I2CBus the device is on.
+        :param name: The device name, e.g. "bme688".
+        """
+        self.bus = bus
+        self.name = name
+        self.timer = stats.stage(f"i2c.{name}")  # Transaction count and latency histogram
+        self.errors = 0
+
+    def __enter__(self):
+        self.bus.lock.acquire()
+        self.timer.__enter__()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.timer.__exit__()
+        self.bus.lock.release()
+        if exc_type is not None:
+            self.errors += 1
+        return False
+
+    def to_string(self):
+        return f"{self.timer.to_string()} errors={self.errors}"
+
+class DeviceI2C:
+    def __init__(self, transaction, i2c):
+        """
+        Initializes the bus object handed to one device's driver in place of the shared
+        busio.I2C: every transfer the driver makes is a locked, timed bus transaction.
+
+        :param transaction: The device's BusTransaction.
+        :param i2c: The busio.I2C object of the bus.
+        """
+        self.transaction = transaction
+        self.i2c = i2c
+
+    def writeto(self, *args, **kwargs):
+        with self.transaction:
+            return self.i2c.writeto(*args, **kwargs)
+
+    def readfrom_into(self, *args, **kwargs):
+        with self.transaction:
+            return self.i2c.readfrom_into(*args, **kwargs)
+
+    def writeto_then_readfrom(self, *args, **kwargs):
+        with self.transaction:
+            return self.i2c.writeto_then_readfrom(*args, **kwargs)
+
+    def __getattr__(self, name):
+        # try_lock, unlock, scan and the rest go straight to busio, which locks per transfer too
+        return getattr(self.i2c, name)
+
+class I2CBus:
+    def __init__(self, frequency=100000, i2c=None, open=True):
+        """
+        Initializes the one I2C bus shared by every sensor.
+
+        :param frequency: The bus clock in Hz. On the Raspberry Pi the kernel driver sets
+                          the clock (dtparam=i2c_arm_baudrate in /boot/config.txt) and this is ignored.
+        :param i2c: An already open bus object to share instead of opening one.
+        :param open: If False, no hardware bus is opened; the lock and statistics still
+                     work, e.g. for sensors driven by replay devices.
+        """
+        self.frequency = frequency
+        self.lock = threading.RLock()
+        self.devices = {}
+        self.i2c = i2c
+
+        if self.i2c is None and open:
+            if board is None:
+                raise RuntimeError("I2C hardware libraries are not available; pass a device to the sensors")
+            self.i2c = busio.I2C(board.SCL, board.SDA, frequency=frequency)
+
+    def device(self, name):
+        """
+        Returns the transaction context of a device, creating it on first use.
+
+        :param name: The device name, e.g. "bno08x".
+        """
+        transaction = self.devices.get(name)
+        if transaction is None:
+            with self.lock:
+                transaction = self.devices.setdefault(name, BusTransaction(self, name))
+        return transaction
+
+    def client(self, name):
+        """
+        Returns the bus object to create a device's driver with (see DeviceI2C).
+
+        :param name: The device name, e.g. "bme688".
+        """
+        return DeviceI2C(self.device(name), self.i2c)
+
+    def to_string(self):
+        """
+        Returns a string representation of the bus and per-device statistics.
+        """
+        devices = "; ".join(transaction.to_string() for transaction in list(self.devices.values()))
+        return f"Frequency: {self.frequency} Hz, {devices or 'no devices'}"
+
+    def close(self):
+        if self.i2c is not None and hasattr(self.i2c, "deinit"):
+            self.i2c.deinit()
+
+_shared_bus = None
+_shared_lock = threading.Lock()
+
+def shared_bus(frequency=100000):
+    """
+    Returns the process-wide bus, opening it on first use; sensors created without
+    an explicit bus all share it.
+    """
+    global _shared_bus
+    with _shared_lock:
+        if _shared_bus is None:
+            _shared_bus = I2CBus(frequency=frequency)
+        return _shared_bus
+
+# Example usage
+if __name__ == "__main__":
+    bus = I2CBus(open=False)
+
+    def worker(name):
+        for _ in range(1000):
+            with bus.device(name):
+                time.sleep(0)
+
+    threads = [threading.Thread(target=worker, args=(name,)) for name in ("bme688", "bno08x")]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(bus.to_string())
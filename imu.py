@@ -1,83 +1,183 @@
-import time
-import board
-import busio
-import adafruit_bno08x
-from adafruit_bno08x.i2c import BNO08X_I2C
+import clock
+import math
+from telemetry_format import format_imu
+from samples import ImuSample, ImuExtras, StaleImuSample, SubstitutedImuSample, STATUS_OK
+from faults import SensorGuard
+from instrumentation import stats
+from i2c_bus import I2CBus, shared_bus
+
+try:
+    import adafruit_bno08x
+    from adafruit_bno08x.i2c import BNO08X_I2C
+except (ImportError, NotImplementedError):  # Not on the Pi; pass a device instead (see backends.py)
+    adafruit_bno08x = None
+
+# Reports read every time, and the optional ones; the names are the driver's property names
+BASE_FEATURES = ("acceleration", "gyro", "magnetic")
+EXTRA_FEATURES = ("quaternion", "linear_acceleration")
+
+# Time between reports in microseconds, as requested from the SH-2 firmware; 10000 is 100 Hz
+DEFAULT_REPORT_INTERVAL = 10000
+
+def report_id(feature):
+    """
+    Returns the SH-2 report ID of a feature name.
+    """
+    return {
+        "acceleration": adafruit_bno08x.BNO_REPORT_ACCELEROMETER,
+        "gyro": adafruit_bno08x.BNO_REPORT_GYROSCOPE,
+        "magnetic": adafruit_bno08x.BNO_REPORT_MAGNETOMETER,
+        "quaternion": adafruit_bno08x.BNO_REPORT_ROTATION_VECTOR,
+        "linear_acceleration": adafruit_bno08x.BNO_REPORT_LINEAR_ACCELERATION,
+    }[feature]
 
 class BNO08XSensor:
-    def __init__(self):
+    def __init__(self, device=None, bus=None, extra_features=(), report_intervals=None):
         """
         Initializes the BNO08X imu and sets up the I2C connection.
-        """
-        # Initialize I2C
-        self.i2c = busio.I2C(board.SCL, board.SDA)
-
-        # Initialize the BNO08X imu
-        self.bno = BNO08X_I2C(self.i2c)
 
-        # Enable required imu reports
-        self.bno.enable_feature(adafruit_bno08x.BNO_REPORT_ACCELEROMETER)
-        self.bno.enable_feature(adafruit_bno08x.BNO_REPORT_GYROSCOPE)
-        self.bno.enable_feature(adafruit_bno08x.BNO_REPORT_MAGNETOMETER)
+        :param device: An object with the BNO08X_I2C interface to read from instead of
+                       the hardware, e.g. a recording or replay device from backends.py.
+        :param bus: The I2CBus shared with the other sensors (defaults to i2c_bus.shared_bus()).
+        :param extra_features: Optional reports to read as well, from EXTRA_FEATURES; they
+                               are returned as ImuExtras in self.latest_extras.
+        :param report_intervals: A dict of feature name to report interval in microseconds,
+                                 overriding DEFAULT_REPORT_INTERVAL.
+        """
+        for feature in extra_features:
+            if feature not in EXTRA_FEATURES:
+                raise ValueError(f"Unknown BNO08X feature: {feature}")
+        self.features = BASE_FEATURES + tuple(extra_features)
+        self.extra_features = tuple(extra_features)
+        self.report_intervals = {feature: DEFAULT_REPORT_INTERVAL for feature in self.features}
+        self.report_intervals.update(report_intervals or {})
+
+        # Read every report from one pass over the pending SH-2 packets (hardware driver only)
+        self.drain = False
+
+        if device is not None:
+            self.bus = bus or I2CBus(open=False)
+            self.bno = device
+            reinitialize = None
+        else:
+            if adafruit_bno08x is None:
+                raise RuntimeError("BNO08X hardware libraries are not available; pass a device")
+
+            # Share one I2C bus with the barometer
+            self.bus = bus or shared_bus()
+            self.open_device()
+            reinitialize = self.open_device
+        self.i2c = self.bus.i2c
+        self.transaction = self.bus.device("bno08x")
+
+        # Latest ImuSample returned by read_data, and the optional reports read with it
+        self.latest = None
+        self.latest_extras = None
+
+        # Hot-path timing counters
+        self.read_timer = stats.stage("imu.read")
+        self.format_timer = stats.stage("imu.format")
+
+        # Retries, error counters and background reinitialization
+        self.guard = SensorGuard("bno08x", reinitialize=reinitialize)
+
+    def open_device(self):
+        """
+        Creates the BNO08X driver and enables the required reports at their intervals;
+        also used to reinitialize the imu after repeated read failures.
+        """
+        # The driver's client takes the bus lock per transfer, not through its reset delays
+        bno = BNO08X_I2C(self.bus.client("bno08x"))
+        for feature in self.features:
+            bno.enable_feature(report_id(feature), report_interval=self.report_intervals[feature])
+        self.report_ids = tuple(report_id(feature) for feature in self.features)
+        self.drain = hasattr(bno, "_process_available_packets") and hasattr(bno, "_readings")
+        self.bno = bno
+
+    def read_reports(self):
+        """
+        Reads every enabled report, in self.features order.
 
-        # Initialize imu values
-        self.accel_x = None
-        self.accel_y = None
-        self.accel_z = None
-        self.gyro_x = None
-        self.gyro_y = None
-        self.gyro_z = None
-        self.mag_x = None
-        self.mag_y = None
-        self.mag_z = None
+        With the hardware driver, all pending SH-2 packets are processed in one pass and the
+        reports are taken from the driver's readings, rather than each property access
+        processing packets again.
+        """
+        if self.drain:
+            self.bno._process_available_packets()
+            readings = self.bno._readings
+            try:
+                return [readings[report] for report in self.report_ids]
+            except KeyError as e:
+                raise RuntimeError(f"No report {e} received yet, is it enabled?")
+        return [getattr(self.bno, feature) for feature in self.features]
 
     def read_data(self):
         """
-        Reads the data from the BNO08X imu and stores it in the object.
+        Reads the data from the BNO08X imu, retrying failed reads within the guard's time budget.
         
-        :return: A tuple containing acceleration, gyroscope, and magnetometer data
+        :return: An ImuSample with acceleration, gyroscope and magnetometer data and the
+                 monotonic capture time. If the read failed, the last good sample marked
+                 stale, or a NaN sample marked substituted (see samples.py). Enabled extra
+                 reports from the same read are stored in self.latest_extras.
         """
-        try:
-            # Read the imu data
-            self.accel_x, self.accel_y, self.accel_z = self.bno.acceleration
-            self.gyro_x, self.gyro_y, self.gyro_z = self.bno.gyro
-            self.mag_x, self.mag_y, self.mag_z = self.bno.magnetic
-
-            # Print the data
-            print("----------------------------------")
-            print(f"Acceleration: X: {self.accel_x:.3f} Y: {self.accel_y:.3f} Z: {self.accel_z:.3f} m/s²")
-            print(f"Gyroscope: X: {self.gyro_x:.3f} Y: {self.gyro_y:.3f} Z: {self.gyro_z:.3f} rad/s")
-            print(f"Magnetometer: X: {self.mag_x:.3f} Y: {self.mag_y:.3f} Z: {self.mag_z:.3f} uT")
-            print("----------------------------------")
-
-            return (self.accel_x, self.accel_y, self.accel_z, 
-                    self.gyro_x, self.gyro_y, self.gyro_z, 
-                    self.mag_x, self.mag_y, self.mag_z)
-
-        except RuntimeError as e:
-            print(f"RuntimeError: {e}. Retrying...")
-            time.sleep(1)
-            return None
-
-    def to_string(self):
+        # Read the imu data
+        timestamp = clock.monotonic()
+        with self.read_timer:
+            reports = self.guard.call(self.read_reports)
+        if reports is None:
+            if self.latest is not None:
+                return StaleImuSample(*self.latest)
+            return SubstitutedImuSample(timestamp, *(math.nan,) * 9)
+
+        (accel_x, accel_y, accel_z), (gyro_x, gyro_y, gyro_z), (mag_x, mag_y, mag_z) = reports[:3]
+        self.latest = ImuSample(timestamp, accel_x, accel_y, accel_z,
+                                gyro_x, gyro_y, gyro_z,
+                                mag_x, mag_y, mag_z)
+        if self.extra_features:
+            self.latest_extras = self.extras(timestamp, reports[3:])
+        return self.latest
+
+    def extras(self, timestamp, reports):
+        """
+        Builds an ImuExtras from the extra reports of one read, NaN for those not enabled.
+        """
+        quaternion = (math.nan,) * 4
+        linear = (math.nan,) * 3
+        for feature, report in zip(self.extra_features, reports):
+            if feature == "quaternion":
+                quaternion = report
+            else:
+                linear = report
+        return ImuExtras(timestamp, *quaternion, *linear)
+
+    def to_string(self, sample=None):
         """
-        Returns a string representation of the imu's current data.
+        Returns a string representation of the imu's data.
         
-        :return: A formatted string with imu data.
+        :param sample: The ImuSample to format (defaults to a fresh reading).
+        :return: A formatted string with imu data, flagged if the sample is stale or substituted.
         """
+        sample = sample or self.read_data()
+        text = self.format_data(sample)
+        return text if sample.status == STATUS_OK else f"{text} ({sample.status})"
 
-        self.read_data()
+    def format_data(self, sample, timer=None):
+        """
+        Formats an ImuSample without touching the hardware.
 
-        return (f"Acceleration: X: {self.accel_x:.3f} Y: {self.accel_y:.3f} Z: {self.accel_z:.3f} m/s², "
-                f"Gyroscope: X: {self.gyro_x:.3f} Y: {self.gyro_y:.3f} Z: {self.gyro_z:.3f} rad/s, "
-                f"Magnetometer: X: {self.mag_x:.3f} Y: {self.mag_y:.3f} Z: {self.mag_z:.3f} uT")
+        :param timer: The StageTimer to time the formatting with (defaults to the imu's
+                      format timer, which belongs to the telemetry writer thread).
+        :return: A formatted string with imu data.
+        """
+        with timer or self.format_timer:
+            return format_imu(*sample[1:])
 
     def test(self):
         """
         Runs a basic test to ensure the imu is working by reading and printing data.
         """
         print("Testing BNO08X imu...")
-        self.read_data()
+        print(self.to_string())
         print("Test completed successfully!")
 
     def stop(self):
@@ -85,7 +185,7 @@ class BNO08XSensor:
         Perform any necessary cleanup actions.
         """
         print("Cleaning up imu resources...")
-        time.sleep(1)  # Example cleanup action
+        self.guard.stop()  # Ends any background reinitialization; the shared bus is closed by its owner
 
 # Example usage
 if __name__ == "__main__":
@@ -100,7 +200,7 @@ if __name__ == "__main__":
         # while True:
         #     imu.read_data()
         #     print(imu.to_string())  # Logging the imu data
-        #     time.sleep(1)  # Read every second
+        #     clock.sleep(1)  # Read every second
 
     except KeyboardInterrupt:
         print("Program interrupted by user.")
@@ -0,0 +1,175 @@
+import time
+import threading
+
+# Histogram buckets split every power of two of ~1 µs (1024 ns) into four, so a
+# bucket index costs one bit_length() and a shift, with at most 25% relative error
+BUCKET_COUNT = 88  # The last bucket collects everything from ~4 s up
+
+def bucket_index(elapsed_ns):
+    """
+    Returns the histogram bucket of a duration in nanoseconds.
+    """
+    units = elapsed_ns >> 10
+    if units < 4:
+        return units
+    bits = units.bit_length()
+    index = 4 * (bits - 2) + ((units >> (bits - 3)) & 3)
+    return index if index < BUCKET_COUNT else BUCKET_COUNT - 1
+
+def bucket_upper_ms(index):
+    """
+    Returns the upper edge of a histogram bucket in milliseconds.
+    """
+    if index < 4:
+        units = index + 1
+    else:
+        bits = index // 4 + 2
+        units = (5 + index % 4) << (bits - 3)
+    return units * 1024 / 1e6
+
+class StageTimer:
+    __slots__ = ("name", "count", "total_ns", "max_ns", "buckets",
+                 "window_count", "window_total_ns", "window_max_ns", "window_buckets", "_start")
+
+    def __init__(self, name):
+        """
+        Initializes the timing counters of one hot-path stage.
+
+        Counters are kept twice: since start-up, and for the current window that
+        dump() reports and resets. Recording a duration allocates nothing and takes
+        no lock, so a timer must only be entered from one thread (or under a lock).
+
+        :param name: The stage name, e.g. "imu.read".
+        """
+        self.name = name
+        self.count = 0
+        self.total_ns = 0
+        self.max_ns = 0
+        self.buckets = [0] * BUCKET_COUNT
+        self.window_count = 0
+        self.window_total_ns = 0
+        self.window_max_ns = 0
+        self.window_buckets = [0] * BUCKET_COUNT
+        self._start = 0
+
+    def add(self, elapsed_ns):
+        """
+        Records one duration.
+
+        :param elapsed_ns: The duration in nanoseconds.
+        """
+        bucket = bucket_index(elapsed_ns)
+        self.count += 1
+        self.total_ns += elapsed_ns
+        self.buckets[bucket] += 1
+        self.window_count += 1
+        self.window_total_ns += elapsed_ns
+        self.window_buckets[bucket] += 1
+        if elapsed_ns > self.max_ns:
+            self.max_ns = elapsed_ns
+        if elapsed_ns > self.window_max_ns:
+            self.window_max_ns = elapsed_ns
+
+    def __enter__(self):
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.add(time.perf_counter_ns() - self._start)
+        return False
+
+    def reset_window(self):
+        self.window_count = 0
+        self.window_total_ns = 0
+        self.window_max_ns = 0
+        for i in range(BUCKET_COUNT):
+            self.window_buckets[i] = 0
+
+    def to_string(self, window=False):
+        """
+        Returns a one-line summary, for the current window or since start-up.
+
+        Percentiles are the upper edge of the histogram bucket they fall in.
+        """
+        if window:
+            count, total_ns, max_ns, buckets = self.window_count, self.window_total_ns, self.window_max_ns, self.window_buckets
+        else:
+            count, total_ns, max_ns, buckets = self.count, self.total_ns, self.max_ns, self.buckets
+        if count == 0:
+            return f"{self.name}: n=0"
+        return (f"{self.name}: n={count} "
+                f"mean={total_ns / count / 1e6:.3f}ms "
+                f"p50<{percentile_ms(buckets, count, 0.50):.3f}ms "
+                f"p99<{percentile_ms(buckets, count, 0.99):.3f}ms "
+                f"max={max_ns / 1e6:.3f}ms")
+
+def percentile_ms(buckets, count, fraction):
+    """
+    Returns the upper bucket edge, in milliseconds, below which a fraction of the durations fall.
+    """
+    threshold = fraction * count
+    seen = 0
+    for i, bucket_count in enumerate(buckets):
+        seen += bucket_count
+        if seen >= threshold:
+            return bucket_upper_ms(i)
+    return bucket_upper_ms(BUCKET_COUNT - 1)
+
+class Instrumentation:
+    def __init__(self):
+        """
+        Initializes a registry of stage timers.
+        """
+        self.stages = {}
+        self._lock = threading.Lock()
+        self.last_dump = time.monotonic()
+
+    def stage(self, name):
+        """
+        Returns the timer for a stage, creating it on first use.
+
+        Use it as "with stats.stage('poll'):" or call add() with a measured duration.
+        A timer must only be entered from one thread at a time.
+        """
+        timer = self.stages.get(name)
+        if timer is None:
+            with self._lock:
+                timer = self.stages.setdefault(name, StageTimer(name))
+        return timer
+
+    def due(self, interval):
+        """
+        Returns True once every interval seconds, to pace periodic dumps.
+        """
+        now = time.monotonic()
+        if now - self.last_dump >= interval:
+            self.last_dump = now
+            return True
+        return False
+
+    def dump(self):
+        """
+        Returns the current window of every stage as one line and starts a new window.
+        """
+        parts = []
+        for timer in list(self.stages.values()):
+            if timer.window_count:
+                parts.append(timer.to_string(window=True))
+            timer.reset_window()
+        return "; ".join(parts)
+
+    def summary(self):
+        """
+        Returns a multi-line summary of every stage since start-up.
+        """
+        return "\n".join(timer.to_string() for timer in list(self.stages.values()))
+
+# Shared registry used by the sensors, the telemetry writer and flight_program
+stats = Instrumentation()
+
+# Example usage
+if __name__ == "__main__":
+    for _ in range(100):
+        with stats.stage("sleep.1ms"):
+            time.sleep(0.001)
+    print(stats.summary())
@@ -0,0 +1,211 @@
+import os
+import re
+import sys
+import glob
+import time
+import numpy as np
+import telemetry_format
+
+# A number as written by log_telemetry, including "nan" for missing values
+NUMBER = r"(-?(?:\d+\.?\d*|inf)|nan)"
+TIMESTAMP = r"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),(\d{3}) - "
+
+IMU_PATTERN = re.compile(
+    TIMESTAMP + r"IMU Telemetry: "
+    rf"Acceleration: X: {NUMBER} Y: {NUMBER} Z: {NUMBER} m/s², "
+    rf"Gyroscope: X: {NUMBER} Y: {NUMBER} Z: {NUMBER} rad/s, "
+    rf"Magnetometer: X: {NUMBER} Y: {NUMBER} Z: {NUMBER} uT", re.MULTILINE)
+
+# Early logs spell it "Displacment"; accept both spellings
+SENSOR_PATTERN = re.compile(
+    TIMESTAMP + r"Sensor Telemetry: "
+    rf"Temperature: {NUMBER} C, Humidity: {NUMBER} %, Pressure: {NUMBER} hPa, "
+    rf"Gas Resistance: {NUMBER} ohms, Altitude: {NUMBER} meters, Displace?ment: {NUMBER} meters", re.MULTILINE)
+
+# Anything else that is not a separator line (markers, plateau counts, statistics)
+EVENT_PATTERN = re.compile(TIMESTAMP + r"(?!IMU Telemetry|Sensor Telemetry|-+\s*$)(.*?)\s*$", re.MULTILINE)
+
+IMU_FIELDS = telemetry_format.IMU_FIELDS
+SENSOR_FIELDS = telemetry_format.SENSOR_FIELDS
+
+# Record layouts of the binary telemetry format, for reading a whole file with one np.frombuffer call
+IMU_DTYPE = np.dtype([("type", "u1"), ("pad", "V3"), ("timestamp", "<f8"), ("data", "<f4", 9)])
+SENSOR_DTYPE = np.dtype([("type", "u1"), ("pad", "V3"), ("timestamp", "<f8"), ("temperature", "<f4"),
+                         ("humidity", "<f4"), ("pressure", "<f8"), ("rest", "<f4", 3), ("tail", "V8")])
+
+def _times(matches):
+    """
+    Converts the timestamp groups of regex matches to float seconds since the epoch.
+
+    Log timestamps carry no timezone; they are treated as UTC, which keeps
+    differences between them exact.
+    """
+    if not matches:
+        return np.empty(0)
+    seconds = np.array([m[0] for m in matches], dtype="datetime64[s]").astype(np.int64)
+    milliseconds = np.array([m[1] for m in matches], dtype=np.int64)
+    return seconds + milliseconds / 1000.0
+
+def _columns(matches, fields):
+    """
+    Converts the numeric groups of regex matches to one float64 array per field.
+    """
+    values = np.array([m[2:] for m in matches], dtype=float).reshape(len(matches), len(fields))
+    return {field: values[:, i] for i, field in enumerate(fields)}
+
+def parse_text(text):
+    """
+    Parses the contents of a text telemetry log in bulk.
+
+    :param text: The log file contents.
+    :return: A tuple (imu, sensor, events) of column dicts. imu and sensor map "time"
+             and each field name to a NumPy array; events maps "time" to an array and
+             "message" to a list of strings.
+    """
+    imu_matches = IMU_PATTERN.findall(text)
+    sensor_matches = SENSOR_PATTERN.findall(text)
+    event_matches = EVENT_PATTERN.findall(text)
+
+    imu = {"time": _times(imu_matches), **_columns(imu_matches, IMU_FIELDS)}
+    sensor = {"time": _times(sensor_matches), **_columns(sensor_matches, SENSOR_FIELDS)}
+    events = {"time": _times(event_matches), "message": [m[2] for m in event_matches]}
+    return imu, sensor, events
+
+def parse_binary(data):
+    """
+    Parses the contents of a binary telemetry file (see telemetry_format) in bulk.
+
+    :param data: The file contents as bytes.
+    :return: A tuple (imu, sensor, events) in the same layout as parse_text, with
+             times converted to local wall-clock seconds (like the text logs) using the file header.
+    """
+    header_size = telemetry_format.HEADER_STRUCT.size
+    magic, version, record_size, wall_time, monotonic_time = telemetry_format.HEADER_STRUCT.unpack_from(data)
+    if magic != telemetry_format.MAGIC or record_size != telemetry_format.RECORD_SIZE:
+        raise ValueError("Not a binary telemetry file")
+
+    count = (len(data) - header_size) // record_size
+    records = np.frombuffer(data, dtype=IMU_DTYPE, count=count, offset=header_size)
+    kinds = records["type"]
+    offset = wall_time - monotonic_time + time.localtime(wall_time).tm_gmtoff
+
+    imu_records = records[kinds == telemetry_format.RECORD_IMU]
+    imu = {"time": imu_records["timestamp"] + offset}
+    for i, field in enumerate(IMU_FIELDS):
+        imu[field] = imu_records["data"][:, i].astype(float)
+
+    sensor_records = np.frombuffer(data, dtype=SENSOR_DTYPE, count=count, offset=header_size)
+    sensor_records = sensor_records[kinds == telemetry_format.RECORD_SENSOR]
+    sensor = {"time": sensor_records["timestamp"] + offset,
+              "temperature": sensor_records["temperature"].astype(float),
+              "humidity": sensor_records["humidity"].astype(float),
+              "pressure": sensor_records["pressure"].astype(float)}
+    for i, field in enumerate(SENSOR_FIELDS[3:]):
+        sensor[field] = sensor_records["rest"][:, i].astype(float)
+
+    event_times = []
+    messages = []
+    for index in np.flatnonzero(kinds == telemetry_format.RECORD_EVENT):
+        record_type, timestamp, text = telemetry_format.unpack_record(data, header_size + index * record_size)
+        event_times.append(timestamp + offset)
+        messages.append(text)
+    events = {"time": np.array(event_times, dtype=float), "message": messages}
+    return imu, sensor, events
+
+def pair(imu, sensor, tolerance=0.5):
+    """
+    Pairs every sensor row with the closest IMU row logged at or before it.
+
+    :param imu: IMU columns from parse_text or parse_binary.
+    :param sensor: Sensor columns from parse_text or parse_binary.
+    :param tolerance: The largest time gap in seconds that still counts as a pair;
+                      sensor rows without an IMU row that close get NaN IMU fields.
+    :return: A dict with "time", every sensor field and every IMU field as NumPy arrays.
+    """
+    sensor_times = sensor["time"]
+    index = np.searchsorted(imu["time"], sensor_times, side="right") - 1
+    valid = index >= 0
+    if len(imu["time"]):
+        gap = sensor_times - imu["time"][np.clip(index, 0, None)]
+        valid &= gap <= tolerance
+    index = np.where(valid, index, 0)
+
+    columns = dict(sensor)
+    for field in IMU_FIELDS:
+        values = imu[field][index] if len(imu["time"]) else np.full(len(sensor_times), np.nan)
+        columns[field] = np.where(valid, values, np.nan)
+    return columns
+
+def read_log(path):
+    """
+    Parses one telemetry log, text or binary, without pairing rows.
+
+    :param path: The path of a telemetry_log_* file.
+    :return: A tuple (imu, sensor, events) of column dicts.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    if data[:4] == telemetry_format.MAGIC:
+        return parse_binary(data)
+    return parse_text(data.decode("utf-8", "replace"))
+
+def load_log(path, tolerance=0.5):
+    """
+    Loads one telemetry log into paired columns.
+
+    :param path: The path of a telemetry_log_* file.
+    :param tolerance: The largest IMU/sensor time gap in seconds that still counts as a pair.
+    :return: A dict of NumPy arrays, one per field, with one row per sensor sample.
+    """
+    imu, sensor, events = read_log(path)
+    return pair(imu, sensor, tolerance)
+
+def find_logs(paths=("logs", "sli/logs")):
+    """
+    Lists the telemetry logs in the given files and directories, sorted by name (start time).
+    """
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(glob.glob(os.path.join(path, "telemetry_log_*.log")))
+            files.extend(glob.glob(os.path.join(path, "telemetry_log_*.bin")))
+        elif os.path.exists(path):
+            files.append(path)
+    return sorted(files, key=os.path.basename)
+
+def load_logs(paths=("logs", "sli/logs"), tolerance=0.5):
+    """
+    Loads every telemetry log in the given files and directories into one set of columns.
+
+    :param paths: Files and/or directories to load.
+    :param tolerance: The largest IMU/sensor time gap in seconds that still counts as a pair.
+    :return: A tuple (columns, files): columns holds the paired columns of all logs plus a
+             "flight" column indexing into files, the list of loaded file paths.
+    """
+    files = find_logs(paths)
+    parts = [load_log(path, tolerance) for path in files]
+    fields = ("time",) + SENSOR_FIELDS + IMU_FIELDS
+    columns = {field: np.concatenate([part[field] for part in parts]) if parts else np.empty(0) for field in fields}
+    columns["flight"] = np.repeat(np.arange(len(parts)), [len(part["time"]) for part in parts]).astype(np.int32)
+    return columns, files
+
+def to_dataframe(columns):
+    """
+    Converts loaded columns to a pandas DataFrame with a datetime "time" column.
+
+    Requires pandas, which the flight computer does not need.
+    """
+    import pandas as pd
+    frame = pd.DataFrame(columns)
+    frame["time"] = pd.to_datetime(frame["time"], unit="s")
+    return frame
+
+# Example usage
+if __name__ == "__main__":
+    start = time.perf_counter()
+    columns, files = load_logs(sys.argv[1:] or ("logs", "sli/logs"))
+    elapsed = time.perf_counter() - start
+
+    print(f"Loaded {len(columns['time'])} samples from {len(files)} logs in {elapsed * 1000:.1f} ms")
+    if len(columns["time"]):
+        print(f"Displacement: min {np.nanmin(columns['displacement']):.2f} m, max {np.nanmax(columns['displacement']):.2f} m")
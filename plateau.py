@@ -0,0 +1,298 @@
+import sys
+import time
+import math
+
+def _slope(count, sum_t, sum_v, sum_tt, sum_tv):
+    # Least-squares slope of v over t from running sums
+    if count < 2:
+        return 0.0
+    denominator = count * sum_tt - sum_t * sum_t
+    if denominator <= 1e-12:
+        return 0.0
+    return (count * sum_tv - sum_t * sum_v) / denominator
+
+def _slope_error(noise, count, sum_t, sum_tt):
+    # Standard error of a least-squares slope for samples with the given noise
+    if count < 3:
+        return math.inf
+    sxx = sum_tt - sum_t * sum_t / count
+    if sxx <= 1e-12:
+        return math.inf
+    return noise / math.sqrt(sxx)
+
+class PlateauDetector:
+    def __init__(self, window=1.5, minimum=100, maximum=300, max_stdev=15.0, max_speed=5.0,
+                 min_coverage=0.75, hold=0.2, capacity=512):
+        """
+        Initializes a streaming plateau detector over a time-based window of displacement samples.
+
+        Running sums of t, v, t², t·v and v² are kept for the samples in the window, so
+        the rolling mean, variance and least-squares vertical-velocity slope cost O(1)
+        per sample. Storage is preallocated; nothing is allocated per update beyond floats.
+
+        The window slope must stay within max_speed even after adding its standard error,
+        so noise cannot pass a descent for a plateau, and so must the slope of the latest
+        half of the window: over the turnaround at apogee the window slope is close to
+        zero, but the latest half is already descending. The criteria must then keep
+        holding for hold seconds, as a noisy descent only passes them for single samples.
+
+        :param window: The window length in seconds.
+        :param minimum: The lowest mean displacement in meters that counts as a plateau.
+        :param maximum: The highest mean displacement in meters that counts as a plateau.
+        :param max_stdev: The largest displacement standard deviation in meters within the window.
+        :param max_speed: The largest vertical speed in m/s, for the window slope and the
+                          latest half window's slope, each plus its standard error.
+        :param min_coverage: The fraction of the window the samples must span before deciding.
+        :param hold: The time in seconds the criteria must hold without a break before a plateau is reported.
+        :param capacity: The maximum number of samples held; the oldest is evicted when full.
+        """
+        self.window = window
+        self.minimum = minimum
+        self.maximum = maximum
+        self.max_stdev = max_stdev
+        self.max_speed = max_speed
+        self.min_coverage = min_coverage
+        self.hold = hold
+        self.capacity = capacity
+
+        self.times = [0.0] * capacity
+        self.values = [0.0] * capacity
+        self.reset()
+
+    def reset(self):
+        """
+        Empties the window.
+        """
+        self.head = 0  # Index of the oldest sample
+        self.count = 0
+        self.origin = None  # Times are stored relative to the first sample, for precision
+        self.sum_t = 0.0
+        self.sum_v = 0.0
+        self.sum_tt = 0.0
+        self.sum_tv = 0.0
+        self.sum_vv = 0.0
+        self.recent_head = 0  # Index of the oldest sample in the latest half of the window
+        self.recent_count = 0
+        self.recent_t = 0.0
+        self.recent_v = 0.0
+        self.recent_tt = 0.0
+        self.recent_tv = 0.0
+        self.steady_since = None  # Time of the first sample of the current run that met the criteria
+        self.plateau = False
+        self.plateau_since = None
+
+    def _evict(self):
+        if self.recent_count == self.count:
+            self._evict_recent()
+        t = self.times[self.head]
+        v = self.values[self.head]
+        self.sum_t -= t
+        self.sum_v -= v
+        self.sum_tt -= t * t
+        self.sum_tv -= t * v
+        self.sum_vv -= v * v
+        self.head = (self.head + 1) % self.capacity
+        self.count -= 1
+
+    def _evict_recent(self):
+        t = self.times[self.recent_head]
+        v = self.values[self.recent_head]
+        self.recent_t -= t
+        self.recent_v -= v
+        self.recent_tt -= t * t
+        self.recent_tv -= t * v
+        self.recent_head = (self.recent_head + 1) % self.capacity
+        self.recent_count -= 1
+
+    def update(self, timestamp, displacement):
+        """
+        Adds one sample and re-evaluates the plateau criteria.
+
+        :param timestamp: The sample time in seconds (e.g. a SensorSample timestamp).
+        :param displacement: The displacement in meters.
+        :return: True while the window is on a plateau.
+        """
+        if self.origin is None:
+            self.origin = timestamp
+        t = timestamp - self.origin
+
+        # Drop samples that fell out of the window, or the oldest one if storage is full
+        start = t - self.window
+        while self.count and self.times[self.head] < start:
+            self._evict()
+        if self.count == self.capacity:
+            self._evict()
+
+        tail = (self.head + self.count) % self.capacity
+        self.times[tail] = t
+        self.values[tail] = displacement
+        self.count += 1
+        self.sum_t += t
+        self.sum_v += displacement
+        self.sum_tt += t * t
+        self.sum_tv += t * displacement
+        self.sum_vv += displacement * displacement
+
+        if self.recent_count == 0:
+            self.recent_head = tail
+        self.recent_count += 1
+        self.recent_t += t
+        self.recent_v += displacement
+        self.recent_tt += t * t
+        self.recent_tv += t * displacement
+        start = t - self.window / 2
+        while self.recent_count > 1 and self.times[self.recent_head] < start:
+            self._evict_recent()
+
+        steady = (self.span() >= self.window * self.min_coverage
+                  and self.minimum <= self.mean() <= self.maximum
+                  and self.stdev() <= self.max_stdev
+                  and abs(self.slope()) + self.slope_error() <= self.max_speed
+                  and abs(self.recent_slope()) + self.recent_slope_error() <= self.max_speed)
+        if not steady:
+            self.steady_since = None
+        elif self.steady_since is None:
+            self.steady_since = timestamp
+        plateau = steady and timestamp - self.steady_since >= self.hold
+        if plateau and not self.plateau:
+            self.plateau_since = timestamp
+        self.plateau = plateau
+        return plateau
+
+    def span(self):
+        """
+        Returns the time covered by the samples in the window, in seconds.
+        """
+        if self.count < 2:
+            return 0.0
+        return self.times[(self.head + self.count - 1) % self.capacity] - self.times[self.head]
+
+    def mean(self):
+        """
+        Returns the mean displacement in the window.
+        """
+        return self.sum_v / self.count if self.count else math.nan
+
+    def variance(self):
+        """
+        Returns the displacement variance in the window.
+        """
+        if self.count < 2:
+            return 0.0
+        mean = self.sum_v / self.count
+        return max(0.0, self.sum_vv / self.count - mean * mean)
+
+    def stdev(self):
+        return math.sqrt(self.variance())
+
+    def slope(self):
+        """
+        Returns the least-squares vertical velocity over the window in m/s.
+        """
+        return _slope(self.count, self.sum_t, self.sum_v, self.sum_tt, self.sum_tv)
+
+    def noise(self):
+        """
+        Returns the standard deviation in meters of the window samples around the fitted line.
+        """
+        n = self.count
+        if n < 3:
+            return math.inf
+        sxx = self.sum_tt - self.sum_t * self.sum_t / n
+        if sxx <= 1e-12:
+            return math.inf
+        sxv = self.sum_tv - self.sum_t * self.sum_v / n
+        svv = self.sum_vv - self.sum_v * self.sum_v / n
+        return math.sqrt(max(0.0, svv - sxv * sxv / sxx) / (n - 2))
+
+    def slope_error(self):
+        """
+        Returns the standard error of the window slope in m/s.
+        """
+        return _slope_error(self.noise(), self.count, self.sum_t, self.sum_tt)
+
+    def recent_slope_error(self):
+        """
+        Returns the standard error of the latest half window's slope in m/s. The noise is
+        estimated over the whole window, as the half holds too few samples to tell.
+        """
+        return _slope_error(self.noise(), self.recent_count, self.recent_t, self.recent_tt)
+
+    def recent_slope(self):
+        """
+        Returns the least-squares vertical velocity over the latest half of the window in m/s.
+        """
+        return _slope(self.recent_count, self.recent_t, self.recent_v, self.recent_tt, self.recent_tv)
+
+    def in_range(self):
+        """
+        Returns True if the window mean lies in the collection range.
+        """
+        return self.count > 0 and self.minimum <= self.mean() <= self.maximum
+
+    def to_string(self):
+        """
+        Returns a string representation of the window statistics.
+        """
+        return (f"Mean: {self.mean():.2f} m, "
+                f"Std Dev: {self.stdev():.2f} m, "
+                f"Vertical Speed: {self.slope():.2f} m/s, "
+                f"Recent Speed: {self.recent_slope():.2f} m/s, "
+                f"Span: {self.span():.2f} s, "
+                f"Samples: {self.count}, "
+                f"Plateau: {self.plateau}")
+
+# The settings flight_program triggers the sampling with, defined once so the simulation
+# and analysis tools replay the same condition without importing the flight program
+FLIGHT_SETTINGS = {
+    "window": 1.4,  # Seconds the displacement must hold steady in range before sampling
+    "minimum": 100,  # Collection range in meters
+    "maximum": 300,
+    "max_stdev": 15.0,  # Largest displacement spread in meters over the window
+    "max_speed": 5.0,  # Largest vertical speed in m/s over the window
+    "hold": 0.2,  # Seconds the criteria must keep holding before sampling
+}
+
+def plateau_config():
+    """
+    Returns a copy of the PlateauDetector settings the flight runs with.
+    """
+    return dict(FLIGHT_SETTINGS)
+
+def first_plateau(times, displacements, **config):
+    """
+    Runs a detector over a recorded series and returns the time of the first plateau.
+
+    :param times: Sample times in seconds.
+    :param displacements: Displacements in meters.
+    :param config: PlateauDetector settings.
+    :return: The time at which the plateau was first detected, or None.
+    """
+    detector = PlateauDetector(**config)
+    for timestamp, displacement in zip(times, displacements):
+        if detector.update(timestamp, displacement):
+            return timestamp
+    return None
+
+# Example usage
+if __name__ == "__main__":
+    # Replay every logged flight through the detector and time it
+    from log_loader import find_logs, read_log
+
+    total = 0
+    elapsed = 0.0
+    for path in find_logs(sys.argv[1:] or ("logs", "sli/logs")):
+        imu, sensor, events = read_log(path)
+        times = sensor["time"].tolist()
+        displacements = sensor["displacement"].tolist()
+
+        start = time.perf_counter()
+        detected = first_plateau(times, displacements)
+        elapsed += time.perf_counter() - start
+        total += len(times)
+
+        if detected is not None:
+            print(f"{path}: plateau at {detected - times[0]:.1f} s")
+
+    if total:
+        print(f"{total} samples in {elapsed * 1000:.1f} ms ({elapsed / total * 1e6:.2f} us per update)")
@@ -0,0 +1,42 @@
+from collections import namedtuple
+from telemetry_format import IMU_FIELDS, SENSOR_FIELDS
+
+# Immutable sample records returned by the sensor read_data methods. Every record
+# carries the clock.monotonic time it was captured at, so one hardware read can be
+# shared by the logger, the trigger logic and any other consumer.
+
+ImuSample = namedtuple("ImuSample", ("timestamp",) + IMU_FIELDS)
+ImuSample.__doc__ = "One BNO08X reading: acceleration (m/s²), gyroscope (rad/s) and magnetometer (uT) axes."
+
+SensorSample = namedtuple("SensorSample", ("timestamp",) + SENSOR_FIELDS)
+SensorSample.__doc__ = "One BME688 reading: temperature (C), humidity (%), pressure (hPa), gas resistance (ohms), altitude and displacement (m)."
+
+# When a read fails, read_data returns a marked record instead of blocking: the last good
+# sample unchanged (stale), or NaN values if there is none yet (substituted). The marked
+# classes have the same fields, so formatting and logging treat them like any sample.
+STATUS_OK = "ok"
+STATUS_STALE = "stale"
+STATUS_SUBSTITUTED = "substituted"
+
+ImuSample.status = STATUS_OK
+SensorSample.status = STATUS_OK
+
+class StaleImuSample(ImuSample):
+    __slots__ = ()
+    status = STATUS_STALE
+
+class SubstitutedImuSample(ImuSample):
+    __slots__ = ()
+    status = STATUS_SUBSTITUTED
+
+class StaleSensorSample(SensorSample):
+    __slots__ = ()
+    status = STATUS_STALE
+
+class SubstitutedSensorSample(SensorSample):
+    __slots__ = ()
+    status = STATUS_SUBSTITUTED
+
+ImuExtras = namedtuple("ImuExtras", ("timestamp", "quat_i", "quat_j", "quat_k", "quat_real",
+                                     "linear_x", "linear_y", "linear_z"))
+ImuExtras.__doc__ = "Optional BNO08X reports from the same read as an ImuSample: rotation vector quaternion and linear acceleration (m/s², gravity removed); NaN when not enabled."
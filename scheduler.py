@@ -0,0 +1,128 @@
+import clock
+
+class FixedRateScheduler:
+    def __init__(self, rate_hz, overrun_policy="skip"):
+        """
+        Initializes a fixed-rate scheduler driven by clock.monotonic deadlines.
+
+        Deadlines sit on a fixed grid (start + n * period), so the time spent
+        doing work inside a tick does not stretch the period.
+
+        :param rate_hz: The target loop rate in ticks per second.
+        :param overrun_policy: What to do when a tick runs past its deadline:
+                               "skip" drops the missed slots and realigns to the next
+                               deadline on the grid, "catch_up" runs the missed ticks
+                               back to back until the loop is on schedule again.
+        """
+        if rate_hz <= 0:
+            raise ValueError("rate_hz must be positive")
+        if overrun_policy not in ("skip", "catch_up"):
+            raise ValueError(f"Unknown overrun policy: {overrun_policy}")
+
+        self.rate_hz = rate_hz
+        self.period = 1.0 / rate_hz
+        self.overrun_policy = overrun_policy
+
+        # Scheduler statistics
+        self.ticks = 0
+        self.missed_deadlines = 0
+        self.max_overrun = 0.0
+
+        self.start_time = None
+        self.next_deadline = None
+        self._counted_ahead = 0  # Passed deadlines after next_deadline already in missed_deadlines
+
+    def start(self):
+        """
+        (Re)starts the deadline grid at the current time.
+        """
+        self.start_time = clock.monotonic()
+        self.next_deadline = self.start_time + self.period
+        self._counted_ahead = 0
+
+    def wait(self):
+        """
+        Blocks until the next deadline and advances the grid.
+
+        :return: The number of deadlines missed since the previous call (0 when on time).
+        """
+        if self.next_deadline is None:
+            self.start()
+
+        self.ticks += 1
+        now = clock.monotonic()
+        lateness = now - self.next_deadline
+
+        if lateness <= 0:
+            clock.sleep(-lateness)
+            self.next_deadline += self.period
+            self._counted_ahead = 0
+            return 0
+
+        # The tick overran its deadline; while catching up, the same passed deadlines
+        # are seen again on every call, so only the ones not counted yet are added
+        self.max_overrun = max(self.max_overrun, lateness)
+        passed = int(lateness // self.period) + 1
+        missed = max(0, passed - self._counted_ahead)
+        self.missed_deadlines += missed
+
+        if self.overrun_policy == "skip":
+            # Realign to the first deadline on the grid that is still ahead of us
+            self.next_deadline += passed * self.period
+            clock.sleep(max(0.0, self.next_deadline - clock.monotonic()))
+            self.next_deadline += self.period
+            self._counted_ahead = 0
+        else:
+            # Run the next tick immediately; later ticks keep their original deadlines
+            self.next_deadline += self.period
+            self._counted_ahead = passed - 1
+
+        return missed
+
+    def run(self, task, should_continue=lambda: True):
+        """
+        Calls task() once per period for as long as should_continue() returns True.
+
+        :param task: A callable with no arguments executed on every tick.
+        :param should_continue: A callable returning False to end the loop.
+        """
+        self.start()
+        while should_continue():
+            task()
+            self.wait()
+
+    def achieved_rate(self):
+        """
+        Returns the average tick rate since start() in ticks per second.
+        """
+        if self.start_time is None or self.ticks == 0:
+            return 0.0
+        elapsed = clock.monotonic() - self.start_time
+        return self.ticks / elapsed if elapsed > 0 else 0.0
+
+    def to_string(self):
+        """
+        Returns a string representation of the scheduler's statistics.
+
+        :return: A formatted string with scheduler statistics.
+        """
+        return (f"Target Rate: {self.rate_hz:.1f} Hz, "
+                f"Achieved Rate: {self.achieved_rate():.2f} Hz, "
+                f"Ticks: {self.ticks}, "
+                f"Missed Deadlines: {self.missed_deadlines}, "
+                f"Max Overrun: {self.max_overrun * 1000:.1f} ms")
+
+# Example usage
+if __name__ == "__main__":
+    # Run a 10 Hz loop with a task that sometimes overruns
+    scheduler = FixedRateScheduler(rate_hz=10, overrun_policy="skip")
+
+    def task():
+        clock.sleep(0.15 if scheduler.ticks % 5 == 4 else 0.02)
+
+    try:
+        scheduler.run(task, should_continue=lambda: scheduler.ticks < 30)
+        print(scheduler.to_string())
+
+    except KeyboardInterrupt:
+        print("Program interrupted by user.")
@@ -1,113 +1,266 @@
-import time
-import board
-import adafruit_bme680
+import clock
+import math
+from telemetry_format import format_sensor
+from samples import SensorSample, StaleSensorSample, SubstitutedSensorSample, STATUS_OK
+from instrumentation import stats
+from altimetry import AltitudeEngine, MODEL_ISA
+from i2c_bus import I2CBus, shared_bus
+from faults import SensorGuard
+
+try:
+    import adafruit_bme680
+except (ImportError, NotImplementedError):  # Not on the Pi; pass a device instead (see backends.py)
+    adafruit_bme680 = None
+
+PROFILE_FLIGHT = "flight"  # Pressure and temperature only, as fast as the chip allows
+PROFILE_FULL = "full"  # Every field including the heated gas measurement
+
+# Measurement profiles: fields read each cycle and the chip settings that go with them.
+# Oversampling is 0 (skipped), 1, 2, 4, 8 or 16; filter_size is the IIR filter coefficient.
+PROFILES = {
+    PROFILE_FLIGHT: {"fields": ("temperature", "pressure"),
+                     "temperature_oversample": 1, "pressure_oversample": 4, "humidity_oversample": 0,
+                     "filter_size": 3, "gas": False},
+    PROFILE_FULL: {"fields": ("temperature", "humidity", "pressure", "gas"),
+                   "temperature_oversample": 8, "pressure_oversample": 4, "humidity_oversample": 2,
+                   "filter_size": 3, "gas": True},
+}
+
+def measurement_time(profile):
+    """
+    Returns the duration in seconds of one forced-mode measurement without the gas heater,
+    as the Bosch BME68x sensor API estimates it: 1.963 ms per oversampling cycle of
+    temperature, pressure and humidity, plus 4.77 ms for switching between them and the gas step.
+    """
+    settings = PROFILES[profile]
+    cycles = sum(settings[field] for field in ("temperature_oversample", "pressure_oversample", "humidity_oversample"))
+    return (1.963 * cycles + 4.77) / 1000
 
 class BME688Sensor:
-    def __init__(self, sea_level_pressure=1013.25):
+    def __init__(self, sea_level_pressure=1013.25, device=None, altitude_model=MODEL_ISA, bus=None, profile=PROFILE_FULL):
         """
         Initializes the BME688 sensor and sets up I2C connection.
         
         :param sea_level_pressure: The standard sea level pressure in hPa.
+        :param device: An object with the Adafruit_BME680 interface to read from instead of
+                       the hardware, e.g. a recording or replay device from backends.py.
+        :param altitude_model: The altitude model, altimetry.MODEL_ISA or MODEL_HYPSOMETRIC.
+        :param bus: The I2CBus shared with the other sensors (defaults to i2c_bus.shared_bus()).
+        :param profile: The measurement profile, PROFILE_FLIGHT or PROFILE_FULL (see PROFILES).
         """
-        # Create I2C object
-        self.i2c = board.I2C()  # Uses default I2C pins (SCL, SDA)
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown BME688 profile: {profile}")
+        self.profile = profile
+        self.sea_level_pressure = sea_level_pressure
+        settings = PROFILES[profile]
+        self.read_humidity = "humidity" in settings["fields"]
+        self.read_gas = "gas" in settings["fields"]
+
+        # With the Adafruit driver, every property read can start its own measurement;
+        # read_data starts exactly one and holds it for all the fields it reads
+        self.single_cycle = False
+
+        if device is not None:
+            self.bus = bus or I2CBus(open=False)
+            self.bme = device
+            reinitialize = None
+        else:
+            if adafruit_bme680 is None:
+                raise RuntimeError("BME688 hardware libraries are not available; pass a device")
 
-        # Create BME688 sensor object
-        self.bme = adafruit_bme680.Adafruit_BME680_I2C(self.i2c)
+            # Share one I2C bus with the IMU
+            self.bus = bus or shared_bus()
+            self.open_device()
+            reinitialize = self.open_device
+        self.i2c = self.bus.i2c
+        self.transaction = self.bus.device("bme688")
+
+        # Achieved sample rate
+        self.reads = 0
+        self.first_read = None
+        self.last_read = None
 
         # Adjust settings (optional)
-        self.bme.sea_level_pressure = sea_level_pressure
+        self.bme.sea_level_pressure = self.sea_level_pressure
+
+        # Latest SensorSample returned by read_data
+        self.latest = None
+
+        # Hot-path timing counters
+        self.read_timer = stats.stage("bme688.read")
+        self.format_timer = stats.stage("bme688.format")
 
-        # Initialize sensor values
-        self.temperature = None
-        self.humidity = None
-        self.pressure = None
-        self.gas_resistance = None
-        self.altitude = None
-        self.displacement = None
+        # Retries, error counters and background reinitialization
+        self.guard = SensorGuard("bme688", reinitialize=reinitialize)
 
+        self.start_cycle()
         self.init_pressure = self.bme.pressure
         self.init_temperature = self.bme.temperature
 
+        # Altitude and displacement are computed against a ground reference cached once here
+        self.altitude = AltitudeEngine(altitude_model, sea_level_pressure)
+        self.altitude.set_ground(self.init_pressure, self.init_temperature)
+
+    def set_ground(self, pressure, temperature):
+        """
+        Replaces the ground reference read at start-up, e.g. with an averaged or cached calibration.
+
+        :param pressure: The ground pressure in hPa.
+        :param temperature: The ground temperature in Celsius.
+        """
+        self.init_pressure = pressure
+        self.init_temperature = temperature
+        self.altitude.set_ground(pressure, temperature)
+
+    def open_device(self):
+        """
+        Creates the BME688 driver with the profile's settings; also used to reinitialize
+        the sensor after repeated read failures.
+        """
+        # The driver's client takes the bus lock per transfer, not through its start-up delays
+        self.bme = adafruit_bme680.Adafruit_BME680_I2C(self.bus.client("bme688"))
+        self.configure(PROFILES[self.profile])
+        self.bme.sea_level_pressure = self.sea_level_pressure
+
+    def configure(self, settings):
+        """
+        Applies a profile's oversampling, IIR filter and gas heater settings to the driver.
+        """
+        self.bme.temperature_oversample = settings["temperature_oversample"]
+        self.bme.pressure_oversample = settings["pressure_oversample"]
+        self.bme.humidity_oversample = settings["humidity_oversample"]
+        self.bme.filter_size = settings["filter_size"]
+        if not settings["gas"] and hasattr(self.bme, "set_gas_heater"):
+            self.bme.set_gas_heater(None, None)  # Heater off: no 100+ ms heating phase per measurement
+
+        # Property reads within this time reuse the last measurement instead of starting one
+        if hasattr(self.bme, "_min_refresh_time"):
+            self.bme._min_refresh_time = 1.0
+            self.single_cycle = True
+
+    def start_cycle(self):
+        """
+        Makes the next property read start a new measurement that the following reads share.
+        """
+        if self.single_cycle:
+            self.bme._last_reading = 0
+
+    def read_fields(self):
+        """
+        Reads the fields of the measurement profile in one measurement cycle.
+
+        :return: A tuple (temperature, humidity, pressure, gas_resistance); fields outside the profile are NaN.
+        """
+        # No bus lock here: the measurement waits, up to 100+ ms with the gas heater, must not
+        # block the IMU; the driver's client locks each register transfer instead
+        self.start_cycle()
+        temperature = self.bme.temperature
+        pressure = self.bme.pressure
+        humidity = self.bme.humidity if self.read_humidity else math.nan
+        gas_resistance = self.bme.gas if self.read_gas else math.nan
+        return temperature, humidity, pressure, gas_resistance
+
     def read_data(self):
         """
-        Reads the data from the BME688 sensor.
+        Reads the fields of the measurement profile from the BME688 sensor in one measurement
+        cycle, retrying failed reads within the guard's time budget.
         
-        :return: A tuple containing temperature, humidity, pressure, gas resistance, and altitude
+        :return: A SensorSample with temperature, humidity, pressure, gas resistance, altitude,
+                 displacement and the monotonic capture time; fields outside the profile are NaN.
+                 If the read failed, the last good sample marked stale, or a NaN sample marked
+                 substituted (see samples.py).
         """
         # Read sensor data
-        self.temperature = self.bme.temperature
-        self.humidity = self.bme.humidity
-        self.pressure = self.bme.pressure
-        self.gas_resistance = self.bme.gas
-
-        # Calculate altitude using the pressure and sea level pressure
-        self.altitude = self.calculate_altitude(pressure=self.pressure, temperature=self.temperature)
-        self.displacement = self.calculate_displacement()
-
-        # Print the data
-        print("----------------------------------")
-        print(f"Temperature: {self.temperature:.2f} C")
-        print(f"Humidity: {self.humidity:.2f} %")
-        print(f"Pressure: {self.pressure:.2f} hPa")
-        print(f"Gas Resistance: {self.gas_resistance:.2f} ohms")
-        print(f"Altitude: {self.altitude:.2f} meters")
-        print(f"Displacement: {self.displacement:.2f} meters")
-        print("----------------------------------")
-
-        return (self.temperature, self.humidity, self.pressure, self.gas_resistance, self.altitude)
-
-    def to_string(self):
-        """
-        Returns a string representation of the sensor's current data.
+        timestamp = clock.monotonic()
+        with self.read_timer:
+            fields = self.guard.call(self.read_fields)
+        if fields is None:
+            if self.latest is not None:
+                return StaleSensorSample(*self.latest)
+            return SubstitutedSensorSample(timestamp, *(math.nan,) * 6)
+        temperature, humidity, pressure, gas_resistance = fields
+
+        self.reads += 1
+        if self.first_read is None:
+            self.first_read = timestamp
+        self.last_read = timestamp
+
+        # Calculate altitude and displacement from the cached ground reference
+        altitude, displacement = self.altitude.compute(pressure, temperature)
+
+        self.latest = SensorSample(timestamp, temperature, humidity, pressure, gas_resistance, altitude, displacement)
+        return self.latest
+
+    def to_string(self, sample=None):
+        """
+        Returns a string representation of the sensor's data.
         
+        :param sample: The SensorSample to format (defaults to a fresh reading).
+        :return: A formatted string with sensor data, flagged if the sample is stale or substituted.
+        """
+        sample = sample or self.read_data()
+        text = self.format_data(sample)
+        return text if sample.status == STATUS_OK else f"{text} ({sample.status})"
+
+    def format_data(self, sample, timer=None):
+        """
+        Formats a SensorSample without touching the hardware.
+
+        :param timer: The StageTimer to time the formatting with (defaults to the sensor's
+                      format timer, which belongs to the telemetry writer thread).
         :return: A formatted string with sensor data.
         """
+        with timer or self.format_timer:
+            return format_sensor(*sample[1:])
 
-        self.read_data()
+    def achieved_rate(self):
+        """
+        Returns the average number of samples read per second since the first read.
+        """
+        if self.reads < 2 or self.last_read == self.first_read:
+            return 0.0
+        return (self.reads - 1) / (self.last_read - self.first_read)
 
-        return (f"Temperature: {self.temperature:.2f} C, "
-                f"Humidity: {self.humidity:.2f} %, "
-                f"Pressure: {self.pressure:.2f} hPa, "
-                f"Gas Resistance: {self.gas_resistance:.2f} ohms, "
-                f"Altitude: {self.altitude:.2f} meters, "
-                f"Displacment: {self.displacement:.2f} meters")
+    def rate_to_string(self):
+        """
+        Returns a string representation of the profile and the sample rate achieved with it.
+        """
+        return (f"Profile: {self.profile}, Fields: {', '.join(PROFILES[self.profile]['fields'])}, "
+                f"Reads: {self.reads}, Achieved Rate: {self.achieved_rate():.1f} Hz, "
+                f"Measurement Time: {measurement_time(self.profile) * 1000:.1f} ms"
+                f"{' + gas heater' if PROFILES[self.profile]['gas'] else ''}")
 
-    def calculate_altitude(self, pressure, temperature, sea_level_pressure=1013.25):
+    def calculate_altitude(self, pressure, temperature, sea_level_pressure=None):
         """
         Calculates the altitude based on the current pressure, temperature, and sea level pressure.
         
         :param pressure: The current atmospheric pressure in hPa (from the sensor).
-        :param temperature: The current temperature in Celsius (from the sensor).
-        :param sea_level_pressure: The sea level pressure in hPa (defaults to 1013.25).
+        :param temperature: The current temperature in Celsius (from the sensor); used by the hypsometric model.
+        :param sea_level_pressure: The sea level pressure in hPa (defaults to the sensor's).
         :return: The calculated altitude in meters.
         """
-        # Constants
-        T0 = 288.15  # Standard temperature at sea level (15°C or 288.15K)
-        L = 0.00649  # Temperature lapse rate in K/m
-        R = 8.314  # Universal gas constant in J/(mol·K)
-        g = 9.80665  # Acceleration due to gravity in m/s²
-        M = 0.0289644  # Molar mass of Earth's air in kg/mol
-
-        # Convert temperature to Kelvin
-        temperature_kelvin = temperature + 273.15
-
-        # Calculate the altitude using the temperature-adjusted formula
-        altitude = (T0 / L) * (1 - (pressure / sea_level_pressure) ** ((R * L) / (g * M)))
-
-        return altitude
+        if sea_level_pressure is None or sea_level_pressure == self.altitude.sea_level_pressure:
+            return self.altitude.altitude(pressure, temperature)
+        return AltitudeEngine(self.altitude.model, sea_level_pressure).altitude(pressure, temperature)
     
-    def calculate_displacement(self, sea_level_pressure=1013.25):
-        starting_altitude = self.calculate_altitude(pressure=self.init_pressure, temperature=self.init_temperature)
-        current_altitude = self.calculate_altitude(pressure=self.pressure, temperature=self.temperature)
-        return current_altitude - starting_altitude
+    def calculate_displacement(self, pressure=None, temperature=None):
+        """
+        Calculates the altitude gained since start-up.
+
+        :param pressure: The current pressure in hPa (defaults to the latest sample).
+        :param temperature: The current temperature in Celsius (defaults to the latest sample).
+        :return: The displacement in meters.
+        """
+        if pressure is None:
+            return self.latest.displacement
+        return self.altitude.displacement(pressure, temperature)
 
     def test(self):
         """
-        Runs a basic test to ensure the sensor is working by reading data.
+        Runs a basic test to ensure the sensor is working by reading and printing data.
         """
         print("Testing BME688 sensor...")
-        self.read_data()
+        print(self.to_string())
         print("Test completed successfully!")
 
     def stop(self):
@@ -115,7 +268,7 @@ class BME688Sensor:
         Perform any necessary cleanup actions.
         """
         print("Cleaning up sensor resources...")
-        time.sleep(1)  # Example cleanup action
+        self.guard.stop()  # Ends any background reinitialization; the shared bus is closed by its owner
 
 # Example usage
 if __name__ == "__main__":
@@ -130,7 +283,7 @@ if __name__ == "__main__":
        # while True:
         #    sensor.read_data()
          #   print(sensor.to_string())  # Logging the sensor data
-          #  time.sleep(1)  # Read every second
+          #  clock.sleep(1)  # Read every second
 
     except KeyboardInterrupt:
         print("Program interrupted by user.")
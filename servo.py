@@ -1,25 +1,33 @@
 # servo_control.py
 
-import RPi.GPIO as GPIO
-import time
+import clock
+
+try:
+    import RPi.GPIO as GPIO
+except ImportError:  # Not on the Pi; pass a stand-in GPIO instead (see backends.py)
+    GPIO = None
 
 class Servo:
-    def __init__(self, pin, frequency=50):
+    def __init__(self, pin, frequency=50, gpio=None):
         """
         Initializes the Servo class with a GPIO pin and frequency for PWM.
         
         :param pin: The GPIO pin number where the servo is connected.
         :param frequency: The PWM frequency (default 50Hz, standard for servos).
+        :param gpio: A module or object with the RPi.GPIO interface (defaults to RPi.GPIO).
         """
         self.pin = pin
         self.frequency = frequency
+        self.gpio = gpio or GPIO
+        if self.gpio is None:
+            raise RuntimeError("RPi.GPIO is not available; pass a gpio stand-in")
 
         # Set up GPIO mode
-        GPIO.setmode(GPIO.BCM)
-        GPIO.setup(self.pin, GPIO.OUT)
+        self.gpio.setmode(self.gpio.BCM)
+        self.gpio.setup(self.pin, self.gpio.OUT)
 
         # Set up PWM on the specified pin with the specified frequency
-        self.pwm = GPIO.PWM(self.pin, self.frequency)
+        self.pwm = self.gpio.PWM(self.pin, self.frequency)
         self.pwm.start(6.9)  # Start PWM with a 7.1% duty cycle (stop position)
 
     def set_speed(self, speed):
@@ -38,7 +46,6 @@ class Servo:
         # Map the speed to a duty cycle range:
         duty_cycle = 6.9 + (speed * 5)  # Maps -1 -> 2.5%, 0 -> 7.1%, 1 -> 12.5%
         self.pwm.ChangeDutyCycle(duty_cycle)
-        print(f"Set speed to {speed}, Duty Cycle: {duty_cycle}%")
 
     def run_continuously(self, speed, duration=5):
         """
@@ -49,7 +56,7 @@ class Servo:
         """
         print(f"Running for {duration} seconds at speed {speed}...")
         self.set_speed(speed)
-        time.sleep(duration)
+        clock.sleep(duration)
         print("Stopping servo...")
         self.set_speed(0)  # Stop the servo
 
@@ -58,7 +65,7 @@ class Servo:
         Stops the PWM signal and cleans up the GPIO resources.
         """
         self.pwm.stop()
-        GPIO.cleanup()
+        self.gpio.cleanup()
 
     def test(self):
         """
@@ -84,7 +91,7 @@ if __name__ == "__main__":
         # servo.run_continuously(speed=-1, duration=2)
         servo.test()
         # servo.run_continuously(speed=1, duration=2)
-        # time.sleep(1)
+        # clock.sleep(1)
         # servo.run_continuously(speed=-0.02,duration=10)
         # Optionally, run the servo at specific speeds
         # servo.run_continuously(1, duration=5)  # Full speed forward for 5 seconds
@@ -0,0 +1,292 @@
+import os
+import sys
+import random
+import argparse
+import tempfile
+import clock
+import backends
+import flight_program
+from altimetry import isa_altitude, isa_pressure
+from plateau import first_plateau, plateau_config
+
+STANDARD_GRAVITY = 9.80665
+
+# Flight phases of altitude_profile; "apogee" covers the 2 s before the top and the way down to the plateau
+PHASES = ("pad", "ascent", "apogee", "plateau", "descent", "landed")
+
+def altitude_profile(plateau_altitude=200.0, plateau_duration=60.0, plateau_drift=-0.5, pad_duration=10.0,
+                     ascent_rate=60.0, overshoot=30.0, descent_rate=8.0, noise=0.3, rate_hz=10, seed=0):
+    """
+    Generates a synthetic flight: on the pad, a climb to plateau_altitude + overshoot, a
+    descent to the plateau, the plateau drifting at plateau_drift, the descent to the
+    ground and time on the ground again.
+
+    :param plateau_altitude: The altitude in meters where the plateau starts.
+    :param plateau_duration: The length of the plateau in seconds.
+    :param plateau_drift: The vertical speed during the plateau in m/s (negative is down).
+    :param pad_duration: Seconds on the ground before launch and after landing.
+    :param ascent_rate: The climb rate in m/s.
+    :param overshoot: Meters climbed past the plateau altitude before coming back down to it.
+    :param descent_rate: The descent rate in m/s (positive).
+    :param noise: The standard deviation of the barometric noise in meters.
+    :param rate_hz: Samples per second.
+    :param seed: The random seed, so profiles are repeatable.
+    :return: A tuple (times, displacements, phases), times in seconds from 0 and phases a
+             list of (start time, name) from PHASES.
+    """
+    rng = random.Random(seed)
+    apogee = plateau_altitude + overshoot
+    apogee_time = pad_duration + apogee / ascent_rate
+    plateau_start = apogee_time + overshoot / descent_rate
+    plateau_end = plateau_start + plateau_duration
+    plateau_final = plateau_altitude + plateau_drift * plateau_duration
+    landing = plateau_end + max(0.0, plateau_final) / descent_rate
+    end = landing + pad_duration
+
+    def displacement(t):
+        if t < pad_duration:
+            return 0.0
+        if t < apogee_time:
+            return (t - pad_duration) * ascent_rate
+        if t < plateau_start:
+            return apogee - (t - apogee_time) * descent_rate
+        if t < plateau_end:
+            return plateau_altitude + (t - plateau_start) * plateau_drift
+        if t < landing:
+            return plateau_final - (t - plateau_end) * descent_rate
+        return 0.0
+
+    count = int(end * rate_hz) + 1
+    times = [i / rate_hz for i in range(count)]
+    displacements = [max(0.0, displacement(t)) + rng.gauss(0, noise) for t in times]
+    phases = [(0.0, "pad"), (pad_duration, "ascent"), (apogee_time - 2.0, "apogee"), (plateau_start, "plateau"),
+              (plateau_end, "descent"), (landing, "landed")]
+    return times, displacements, phases
+
+def phase_at(phases, timestamp):
+    """
+    Returns the name of the flight phase a time falls in.
+    """
+    name = phases[0][1]
+    for start, phase in phases:
+        if timestamp >= start:
+            name = phase
+    return name
+
+def profile_source(times, displacements, ground_pressure=1001.86, temperature=23.2, seed=0):
+    """
+    Creates a realtime replay source of the sensor stack flying an altitude profile, for
+    simulate_flight: barometric pressure from the displacement, and acceleration along the
+    IMU's z axis from its second derivative.
+
+    :param times: Sample times in seconds from 0.
+    :param displacements: Displacements in meters.
+    :param ground_pressure: The pressure in hPa on the pad.
+    :param temperature: The air temperature in Celsius.
+    :param seed: The random seed of the IMU noise.
+    """
+    rng = random.Random(seed)
+    ground_altitude = isa_altitude(ground_pressure)
+    pressures = [isa_pressure(ground_altitude + displacement) for displacement in displacements]
+
+    accelerations = []
+    for i in range(len(times)):
+        before, after = max(0, i - 1), min(len(times) - 1, i + 1)
+        if after - before < 2:
+            vertical = 0.0
+        else:
+            step = (times[after] - times[before]) / 2
+            vertical = (displacements[after] - 2 * displacements[i] + displacements[before]) / (step * step)
+        accelerations.append((rng.gauss(0, 0.02), rng.gauss(0, 0.02), STANDARD_GRAVITY + vertical + rng.gauss(0, 0.02)))
+
+    streams = {
+        ("bme688", "temperature"): (times, [temperature] * len(times)),
+        ("bme688", "humidity"): (times, [44.6] * len(times)),
+        ("bme688", "pressure"): (times, pressures),
+        ("bme688", "gas"): (times, [20000.0] * len(times)),
+        ("bno08x", "acceleration"): (times, accelerations),
+        ("bno08x", "gyro"): (times, [(0.0, 0.0, 0.0)] * len(times)),
+        ("bno08x", "magnetic"): (times, [(6.3, 19.1, -1.5)] * len(times)),
+    }
+    return backends.ReplaySource(streams, realtime=True)
+
+def random_scenario(rng):
+    """
+    Returns altitude_profile settings for a random flight, plateaus inside and outside the
+    collection range, long and short, steady and drifting.
+    """
+    return {"plateau_altitude": rng.uniform(40.0, 380.0),
+            "plateau_duration": rng.choice((rng.uniform(0.0, 3.0), rng.uniform(3.0, 120.0))),
+            "plateau_drift": rng.uniform(-10.0, 2.0),
+            "ascent_rate": rng.uniform(30.0, 120.0),
+            "overshoot": rng.uniform(0.0, 60.0),
+            "descent_rate": rng.uniform(6.0, 15.0),
+            "noise": rng.uniform(0.0, 2.0),
+            "rate_hz": rng.choice((5, 10, 20)),
+            "seed": rng.randrange(1 << 30)}
+
+def _time_within(scenario, low, high):
+    """
+    Returns how long a scenario's plateau stays between two altitudes.
+    """
+    first = scenario["plateau_altitude"]
+    last = first + scenario["plateau_drift"] * scenario["plateau_duration"]
+    if abs(last - first) < 1e-9:
+        return scenario["plateau_duration"] if low <= first <= high else 0.0
+    overlap = min(high, max(first, last)) - max(low, min(first, last))
+    return max(0.0, overlap) / abs(scenario["plateau_drift"])
+
+def expected_trigger(scenario, config, margin=5.0):
+    """
+    Returns whether a scenario's plateau should trigger the sampling: True, False, or None
+    when it is within margin meters, or 30% of the speed or window, of a threshold.
+    """
+    window = config["window"]
+    speed = abs(scenario["plateau_drift"])
+    inside = _time_within(scenario, config["minimum"] + margin, config["maximum"] - margin)
+    near = _time_within(scenario, config["minimum"] - margin, config["maximum"] + margin)
+    if inside > window * 2 and speed < config["max_speed"] * 0.7:
+        return True
+    if near < window * 0.5 or speed > config["max_speed"] * 1.3:
+        return False
+    return None
+
+def run_scenarios(count=1000, seed=0, config=None):
+    """
+    Runs the plateau trigger over many random flights, as poll() would see them.
+
+    :return: A dict with "phases", the number of flights that triggered in each phase of
+             PHASES (None for not at all); "expected", "on_plateau" and "missed" for the
+             flights whose plateau should trigger; "unexpected" for flights whose plateau
+             should not trigger but that triggered anywhere; "off_plateau" for every flight
+             that triggered outside the plateau phase, whatever its plateau; "borderline"
+             for the plateaus too close to a threshold to judge; and "latencies", the
+             trigger times after the plateau started.
+    """
+    config = config or plateau_config()
+    rng = random.Random(seed)
+    results = {"phases": dict.fromkeys(PHASES + (None,), 0), "expected": 0, "on_plateau": 0,
+               "missed": 0, "unexpected": 0, "off_plateau": 0, "borderline": 0, "latencies": []}
+    for _ in range(count):
+        scenario = random_scenario(rng)
+        times, displacements, phases = altitude_profile(**scenario)
+        fired = first_plateau(times, displacements, **config)
+        phase = phase_at(phases, fired) if fired is not None else None
+        results["phases"][phase] += 1
+        if fired is not None and phase != "plateau":
+            results["off_plateau"] += 1
+
+        expected = expected_trigger(scenario, config)
+        if expected is None:
+            results["borderline"] += 1
+        elif expected:
+            results["expected"] += 1
+            if phase == "plateau":
+                results["on_plateau"] += 1
+                results["latencies"].append(fired - dict((name, start) for start, name in phases)["plateau"])
+            elif fired is None:
+                results["missed"] += 1
+        elif fired is not None:
+            results["unexpected"] += 1
+    return results
+
+def simulate_flight(times, displacements, filename, settle_time=None):
+    """
+    Flies a profile through flight_program's sequential loop on a SimulatedClock: the
+    same scheduler, logging, plateau trigger and actuation sequence, faster than real time.
+
+    :param times: Sample times in seconds from 0.
+    :param displacements: Displacements in meters.
+    :param filename: The telemetry log to write.
+    :param settle_time: Simulated seconds to keep running after the profile ends so a
+                        started sampling sequence can finish (defaults to collection_period + 5).
+    :return: A dict with "triggered", "trigger_time" (seconds from the start),
+             "sampling_start" (when the actuation thread started the sequence), "steps" (the
+             (label, time) of every sequence step that ran), "sampling" (the sequence summary)
+             and "ticks".
+    """
+    simulated = clock.SimulatedClock()
+    previous = clock.use(simulated)
+    flight_program.status_display = False
+    flight_program.triggered = False
+    flight_program.trigger_time = None
+    flight_program.sampling = None
+    flight_program.plateau_detector.reset()
+    try:
+        # Devices are created on the simulated clock, so the replay starts at its time 0
+        from benchmark import create_devices
+        flight_program.setup(create_devices(profile_source(times, displacements)), filename=filename)
+        ticks_before = flight_program.scheduler.ticks
+        try:
+            flight_program.sequential_execution()
+        except backends.ReplayFinished:
+            pass
+
+        # Let the actuation thread finish the sampling sequence in simulated time
+        sampling = flight_program.sampling
+        settle_time = flight_program.collection_period + 5 if settle_time is None else settle_time
+        deadline = simulated.monotonic() + settle_time
+        while sampling is not None and not sampling.done.is_set() and simulated.monotonic() < deadline:
+            simulated.advance(0.05)
+
+        return {"triggered": flight_program.triggered,
+                "trigger_time": flight_program.trigger_time,
+                "sampling_start": sampling.started_at if sampling is not None else None,
+                "steps": list(sampling.completed_steps) if sampling is not None else [],
+                "sampling": sampling.to_string() if sampling is not None else None,
+                "ticks": flight_program.scheduler.ticks - ticks_before}
+    finally:
+        flight_program.status.stop()
+        flight_program.actuator.stop()
+        flight_program.telemetry_writer.close()
+        clock.use(previous)
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate flights faster than real time to exercise the trigger logic.")
+    parser.add_argument("--scenarios", type=int, default=1000, help="Random flights to run through the plateau trigger")
+    parser.add_argument("--seed", type=int, default=0, help="Random seed")
+    parser.add_argument("--flight", action="store_true", help="Fly one profile through the whole flight loop instead")
+    parser.add_argument("--plateau-altitude", type=float, default=200.0, help="Plateau altitude in meters (--flight)")
+    parser.add_argument("--plateau-duration", type=float, default=1200.0, help="Plateau length in seconds (--flight)")
+    parser.add_argument("--log", help="Telemetry log written by --flight (defaults to a temporary file)")
+    parser.add_argument("--check", action="store_true",
+                        help="Fly the profile twice and exit with status 1 unless every trigger and sampling time matches (--flight)")
+    args = parser.parse_args()
+
+    start = clock.SystemClock.perf_counter()
+    if args.flight:
+        times, displacements, phases = altitude_profile(plateau_altitude=args.plateau_altitude,
+                                                        plateau_duration=args.plateau_duration,
+                                                        plateau_drift=-0.05, seed=args.seed)
+        filename = args.log or os.path.join(tempfile.mkdtemp(), "telemetry_log_simulation.log")
+        result = simulate_flight(times, displacements, filename)
+        print(f"Flew {times[-1]:.0f} s in {result['ticks']} ticks; phases: "
+              + ", ".join(f"{name} {start:.1f} s" for start, name in phases))
+        if result["triggered"]:
+            print(f"Triggered at {result['trigger_time']:.1f} s ({phase_at(phases, result['trigger_time'])}), "
+                  f"sampling started at {result['sampling_start']:.1f} s: {result['sampling']}")
+        else:
+            print("Not triggered")
+        print(f"Telemetry log: {filename}")
+
+        if args.check:
+            repeat = simulate_flight(times, displacements, filename + ".check")
+            if repeat != result:
+                print(f"FAIL: a second run differs: {repeat}")
+                sys.exit(1)
+            print("Second run identical")
+    else:
+        results = run_scenarios(args.scenarios, args.seed)
+        latencies = sorted(results["latencies"])
+        print("Triggered during: " + ", ".join(f"{phase or 'never'} {count}" for phase, count in results["phases"].items()))
+        print(f"Plateaus that should trigger: {results['expected']}, triggered on the plateau: {results['on_plateau']}, "
+              f"missed: {results['missed']}")
+        print(f"Plateaus that should not trigger but did: {results['unexpected']}, too close to call: {results['borderline']}")
+        print(f"Triggered outside the plateau: {results['off_plateau']}")
+        if latencies:
+            print(f"Trigger latency after the plateau starts: median {latencies[len(latencies) // 2]:.2f} s, "
+                  f"max {latencies[-1]:.2f} s")
+    print(f"Done in {clock.SystemClock.perf_counter() - start:.2f} s", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
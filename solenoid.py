@@ -1,20 +1,29 @@
-import time
-import RPi.GPIO as GPIO
+import clock
+
+try:
+    import RPi.GPIO as GPIO
+except ImportError:  # Not on the Pi; pass a stand-in GPIO instead (see backends.py)
+    GPIO = None
 
 class SolenoidController:
-    def __init__(self, pin, relay_state=False):
+    def __init__(self, pin, relay_state=False, gpio=None):
         """
         Initializes the SolenoidController to control a relay and solenoid.
         
         :param pin: The GPIO pin number to control the relay.
         :param relay_state: The initial state of the relay (True to activate, False to deactivate).
+        :param gpio: A module or object with the RPi.GPIO interface (defaults to RPi.GPIO).
         """
+        self.gpio = gpio or GPIO
+        if self.gpio is None:
+            raise RuntimeError("RPi.GPIO is not available; pass a gpio stand-in")
+
         # Set up GPIO mode (BCM or BOARD depending on your wiring)
-        GPIO.setmode(GPIO.BCM)  # Use Broadcom pin-numbering scheme (BCM)
+        self.gpio.setmode(self.gpio.BCM)  # Use Broadcom pin-numbering scheme (BCM)
         
         # Set up the GPIO pin for output
         self.pin = pin
-        GPIO.setup(self.pin, GPIO.OUT)
+        self.gpio.setup(self.pin, self.gpio.OUT)
         
         # Set the initial state of the relay (True: activated, False: deactivated)
         self.relay_state = relay_state
@@ -29,10 +38,10 @@ class SolenoidController:
         :param state: True to turn on the relay, False to turn off.
         """
         if state:
-            GPIO.output(self.pin, GPIO.HIGH)  # Activate relay (solenoid ON)
+            self.gpio.output(self.pin, self.gpio.HIGH)  # Activate relay (solenoid ON)
             print("Solenoid activated (Relay ON).")
         else:
-            GPIO.output(self.pin, GPIO.LOW)  # Deactivate relay (solenoid OFF)
+            self.gpio.output(self.pin, self.gpio.LOW)  # Deactivate relay (solenoid OFF)
             print("Solenoid deactivated (Relay OFF).")
         self.relay_state = state
 
@@ -60,9 +69,9 @@ class SolenoidController:
         """
         print("Testing SolenoidController...")
         self.deactivate()
-        time.sleep(2)
+        clock.sleep(2)
         self.activate()  # Turn on the solenoid
-        time.sleep(2)   # Wait for 2 seconds
+        clock.sleep(2)   # Wait for 2 seconds
         self.deactivate()  # Turn off the solenoid
         print("Test completed successfully.")
 
@@ -71,7 +80,7 @@ class SolenoidController:
         Cleans up the GPIO setup and releases the resources.
         """
         print("Cleaning up GPIO resources...")
-        GPIO.cleanup()
+        self.gpio.cleanup()
 
 # Example usage
 if __name__ == "__main__":
@@ -85,7 +94,7 @@ if __name__ == "__main__":
         # Optionally, you can continuously toggle or control the solenoid
         # while True:
         #     solenoid.toggle()
-        #     time.sleep(2)
+        #     clock.sleep(2)
 
     except KeyboardInterrupt:
         print("Program interrupted by user.")
@@ -0,0 +1,86 @@
+import sys
+import time
+import threading
+
+class StatusDisplay:
+    def __init__(self, render, rate_hz=2, enabled=True, output=None):
+        """
+        Initializes a console status display that refreshes from the latest snapshot at a capped rate.
+
+        The flight loop only stores values with set(); rendering and terminal I/O happen
+        on a background thread, at most rate_hz times per second and only when something changed.
+
+        :param render: A callable turning the snapshot dict into the text to show.
+        :param rate_hz: The maximum number of refreshes per second.
+        :param enabled: If False, set() does nothing and no thread is started (e.g. for flight).
+        :param output: The stream to write to (defaults to sys.stdout at render time).
+        """
+        self.render = render
+        self.period = 1.0 / rate_hz
+        self.enabled = enabled
+        self.output = output
+        self.snapshot = {}
+        self.version = 0
+        self.refreshes = 0
+        self._stop_event = threading.Event()
+        self._thread = None
+
+        if enabled:
+            self._thread = threading.Thread(target=self._run, name="status-display", daemon=True)
+            self._thread.start()
+
+    def set(self, key, value):
+        """
+        Stores the latest value of one status field.
+
+        :param key: The field name, e.g. "triggered".
+        :param value: The latest value.
+        """
+        if self.enabled:
+            self.snapshot[key] = value
+            self.version += 1
+
+    def refresh(self):
+        """
+        Renders the current snapshot and writes it out.
+        """
+        try:
+            text = self.render(dict(self.snapshot))
+        except (KeyError, TypeError, ValueError) as e:
+            text = f"Status unavailable: {e}"
+        output = self.output or sys.stdout
+        output.write(text + "\n")
+        output.flush()
+        self.refreshes += 1
+
+    def _run(self):
+        shown = 0
+        while not self._stop_event.wait(self.period):
+            version = self.version
+            if version != shown:
+                shown = version
+                self.refresh()
+
+    def stop(self):
+        """
+        Stops the refresh thread.
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(1.0)
+
+# Example usage
+if __name__ == "__main__":
+    display = StatusDisplay(lambda snapshot: f"Counter: {snapshot['counter']}", rate_hz=2)
+
+    try:
+        # Updates at 100 Hz are shown at most twice per second
+        for counter in range(300):
+            display.set("counter", counter)
+            time.sleep(0.01)
+
+    except KeyboardInterrupt:
+        print("Program interrupted by user.")
+
+    finally:
+        display.stop()
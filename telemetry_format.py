@@ -0,0 +1,214 @@
+import csv
+import sys
+import math
+import time
+import struct
+import argparse
+from datetime import datetime
+
+# File header: magic, format version, record size, wall-clock and monotonic time at creation
+MAGIC = b"PRXT"
+FORMAT_VERSION = 1
+HEADER_STRUCT = struct.Struct("<4sHHdd")
+
+# Every record is RECORD_SIZE bytes: record type, padding, monotonic timestamp, payload
+RECORD_IMU = 1
+RECORD_SENSOR = 2
+RECORD_EVENT = 3
+RECORD_STRUCTS = {
+    RECORD_IMU: struct.Struct("<Bxxxd9f"),  # accel xyz, gyro xyz, mag xyz
+    RECORD_SENSOR: struct.Struct("<Bxxxd2fd3f8x"),  # temperature, humidity, pressure, gas, altitude, displacement
+    RECORD_EVENT: struct.Struct("<Bxxxd36s"),  # short utf-8 event text, e.g. "Sampling Start"
+}
+RECORD_SIZE = 48
+EVENT_TEXT_SIZE = 36
+
+# Labels used in the text telemetry log for each record type
+RECORD_LABELS = {
+    RECORD_IMU: "IMU Telemetry",
+    RECORD_SENSOR: "Sensor Telemetry",
+}
+LABEL_RECORDS = {label: record_type for record_type, label in RECORD_LABELS.items()}
+
+IMU_FIELDS = ("accel_x", "accel_y", "accel_z", "gyro_x", "gyro_y", "gyro_z", "mag_x", "mag_y", "mag_z")
+SENSOR_FIELDS = ("temperature", "humidity", "pressure", "gas_resistance", "altitude", "displacement")
+
+LOG_SEPARATOR = "-----------------------------------------------------------------------------------------------"
+
+def format_imu(accel_x, accel_y, accel_z, gyro_x, gyro_y, gyro_z, mag_x, mag_y, mag_z):
+    """
+    Formats one BNO08X reading in the telemetry log layout.
+
+    :return: A formatted string with imu data.
+    """
+    return (f"Acceleration: X: {accel_x:.3f} Y: {accel_y:.3f} Z: {accel_z:.3f} m/s², "
+            f"Gyroscope: X: {gyro_x:.3f} Y: {gyro_y:.3f} Z: {gyro_z:.3f} rad/s, "
+            f"Magnetometer: X: {mag_x:.3f} Y: {mag_y:.3f} Z: {mag_z:.3f} uT")
+
+def format_sensor(temperature, humidity, pressure, gas_resistance, altitude, displacement):
+    """
+    Formats one BME688 reading, plus its displacement, in the telemetry log layout.
+
+    :return: A formatted string with sensor data.
+    """
+    return (f"Temperature: {temperature:.2f} C, "
+            f"Humidity: {humidity:.2f} %, "
+            f"Pressure: {pressure:.2f} hPa, "
+            f"Gas Resistance: {gas_resistance:.2f} ohms, "
+            f"Altitude: {altitude:.2f} meters, "
+            f"Displacment: {displacement:.2f} meters")
+
+def pack_header(wall_time=None, monotonic_time=None):
+    """
+    Packs the file header.
+
+    :param wall_time: The wall-clock time matching monotonic_time (defaults to now).
+    :param monotonic_time: The time.monotonic value at creation (defaults to now).
+    :return: The header bytes.
+    """
+    if wall_time is None or monotonic_time is None:
+        wall_time, monotonic_time = time.time(), time.monotonic()
+    return HEADER_STRUCT.pack(MAGIC, FORMAT_VERSION, RECORD_SIZE, wall_time, monotonic_time)
+
+def pack_record(record_type, timestamp, data):
+    """
+    Packs one record.
+
+    :param record_type: RECORD_IMU, RECORD_SENSOR or RECORD_EVENT.
+    :param timestamp: The time.monotonic capture time.
+    :param data: The BNO08XSensor.read_data 9-tuple, the BME688Sensor.read_data 5-tuple
+                 (optionally with displacement appended) or the event text.
+    :return: The RECORD_SIZE record bytes.
+    """
+    if record_type == RECORD_EVENT:
+        text = data.encode("utf-8")[:EVENT_TEXT_SIZE]
+        return RECORD_STRUCTS[RECORD_EVENT].pack(RECORD_EVENT, timestamp, text)
+    if record_type == RECORD_SENSOR and len(data) == 5:
+        data = tuple(data) + (math.nan,)  # Displacement not recorded
+    return RECORD_STRUCTS[record_type].pack(record_type, timestamp, *data)
+
+def unpack_record(buffer, offset=0):
+    """
+    Unpacks one record.
+
+    :return: A tuple (record_type, timestamp, data), data being a tuple of floats or the event text.
+    """
+    record_type = buffer[offset]
+    fields = RECORD_STRUCTS[record_type].unpack_from(buffer, offset)
+    if record_type == RECORD_EVENT:
+        return record_type, fields[1], fields[2].rstrip(b"\0").decode("utf-8", "replace")
+    return record_type, fields[1], fields[2:]
+
+class BinaryTelemetryReader:
+    def __init__(self, file, chunk_records=4096):
+        """
+        Initializes a streaming reader for a binary telemetry file.
+
+        :param file: A path or a binary file object positioned at the header.
+        :param chunk_records: The number of records read from disk at a time.
+        """
+        self.owns_file = isinstance(file, str)
+        self.file = open(file, "rb") if self.owns_file else file
+        self.chunk_records = chunk_records
+
+        header = self.file.read(HEADER_STRUCT.size)
+        if len(header) < HEADER_STRUCT.size:
+            raise ValueError("File is too short to be a binary telemetry file")
+        magic, self.version, self.record_size, self.wall_time, self.monotonic_time = HEADER_STRUCT.unpack(header)
+        if magic != MAGIC:
+            raise ValueError("Not a binary telemetry file")
+        if self.version > FORMAT_VERSION or self.record_size != RECORD_SIZE:
+            raise ValueError(f"Unsupported binary telemetry version {self.version}")
+
+    def to_wall_time(self, timestamp):
+        """
+        Converts a record's monotonic timestamp to wall-clock seconds since the epoch.
+        """
+        return self.wall_time + (timestamp - self.monotonic_time)
+
+    def __iter__(self):
+        """
+        Yields (record_type, timestamp, data) tuples in file order; a truncated last record is ignored.
+        """
+        chunk_size = self.chunk_records * RECORD_SIZE
+        while True:
+            chunk = self.file.read(chunk_size)
+            usable = len(chunk) - len(chunk) % RECORD_SIZE
+            for offset in range(0, usable, RECORD_SIZE):
+                yield unpack_record(chunk, offset)
+            if len(chunk) < chunk_size:
+                break
+
+    def close(self):
+        if self.owns_file:
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+def format_asctime(wall_time):
+    """
+    Formats a wall-clock time like logging's default asctime ("2025-04-03 17:43:09,334").
+    """
+    return f"{datetime.fromtimestamp(wall_time).strftime('%Y-%m-%d %H:%M:%S')},{int(wall_time * 1000) % 1000:03d}"
+
+def export_text(reader, output):
+    """
+    Writes the records in the text telemetry log layout produced by log_telemetry.
+
+    :param reader: A BinaryTelemetryReader.
+    :param output: A text file object.
+    """
+    for record_type, timestamp, data in reader:
+        asctime = format_asctime(reader.to_wall_time(timestamp))
+        if record_type == RECORD_IMU:
+            output.write(f"{asctime} - IMU Telemetry: {format_imu(*data)}\n")
+        elif record_type == RECORD_SENSOR:
+            output.write(f"{asctime} - Sensor Telemetry: {format_sensor(*data)}\n")
+            output.write(f"{asctime} - {LOG_SEPARATOR}\n")
+        else:
+            output.write(f"{asctime} - {data}\n")
+
+def export_csv(reader, output):
+    """
+    Writes the records as CSV, one row per record with the unused fields left empty.
+
+    :param reader: A BinaryTelemetryReader.
+    :param output: A text file object opened with newline="".
+    """
+    writer = csv.writer(output)
+    writer.writerow(("record", "timestamp", "wall_time") + IMU_FIELDS + SENSOR_FIELDS + ("event",))
+    imu_blank = ("",) * len(IMU_FIELDS)
+    sensor_blank = ("",) * len(SENSOR_FIELDS)
+    for record_type, timestamp, data in reader:
+        prefix = (record_type, f"{timestamp:.6f}", f"{reader.to_wall_time(timestamp):.3f}")
+        if record_type == RECORD_IMU:
+            writer.writerow(prefix + tuple(f"{v:.7g}" for v in data) + sensor_blank + ("",))
+        elif record_type == RECORD_SENSOR:
+            writer.writerow(prefix + imu_blank + tuple(f"{v:.7g}" for v in data) + ("",))
+        else:
+            writer.writerow(prefix + imu_blank + sensor_blank + (data,))
+
+def main():
+    parser = argparse.ArgumentParser(description="Convert a binary telemetry file to CSV or the text log layout.")
+    parser.add_argument("input", help="Binary telemetry file")
+    parser.add_argument("output", nargs="?", help="Output file (defaults to stdout)")
+    parser.add_argument("--format", choices=("text", "csv"), default="text", help="Output format")
+    args = parser.parse_args()
+
+    output = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+    try:
+        with BinaryTelemetryReader(args.input) as reader:
+            if args.format == "csv":
+                export_csv(reader, output)
+            else:
+                export_text(reader, output)
+    finally:
+        if output is not sys.stdout:
+            output.close()
+
+if __name__ == "__main__":
+    main()
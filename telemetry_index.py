@@ -0,0 +1,361 @@
+import os
+import re
+import sys
+import json
+import time
+import argparse
+import numpy as np
+import telemetry_format
+from log_loader import find_logs, parse_text, parse_binary
+
+# Bumped whenever entries change shape or meaning, which rebuilds the index
+INDEX_VERSION = 1
+
+# The start of every timestamped line in a text log, matched on the raw bytes so the
+# match positions are byte offsets
+LINE_PATTERN = re.compile(rb"^(\d{4}-\d\d-\d\d \d\d:\d\d:\d\d),(\d{3}) - ", re.MULTILINE)
+
+# Columns summarized in the pyramid, by the read_log table they come from
+PYRAMID_FIELDS = {"sensor": ("displacement", "altitude", "pressure", "temperature"),
+                  "imu": ("accel_x", "accel_y", "accel_z")}
+
+def parse_time(text):
+    """
+    Converts "YYYY-MM-DD HH:MM:SS" (or any ISO 8601 prefix) to seconds in the same
+    convention as log_loader: the log's local clock read as UTC.
+    """
+    return float(np.datetime64(text.replace(" ", "T"), "ms").astype(np.int64)) / 1000.0
+
+def format_time(seconds):
+    """
+    Formats seconds from parse_time or log_loader back to "YYYY-MM-DD HH:MM:SS.mmm".
+    """
+    return str(np.datetime64(int(round(seconds * 1000)), "ms")).replace("T", " ")
+
+def _nullable(values):
+    return [None if np.isnan(value) else round(float(value), 6) for value in values]
+
+def line_offsets(data):
+    """
+    Returns the times and byte offsets of the timestamped lines of a text log.
+    """
+    matches = [(m.group(1), m.group(2), m.start()) for m in LINE_PATTERN.finditer(data)]
+    if not matches:
+        return np.empty(0), np.empty(0, dtype=np.int64)
+    seconds = np.array([m[0].decode() for m in matches], dtype="datetime64[s]").astype(np.int64)
+    milliseconds = np.array([int(m[1]) for m in matches], dtype=np.int64)
+    return seconds + milliseconds / 1000.0, np.array([m[2] for m in matches], dtype=np.int64)
+
+def record_offsets(data):
+    """
+    Returns the times and byte offsets of the records of a binary telemetry file.
+    """
+    header_size = telemetry_format.HEADER_STRUCT.size
+    magic, version, record_size, wall_time, monotonic_time = telemetry_format.HEADER_STRUCT.unpack_from(data)
+    count = (len(data) - header_size) // record_size
+    timestamps = np.ndarray(count, dtype="<f8", buffer=data, offset=header_size + 4, strides=(record_size,))
+    offset = wall_time - monotonic_time + time.localtime(wall_time).tm_gmtoff  # As log_loader.parse_binary
+    return timestamps + offset, header_size + np.arange(count, dtype=np.int64) * record_size
+
+def chunk_offsets(times, offsets, interval):
+    """
+    Returns [time, offset] pairs for the first line of every interval-long chunk.
+    """
+    if not len(times):
+        return []
+    chunks = np.floor((times - times[0]) / interval)
+    first = np.flatnonzero(np.r_[True, chunks[1:] != chunks[:-1]])
+    return [[round(float(times[i]), 3), int(offsets[i])] for i in first]
+
+def summarize(times, columns, resolution):
+    """
+    Bins columns into resolution-second bins aligned to multiples of the resolution.
+
+    :param times: Sample times in seconds, sorted.
+    :param columns: A dict of field name to values.
+    :param resolution: The bin width in seconds.
+    :return: A dict with "time" (bin starts), "count" and per field a dict of
+             "min", "max" and "mean" lists; None where a bin had no finite value.
+    """
+    if not len(times):
+        return {"time": [], "count": []}
+    bins = np.floor(times / resolution)
+    starts = np.flatnonzero(np.r_[True, bins[1:] != bins[:-1]])
+    level = {"time": (bins[starts] * resolution).tolist(), "count": np.diff(np.r_[starts, len(times)]).tolist()}
+    for field, values in columns.items():
+        finite = np.isfinite(values)
+        counts = np.add.reduceat(finite, starts)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean = np.add.reduceat(np.where(finite, values, 0.0), starts) / counts
+        level[field] = {"min": _nullable(np.fmin.reduceat(values, starts)),
+                        "max": _nullable(np.fmax.reduceat(values, starts)),
+                        "mean": _nullable(np.where(counts > 0, mean, np.nan))}
+    return level
+
+def index_file(path, chunk_interval=10.0, resolutions=(1, 10, 60)):
+    """
+    Builds the index entry of one telemetry log.
+
+    :param path: The path of a telemetry_log_* file, text or binary.
+    :param chunk_interval: Seconds between recorded byte offsets.
+    :param resolutions: Bin widths in seconds of the summary levels.
+    :return: A dict with the log's format, time span, chunk offsets and summary levels.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    binary = data[:4] == telemetry_format.MAGIC
+    times, offsets = record_offsets(data) if binary else line_offsets(data)
+    imu, sensor, events = parse_binary(data) if binary else parse_text(data.decode("utf-8", "replace"))
+
+    levels = {}
+    for resolution in resolutions:
+        level = {}
+        for table_name, table in (("sensor", sensor), ("imu", imu)):
+            columns = {field: table[field] for field in PYRAMID_FIELDS[table_name]}
+            level[table_name] = summarize(table["time"], columns, resolution)
+        levels[str(resolution)] = level
+
+    return {
+        "format": "binary" if binary else "text",
+        "size": len(data),
+        "start": float(times.min()) if len(times) else None,
+        "end": float(times.max()) if len(times) else None,
+        "offsets": chunk_offsets(times, offsets, chunk_interval),
+        "levels": levels,
+    }
+
+class TelemetryIndex:
+    def __init__(self, filename="sli/telemetry_index.json", paths=("logs", "sli/logs"),
+                 chunk_interval=10.0, resolutions=(1, 10, 60)):
+        """
+        Initializes an index of the telemetry log archive: each log's time span, the byte
+        offset of every chunk_interval seconds of it, and min/max/mean summaries of the
+        main fields at several resolutions.
+
+        Range queries read only the chunks they need, and summaries over hours of data
+        come from the index alone. update() indexes new and changed logs only.
+
+        :param filename: The path of the JSON index file.
+        :param paths: Files and/or directories holding telemetry logs.
+        :param chunk_interval: Seconds between recorded byte offsets.
+        :param resolutions: Bin widths in seconds of the summary levels, finest first.
+        """
+        self.filename = filename
+        self.paths = tuple(paths)
+        self.chunk_interval = chunk_interval
+        self.resolutions = tuple(sorted(resolutions))
+        self.entries = self.load()
+        self.changed = False
+
+    def _config(self):
+        return {"version": INDEX_VERSION, "chunk_interval": self.chunk_interval, "resolutions": list(self.resolutions)}
+
+    def load(self):
+        """
+        Returns the indexed entries, or an empty dict if the file is missing, unreadable
+        or was built with other settings.
+        """
+        try:
+            with open(self.filename, encoding="utf-8") as f:
+                index = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(index, dict) or index.get("config") != self._config():
+            return {}
+        return index.get("entries", {})
+
+    def save(self):
+        """
+        Writes the index file atomically if anything changed.
+        """
+        if not self.changed:
+            return
+        directory = os.path.dirname(self.filename)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temporary = self.filename + ".tmp"
+        with open(temporary, "w", encoding="utf-8") as f:
+            json.dump({"config": self._config(), "entries": self.entries}, f)
+        os.replace(temporary, self.filename)
+        self.changed = False
+
+    def update(self):
+        """
+        Indexes logs that are new or changed since the last update, forgets deleted
+        ones and saves the index.
+
+        :return: The number of logs indexed.
+        """
+        indexed = 0
+        files = find_logs(self.paths)
+        for path in files:
+            stat = os.stat(path)
+            key = [stat.st_size, stat.st_mtime_ns]
+            entry = self.entries.get(path)
+            if entry is not None and entry["key"] == key:
+                continue
+            entry = index_file(path, self.chunk_interval, self.resolutions)
+            entry["key"] = key
+            self.entries[path] = entry
+            self.changed = True
+            indexed += 1
+
+        for path in set(self.entries) - set(files):
+            del self.entries[path]
+            self.changed = True
+        self.save()
+        return indexed
+
+    def files_between(self, start=None, end=None):
+        """
+        Returns the paths of the indexed logs overlapping a time range, in time order.
+
+        :param start: The range start in seconds (see parse_time), or None for no limit.
+        :param end: The range end in seconds, or None for no limit.
+        """
+        paths = [path for path, entry in self.entries.items()
+                 if entry["start"] is not None
+                 and (end is None or entry["start"] <= end) and (start is None or entry["end"] >= start)]
+        return sorted(paths, key=lambda path: self.entries[path]["start"])
+
+    def read_range(self, path, start=None, end=None):
+        """
+        Reads the samples of one log within a time range, reading only the chunks that
+        overlap it (plus one on either side for lines written slightly out of order).
+
+        :return: A tuple (imu, sensor, events) of column dicts as from log_loader.read_log.
+        """
+        entry = self.entries[path]
+        offsets = entry["offsets"]
+        times = [chunk[0] for chunk in offsets]
+        first = max(0, np.searchsorted(times, start, side="right") - 2) if start is not None else 0
+        last = np.searchsorted(times, end, side="right") + 1 if end is not None else len(offsets)
+        begin = offsets[first][1] if offsets else 0
+        stop = offsets[last][1] if last < len(offsets) else None
+
+        with open(path, "rb") as f:
+            if entry["format"] == "binary":
+                header = f.read(telemetry_format.HEADER_STRUCT.size)
+            f.seek(begin)
+            data = f.read() if stop is None else f.read(stop - begin)
+
+        if entry["format"] == "binary":
+            tables = parse_binary(header + data)
+        else:
+            tables = parse_text(data.decode("utf-8", "replace"))
+
+        # Trim to the range
+        trimmed = []
+        for table in tables:
+            keep = np.ones(len(table["time"]), dtype=bool)
+            if start is not None:
+                keep &= table["time"] >= start
+            if end is not None:
+                keep &= table["time"] <= end
+            trimmed.append({name: np.asarray(values)[keep] if name != "message" else
+                            [m for m, k in zip(values, keep) if k] for name, values in table.items()})
+        return tuple(trimmed)
+
+    def query(self, field, start=None, end=None):
+        """
+        Returns every logged value of a field within a time range across the archive.
+
+        :param field: A sensor or IMU field, e.g. "displacement".
+        :return: A tuple (times, values) of NumPy arrays in time order.
+        """
+        table_index = 1 if field in telemetry_format.SENSOR_FIELDS else 0
+        times = []
+        values = []
+        for path in self.files_between(start, end):
+            table = self.read_range(path, start, end)[table_index]
+            times.append(table["time"])
+            values.append(table[field])
+        if not times:
+            return np.empty(0), np.empty(0)
+        times = np.concatenate(times)
+        order = np.argsort(times, kind="stable")
+        return times[order], np.concatenate(values)[order]
+
+    def summary(self, field, start=None, end=None, resolution=None, max_points=2000):
+        """
+        Returns min/max/mean bins of a field over a time range from the index alone.
+
+        :param field: A field in PYRAMID_FIELDS.
+        :param resolution: The bin width in seconds, one of the index resolutions; by default
+                           the finest one giving at most max_points bins over the range.
+        :return: A dict with "resolution" and NumPy arrays "time", "count", "min", "max" and
+                 "mean" (NaN where a bin had no finite value).
+        """
+        table_name = "sensor" if field in PYRAMID_FIELDS["sensor"] else "imu"
+        paths = self.files_between(start, end)
+        if resolution is None:
+            span_start = start if start is not None else min((self.entries[p]["start"] for p in paths), default=0.0)
+            span_end = end if end is not None else max((self.entries[p]["end"] for p in paths), default=0.0)
+            resolution = next((r for r in self.resolutions if (span_end - span_start) / r <= max_points), self.resolutions[-1])
+        elif resolution not in self.resolutions:
+            raise ValueError(f"No summary level of {resolution} s; the index has {self.resolutions}")
+
+        columns = {name: [] for name in ("time", "count", "min", "max", "mean")}
+        for path in paths:
+            level = self.entries[path]["levels"][str(resolution)][table_name]
+            columns["time"].extend(level["time"])
+            columns["count"].extend(level["count"])
+            for name in ("min", "max", "mean"):
+                columns[name].extend(level[field][name] if level["time"] else [])
+
+        result = {name: np.array(values, dtype=float) for name, values in columns.items()}
+        keep = np.ones(len(result["time"]), dtype=bool)
+        if start is not None:
+            keep &= result["time"] + resolution > start
+        if end is not None:
+            keep &= result["time"] <= end
+        result = {name: values[keep] for name, values in result.items()}
+        result["resolution"] = resolution
+        return result
+
+    def to_string(self):
+        """
+        Returns a string representation of the indexed archive.
+        """
+        spans = [entry for entry in self.entries.values() if entry["start"] is not None]
+        if not spans:
+            return f"{self.filename}: {len(self.entries)} logs, no samples"
+        return (f"{self.filename}: {len(self.entries)} logs, "
+                f"{format_time(min(e['start'] for e in spans))} to {format_time(max(e['end'] for e in spans))}, "
+                f"{sum(e['end'] - e['start'] for e in spans):.0f} s of telemetry")
+
+def main():
+    parser = argparse.ArgumentParser(description="Index the telemetry log archive and query it by time range.")
+    parser.add_argument("paths", nargs="*", default=["logs", "sli/logs"], help="Log files and/or directories")
+    parser.add_argument("--index", default="sli/telemetry_index.json", help="Index file")
+    parser.add_argument("--start", help="Range start, e.g. \"2025-04-04 19:20:00\"")
+    parser.add_argument("--end", help="Range end")
+    parser.add_argument("--field", default="displacement", help="Field to query")
+    parser.add_argument("--raw", action="store_true", help="Print every sample instead of summary bins")
+    parser.add_argument("--resolution", type=int, help="Summary bin width in seconds (1, 10 or 60)")
+    args = parser.parse_args()
+
+    index = TelemetryIndex(args.index, args.paths)
+    update_start = time.perf_counter()
+    indexed = index.update()
+    print(f"Indexed {indexed} new or changed logs in {(time.perf_counter() - update_start) * 1000:.1f} ms", file=sys.stderr)
+    print(index.to_string(), file=sys.stderr)
+
+    start = parse_time(args.start) if args.start else None
+    end = parse_time(args.end) if args.end else None
+    query_start = time.perf_counter()
+    if args.raw:
+        times, values = index.query(args.field, start, end)
+        for t, value in zip(times, values):
+            print(f"{format_time(t)}  {value:.3f}")
+        count = len(times)
+    else:
+        result = index.summary(args.field, start, end, resolution=args.resolution)
+        print(f"{'time':<24}{'count':>6}{'min':>10}{'max':>10}{'mean':>10}  ({args.field}, {result['resolution']} s bins)")
+        for row in zip(result["time"], result["count"], result["min"], result["max"], result["mean"]):
+            print(f"{format_time(row[0]):<24}{int(row[1]):>6}{row[2]:>10.3f}{row[3]:>10.3f}{row[4]:>10.3f}")
+        count = len(result["time"])
+    print(f"{count} rows in {(time.perf_counter() - query_start) * 1000:.1f} ms", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,333 @@
+import os
+import sys
+import time
+import clock
+import socket
+import struct
+import argparse
+import threading
+from collections import deque
+import telemetry_format
+from telemetry_writer import TelemetryLogHandler
+
+# A datagram is a header followed by up to MAX_RECORDS telemetry_format records; it
+# stays under a typical 1500-byte MTU so UDP never fragments it.
+MAGIC = b"PRXS"
+FORMAT_VERSION = 1
+DATAGRAM_HEADER = struct.Struct("<4sHHIIdd")  # magic, version, record count, sequence, records dropped, wall time, monotonic time
+MAX_RECORDS = 28
+MAX_DATAGRAM_SIZE = DATAGRAM_HEADER.size + MAX_RECORDS * telemetry_format.RECORD_SIZE
+DEFAULT_PORT = 5005
+
+def parse_address(address):
+    """
+    Returns the socket family and address for a stream address.
+
+    :param address: A (host, port) tuple or "host:port" string for UDP, or a filesystem
+                    path for a local datagram socket.
+    :return: A tuple (family, address).
+    """
+    if isinstance(address, tuple):
+        return socket.AF_INET, address
+    host, separator, port = address.rpartition(":")
+    if separator and port.isdigit() and os.sep not in address:
+        return socket.AF_INET, (host or "127.0.0.1", int(port))
+    return socket.AF_UNIX, address
+
+class TelemetryPublisher:
+    def __init__(self, address=("127.0.0.1", DEFAULT_PORT), rate_hz=20, max_pending=2048, batch_size=MAX_RECORDS):
+        """
+        Initializes a live telemetry publisher that sends batches of sample records to a
+        ground station, e.g. telemetry_stream.py running as a receiver.
+
+        log() only appends to a bounded queue; a background thread packs the queued records
+        into datagrams rate_hz times per second and sends them on a non-blocking socket.
+        When the queue is full or the socket would block, records are dropped and counted,
+        so the acquisition loop never waits on the network. Datagrams carry a sequence
+        number so the receiver can count the ones lost on the way.
+
+        :param address: A (host, port) or "host:port" for UDP, or a local datagram socket path.
+        :param rate_hz: How often the queued records are sent.
+        :param max_pending: The most records queued between sends before new ones are dropped.
+        :param batch_size: The most records per datagram, at most MAX_RECORDS.
+        """
+        self.family, self.address = parse_address(address)
+        self.interval = 1.0 / rate_hz
+        self.max_pending = max_pending
+        self.batch_size = min(batch_size, MAX_RECORDS)
+        self.socket = socket.socket(self.family, socket.SOCK_DGRAM)
+        self.socket.setblocking(False)
+
+        # Records carry clock.monotonic timestamps; every datagram carries this pair to convert them
+        self.wall_time = clock.time()
+        self.monotonic_time = clock.monotonic()
+
+        # Records as (record_type, fields) tuples; deque appends and pops are thread-safe
+        self.pending = deque()
+        self.buffer = bytearray(MAX_DATAGRAM_SIZE)
+        self.sequence = 0
+
+        # Statistics
+        self.enqueued = 0
+        self.dropped = 0  # Records dropped on a full queue or with a datagram that could not be sent
+        self.datagrams = 0
+        self.records_sent = 0
+        self.send_errors = 0
+        self.format_errors = 0
+        self.last_error = None
+
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._send_loop, name="telemetry-stream", daemon=True)
+        self._thread.start()
+
+    def log(self, label, sample):
+        """
+        Queues a sample for the next datagram; the same call as TelemetryWriter.log.
+
+        :param label: The record label, e.g. "IMU Telemetry".
+        :param sample: An ImuSample or SensorSample (see samples.py).
+        :return: True if the sample was queued, False if it was dropped.
+        """
+        record_type = telemetry_format.LABEL_RECORDS.get(label)
+        if record_type is None:
+            self.format_errors += 1
+            return False
+        return self._enqueue(record_type, sample)
+
+    def log_message(self, message, timestamp=None):
+        """
+        Queues an event; bare separator lines are skipped.
+
+        :param message: The event text, truncated to telemetry_format.EVENT_TEXT_SIZE bytes.
+        :param timestamp: The clock.monotonic time of the message (defaults to now).
+        """
+        text = message.strip("- ")
+        if not text:
+            return True
+        data = (timestamp if timestamp is not None else clock.monotonic(), text.encode("utf-8")[:telemetry_format.EVENT_TEXT_SIZE])
+        return self._enqueue(telemetry_format.RECORD_EVENT, data)
+
+    def _enqueue(self, record_type, fields):
+        self.enqueued += 1
+        if len(self.pending) >= self.max_pending:
+            self.dropped += 1
+            return False
+        self.pending.append((record_type, fields))
+        return True
+
+    def handler(self):
+        """
+        Returns a logging.Handler that streams log messages as events.
+        """
+        return TelemetryLogHandler(self)
+
+    def _send_loop(self):
+        while not self._stop_event.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        """
+        Sends everything queued, batch_size records per datagram.
+        """
+        while self.pending:
+            count = 0
+            offset = DATAGRAM_HEADER.size
+            while count < self.batch_size and self.pending:
+                record_type, fields = self.pending.popleft()
+                try:
+                    telemetry_format.RECORD_STRUCTS[record_type].pack_into(self.buffer, offset, record_type, *fields)
+                except struct.error:
+                    self.format_errors += 1
+                    continue
+                offset += telemetry_format.RECORD_SIZE
+                count += 1
+            if not count:
+                break
+
+            DATAGRAM_HEADER.pack_into(self.buffer, 0, MAGIC, FORMAT_VERSION, count, self.sequence,
+                                      self.dropped, self.wall_time, self.monotonic_time)
+            self.sequence = (self.sequence + 1) & 0xFFFFFFFF
+            try:
+                self.socket.sendto(memoryview(self.buffer)[:offset], self.address)
+                self.datagrams += 1
+                self.records_sent += count
+            except OSError as e:  # Would block, no receiver yet, network down: drop the batch
+                self.send_errors += 1
+                self.dropped += count
+                self.last_error = e
+
+    def close(self):
+        """
+        Stops the send thread, sends what is still queued and closes the socket.
+        """
+        self._stop_event.set()
+        self._thread.join(1.0)
+        self.flush()
+        self.socket.close()
+
+    def to_string(self):
+        """
+        Returns a string representation of the publisher's statistics.
+        """
+        return (f"Address: {self.address}, Enqueued: {self.enqueued}, Sent: {self.records_sent} "
+                f"in {self.datagrams} datagrams, Dropped: {self.dropped}, Send Errors: {self.send_errors}, "
+                f"Format Errors: {self.format_errors}, Last Error: {self.last_error}")
+
+class TelemetryReceiver:
+    def __init__(self, address=("127.0.0.1", DEFAULT_PORT), output=None, timeout=0.5):
+        """
+        Initializes a receiver of the datagrams sent by a TelemetryPublisher.
+
+        :param address: The address to bind, as for TelemetryPublisher.
+        :param output: A path to record the received records to as a binary telemetry file
+                       (see telemetry_format), or None.
+        :param timeout: The longest time in seconds receive() waits for a datagram.
+        """
+        self.family, self.address = parse_address(address)
+        if self.family == socket.AF_UNIX and os.path.exists(self.address):
+            os.remove(self.address)  # A socket file left by an earlier receiver
+        self.socket = socket.socket(self.family, socket.SOCK_DGRAM)
+        self.socket.bind(self.address)
+        self.socket.settimeout(timeout)
+        self.output = open(output, "wb") if output else None
+
+        self.wall_time = None
+        self.monotonic_time = None
+        self.expected_sequence = None
+
+        # Statistics
+        self.datagrams = 0
+        self.records = 0
+        self.lost = 0  # Datagrams missing from the sequence
+        self.late = 0  # Datagrams arriving after a later one
+        self.invalid = 0
+        self.publisher_dropped = 0  # Records the publisher reported dropping
+
+    def receive(self):
+        """
+        Waits for one datagram and decodes it.
+
+        :return: A list of (record_type, timestamp, data) tuples as from
+                 telemetry_format.unpack_record, or None if nothing arrived in time.
+        """
+        try:
+            payload = self.socket.recv(MAX_DATAGRAM_SIZE)
+        except socket.timeout:
+            return None
+        if len(payload) < DATAGRAM_HEADER.size:
+            self.invalid += 1
+            return []
+        magic, version, count, sequence, dropped, wall_time, monotonic_time = DATAGRAM_HEADER.unpack_from(payload)
+        size = DATAGRAM_HEADER.size + count * telemetry_format.RECORD_SIZE
+        if magic != MAGIC or version > FORMAT_VERSION or len(payload) < size:
+            self.invalid += 1
+            return []
+
+        if self.monotonic_time is None:
+            self.wall_time, self.monotonic_time = wall_time, monotonic_time
+            if self.output:
+                self.output.write(telemetry_format.pack_header(wall_time, monotonic_time))
+        gap = 0 if self.expected_sequence is None else (sequence - self.expected_sequence) & 0xFFFFFFFF
+        if gap < 0x80000000:
+            self.lost += gap
+            self.expected_sequence = (sequence + 1) & 0xFFFFFFFF
+        else:
+            # Older than one already received: it was counted as lost when the gap was seen
+            self.late += 1
+            self.lost = max(0, self.lost - 1)
+        self.publisher_dropped = max(self.publisher_dropped, dropped)
+
+        self.datagrams += 1
+        self.records += count
+        if self.output:
+            self.output.write(payload[DATAGRAM_HEADER.size:size])
+        return [telemetry_format.unpack_record(payload, offset)
+                for offset in range(DATAGRAM_HEADER.size, size, telemetry_format.RECORD_SIZE)]
+
+    def to_wall_time(self, timestamp):
+        """
+        Converts a record's monotonic timestamp to wall-clock seconds since the epoch.
+        """
+        return self.wall_time + (timestamp - self.monotonic_time)
+
+    def close(self):
+        self.socket.close()
+        if self.output:
+            self.output.close()
+        if self.family == socket.AF_UNIX and os.path.exists(self.address):
+            os.remove(self.address)
+
+    def to_string(self):
+        """
+        Returns a string representation of the receiver's statistics.
+        """
+        return (f"Datagrams: {self.datagrams}, Records: {self.records}, Lost Datagrams: {self.lost}, "
+                f"Late: {self.late}, Invalid: {self.invalid}, Dropped by Publisher: {self.publisher_dropped}")
+
+def demo_publisher(address, stop_event, rate_hz=100):
+    """
+    Publishes synthetic samples until stop_event is set, for trying the receiver on localhost.
+    """
+    from samples import ImuSample, SensorSample
+    publisher = TelemetryPublisher(address)
+    publisher.log_message("Demo Start")
+    step = 0
+    while not stop_event.wait(1.0 / rate_hz):
+        now = time.monotonic()
+        publisher.log("IMU Telemetry", ImuSample(now, 0.0, -9.8, 0.1, 0.0, 0.0, 0.0, 6.3, 19.1, -1.5))
+        if step % 10 == 0:
+            displacement = step * 0.1
+            publisher.log("Sensor Telemetry", SensorSample(now, 21.5, float("nan"), 1001.8 - displacement / 8.3,
+                                                           float("nan"), 120.0 + displacement, displacement))
+        step += 1
+    publisher.close()
+    print(f"Demo Publisher: {publisher.to_string()}", file=sys.stderr)
+
+def main():
+    parser = argparse.ArgumentParser(description="Receive, display and record live telemetry from flight_program.")
+    parser.add_argument("address", nargs="?", default=f"127.0.0.1:{DEFAULT_PORT}",
+                        help="host:port to listen on for UDP, or a local socket path")
+    parser.add_argument("--output", help="Record the stream to this binary telemetry file")
+    parser.add_argument("--interval", type=float, default=0.5, help="Seconds between display updates")
+    parser.add_argument("--demo", action="store_true", help="Also publish synthetic samples to the address")
+    args = parser.parse_args()
+
+    receiver = TelemetryReceiver(args.address, output=args.output)
+    print(f"Listening on {receiver.address}", file=sys.stderr)
+
+    stop_event = threading.Event()
+    if args.demo:
+        threading.Thread(target=demo_publisher, args=(args.address, stop_event), daemon=True).start()
+
+    latest = {}
+    next_display = time.monotonic()
+    try:
+        while True:
+            records = receiver.receive()
+            for record_type, timestamp, data in records or ():
+                if record_type == telemetry_format.RECORD_EVENT:
+                    # Events are rare and matter, so they are shown as they come
+                    print(f"{telemetry_format.format_asctime(receiver.to_wall_time(timestamp))} - {data}")
+                else:
+                    latest[record_type] = (timestamp, data)
+
+            if time.monotonic() >= next_display:
+                next_display = time.monotonic() + args.interval
+                lines = ["----------------------------------"]
+                if telemetry_format.RECORD_IMU in latest:
+                    lines.append(f"IMU: {telemetry_format.format_imu(*latest[telemetry_format.RECORD_IMU][1])}")
+                if telemetry_format.RECORD_SENSOR in latest:
+                    lines.append(f"Sensor: {telemetry_format.format_sensor(*latest[telemetry_format.RECORD_SENSOR][1])}")
+                lines.append(f"Stream: {receiver.to_string()}")
+                print("\n".join(lines))
+
+    except KeyboardInterrupt:
+        print("Receiver stopped by user.", file=sys.stderr)
+
+    finally:
+        stop_event.set()
+        receiver.close()
+        print(f"Receiver: {receiver.to_string()}", file=sys.stderr)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,257 @@
+import time
+import clock
+import queue
+import struct
+import logging
+import threading
+import telemetry_format
+from instrumentation import stats
+from samples import ImuSample
+
+class TelemetryWriter:
+    def __init__(self, filename, formatters=None, flush_interval=0.5, max_queue=4096, overflow_policy="drop", block_timeout=0.01, binary=False):
+        """
+        Initializes a queue-backed telemetry writer that formats and writes on a background thread.
+
+        The acquisition loop only enqueues sample records; string formatting and
+        file I/O happen on the writer thread, so an SD-card stall cannot stall sampling.
+        Lines are written in the same "%(asctime)s - %(message)s" layout as before.
+
+        :param filename: The path of the telemetry log file (opened for appending).
+        :param formatters: A dict mapping a record label (e.g. "IMU Telemetry") to a callable
+                           that turns the sample record into text, e.g. imu.format_data.
+        :param flush_interval: The maximum time in seconds between file flushes.
+        :param max_queue: The maximum number of pending records.
+        :param overflow_policy: "drop" discards records when the queue is full,
+                                "block" waits up to block_timeout for space first (backpressure).
+        :param block_timeout: The longest time in seconds a "block" enqueue may wait.
+        :param binary: Write fixed-width binary records (see telemetry_format) instead of text.
+                       Formatters are not used, and log separators are left out.
+        """
+        if overflow_policy not in ("drop", "block"):
+            raise ValueError(f"Unknown overflow policy: {overflow_policy}")
+
+        self.filename = filename
+        self.formatters = dict(formatters or {})
+        self.flush_interval = flush_interval
+        self.overflow_policy = overflow_policy
+        self.block_timeout = block_timeout
+        self.binary = binary
+        self.queue = queue.Queue(maxsize=max_queue)
+
+        # Records carry clock.monotonic timestamps; this converts them to wall-clock time
+        self.wall_time = clock.time()
+        self.monotonic_time = clock.monotonic()
+
+        # Writer statistics
+        self.enqueued = 0
+        self.written = 0
+        self.dropped = 0
+        self.backpressure = 0  # Enqueues that found the queue full
+        self.format_errors = 0
+
+        if binary:
+            self.file = open(filename, "ab")
+            if self.file.tell() == 0:
+                self.file.write(telemetry_format.pack_header(self.wall_time, self.monotonic_time))
+            self._encode = self._pack
+        else:
+            self.file = open(filename, "a", encoding="utf-8")
+            self._encode = self._format
+        # Timing counters of the writer thread
+        self.encode_timer = stats.stage("writer.encode")
+        self.write_timer = stats.stage("writer.write")
+
+        self._stop_event = threading.Event()
+        self._abort_event = threading.Event()  # Set when close() runs out of time to drain
+        self._thread = threading.Thread(target=self._run, name="telemetry-writer", daemon=True)
+        self._thread.start()
+
+    def log(self, label, sample):
+        """
+        Enqueues a sample record; it is formatted later by the formatter registered for label.
+
+        :param label: The record label, e.g. "IMU Telemetry".
+        :param sample: An ImuSample or SensorSample (see samples.py).
+        :return: True if the record was queued, False if it was dropped.
+        """
+        return self._put((sample.timestamp, label, sample))
+
+    def log_message(self, message, timestamp=None):
+        """
+        Enqueues a preformatted text line.
+
+        :param message: The text to write.
+        :param timestamp: The clock.monotonic time of the message (defaults to now).
+        :return: True if the message was queued, False if it was dropped.
+        """
+        return self._put((timestamp if timestamp is not None else clock.monotonic(), None, message))
+
+    def _put(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.backpressure += 1
+            if self.overflow_policy == "drop" or self._stop_event.is_set():
+                self.dropped += 1
+                return False
+            try:
+                self.queue.put(record, timeout=self.block_timeout)
+            except queue.Full:
+                self.dropped += 1
+                return False
+        self.enqueued += 1
+        return True
+
+    def _format(self, record):
+        timestamp, label, data = record
+        asctime = telemetry_format.format_asctime(self.wall_time + (timestamp - self.monotonic_time))
+        if label is None:
+            message = data
+        else:
+            try:
+                message = f"{label}: {self.formatters[label](data)}"
+            except (KeyError, TypeError, ValueError):
+                self.format_errors += 1
+                message = f"{label}: {data}"
+        return f"{asctime} - {message}\n"
+
+    def _pack(self, record):
+        timestamp, label, data = record
+        try:
+            if label is None:
+                # Keep the event text, not its dashed decoration; bare separators are layout only
+                text = data.strip("- ")
+                return telemetry_format.pack_record(telemetry_format.RECORD_EVENT, timestamp, text) if text else b""
+            return telemetry_format.pack_record(telemetry_format.LABEL_RECORDS[label], timestamp, data[1:])
+        except (KeyError, TypeError, ValueError, struct.error):
+            self.format_errors += 1
+            return b""
+
+    def _drain(self, first=None):
+        """
+        Formats and writes every record currently in the queue as one batch.
+        """
+        start = time.perf_counter_ns()
+        chunks = [] if first is None else [self._encode(first)]
+        while not self._abort_event.is_set():
+            try:
+                chunks.append(self._encode(self.queue.get_nowait()))
+            except queue.Empty:
+                break
+        if chunks:
+            self.encode_timer.add(time.perf_counter_ns() - start)
+            with self.write_timer:
+                self.file.write((b"" if self.binary else "").join(chunks))
+            self.written += len(chunks)
+
+    def _run(self):
+        next_flush = time.monotonic() + self.flush_interval
+        try:
+            while not self._stop_event.is_set():
+                try:
+                    first = self.queue.get(timeout=max(0.0, next_flush - time.monotonic()))
+                except queue.Empty:
+                    first = None
+                self._drain(first)
+
+                if time.monotonic() >= next_flush:
+                    with self.write_timer:
+                        self.file.flush()
+                    next_flush = time.monotonic() + self.flush_interval
+
+            # Drain whatever is left after close() was requested
+            self._drain()
+            self.file.flush()
+        finally:
+            # The file is only ever closed here, so nothing can write to it afterwards
+            self.file.close()
+
+    def _discard(self):
+        """
+        Empties the queue without writing it.
+
+        :return: The number of records discarded.
+        """
+        count = 0
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return count
+            count += 1
+
+    def close(self, timeout=5.0):
+        """
+        Stops accepting new records, writes out everything still queued and closes the file.
+
+        If the queue has not drained within the timeout, the records still queued are counted
+        as dropped and the writer thread stops after the batch it is writing. The file is
+        closed by the writer thread as it exits, never while it may still write.
+
+        :param timeout: The maximum time in seconds to wait for the queue to drain.
+        :return: The number of records dropped because the queue did not drain in time.
+        """
+        self._stop_event.set()
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            return 0
+        self._abort_event.set()
+        dropped = self._discard()
+        self.dropped += dropped
+        print(f"Telemetry writer did not drain within {timeout} s; {dropped} records dropped.")
+        self._thread.join(timeout)
+        return dropped
+
+    def handler(self):
+        """
+        Returns a logging.Handler that routes logging calls through this writer.
+        """
+        return TelemetryLogHandler(self)
+
+    def to_string(self):
+        """
+        Returns a string representation of the writer's statistics.
+
+        :return: A formatted string with writer statistics.
+        """
+        return (f"Enqueued: {self.enqueued}, "
+                f"Written: {self.written}, "
+                f"Dropped: {self.dropped}, "
+                f"Backpressure: {self.backpressure}, "
+                f"Format Errors: {self.format_errors}, "
+                f"Pending: {self.queue.qsize()}")
+
+class TelemetryLogHandler(logging.Handler):
+    def __init__(self, writer):
+        """
+        Initializes a logging handler that hands messages to a TelemetryWriter.
+
+        :param writer: The TelemetryWriter that formats and writes the messages.
+        """
+        super().__init__()
+        self.writer = writer
+
+    def emit(self, record):
+        # Convert the record's wall-clock creation time to the writer's monotonic timeline
+        timestamp = self.writer.monotonic_time + (record.created - self.writer.wall_time)
+        self.writer.log_message(record.getMessage(), timestamp=timestamp)
+
+# Example usage
+if __name__ == "__main__":
+    # Write a few fake IMU samples to a scratch file
+    writer = TelemetryWriter("telemetry_writer_test.log",
+                             formatters={"IMU Telemetry": lambda sample: telemetry_format.format_imu(*sample[1:])})
+
+    try:
+        for i in range(10):
+            writer.log("IMU Telemetry", ImuSample(time.monotonic(), 0.1 * i, -9.7, 0.0, 0.0, 0.0, 0.0, 6.3, 19.1, -1.5))
+            writer.log_message("-----------------------------------------------------------------------------------------------")
+            time.sleep(0.05)
+
+    except KeyboardInterrupt:
+        print("Program interrupted by user.")
+
+    finally:
+        writer.close()
+        print(writer.to_string())